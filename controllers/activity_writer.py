@@ -0,0 +1,265 @@
+import collections
+import os
+import threading
+import time
+
+from database.event_journal import EventJournal
+
+from models.time_record import ACTIVITY_TYPES
+
+
+def apply_activity_events(db_manager, events):
+    """Aplica eventos de actividad en una única transacción.
+
+    Cada evento es un diccionario con:
+      - type: "switch" (cambio o inicio de actividad), "stop" (cierre de la
+        actividad actual) o "end" (fin de sesión)
+      - record_id, time: registro afectado y marca de tiempo ISO del evento
+      - ended, ended_start, duration: actividad que se cierra (o None), su
+        hora de inicio y su duración en segundos
+      - activity: actividad que comienza (solo en "switch")
+
+    La actividad cerrada se identifica por (record_id, start_time), por lo
+    que no hace falta conocer su ID. Los eventos con "id" se registran en
+    applied_events y se omiten si ya se aplicaron, así que reproducirlos es
+    seguro. Los eventos de un registro ya cerrado (por ejemplo por el
+    auto-logout) se descartan sin abrir ni cerrar actividades, para no
+    pisar su hora de salida ni sus totales. Devuelve el ID de la última
+    actividad creada.
+    """
+    activity_id = None
+
+    with db_manager.transaction():
+        for event in events:
+            if event.get('id'):
+                if db_manager.fetch_one(
+                    "SELECT 1 FROM applied_events WHERE event_id = ?", (event['id'],)
+                ):
+                    continue
+                db_manager.execute_query(
+                    "INSERT INTO applied_events (event_id) VALUES (?)", (event['id'],)
+                )
+
+            if not db_manager.fetch_one(
+                "SELECT 1 FROM time_records WHERE id = ? AND logout_time IS NULL", (event['record_id'],)
+            ):
+                print(f"Evento descartado: el registro {event['record_id']} ya está cerrado")
+                continue
+
+            if event.get('ended'):
+                if event['ended'] not in ACTIVITY_TYPES:
+                    raise ValueError(f"Tipo de actividad inválido: {event['ended']}")
+
+                # Cerrar la actividad anterior
+                db_manager.execute_query(
+                    """
+                    UPDATE activity_logs
+                    SET end_time = ?, duration = ?
+                    WHERE record_id = ? AND start_time = ? AND end_time IS NULL
+                    """,
+                    (event['time'], event['duration'], event['record_id'], event['ended_start'])
+                )
+
+                # Sumar su duración a los totales del registro, solo si la
+                # actividad seguía abierta (changes() se refiere al UPDATE
+                # anterior); si la cerró la reconciliación no se duplica
+                time_field = f"total_{event['ended']}_time"
+                db_manager.execute_query(
+                    f"""
+                    UPDATE time_records
+                    SET {time_field} = {time_field} + ?
+                    WHERE id = ? AND changes() > 0
+                    """,
+                    (event['duration'], event['record_id'])
+                )
+
+            # Último latido conocido; las sesiones cerradas no lo necesitan
+            if event['type'] == 'end':
+                db_manager.execute_query(
+                    "DELETE FROM session_heartbeats WHERE record_id = ?", (event['record_id'],)
+                )
+            else:
+                db_manager.execute_query(
+                    """
+                    INSERT INTO session_heartbeats (record_id, last_seen) VALUES (?, ?)
+                    ON CONFLICT (record_id) DO UPDATE
+                    SET last_seen = MAX(last_seen, excluded.last_seen)
+                    """,
+                    (event['record_id'], event['time'])
+                )
+
+            if event['type'] == 'switch':
+                activity_id = db_manager.execute_insert(
+                    """
+                    INSERT INTO activity_logs
+                    (record_id, activity_type, start_time)
+                    VALUES (?, ?, ?)
+                    """,
+                    (event['record_id'], event['activity'], event['time'])
+                )
+            elif event['type'] == 'end':
+                db_manager.execute_query(
+                    "UPDATE time_records SET logout_time = ? WHERE id = ?",
+                    (event['time'], event['record_id'])
+                )
+
+    return activity_id
+
+
+def replay_journal(db_manager, journal):
+    """Aplica los eventos pendientes del diario y los retira de él.
+
+    Devuelve el ID de la última actividad creada. Si la base de datos no
+    está disponible se propaga el error y los eventos siguen en el diario.
+    """
+    events = journal.pending()
+    if not events:
+        return None
+
+    activity_id = apply_activity_events(db_manager, events)
+    journal.acknowledge(events)
+    return activity_id
+
+
+def replay_journal_dir(db_manager, journal_dir):
+    """Reproduce los diarios que quedaron pendientes en un directorio (al iniciar)"""
+    if not journal_dir or not os.path.isdir(journal_dir):
+        return 0
+
+    replayed = 0
+    for name in sorted(os.listdir(journal_dir)):
+        if not name.endswith('.journal'):
+            continue
+
+        journal = EventJournal(os.path.join(journal_dir, name))
+        try:
+            pending = len(journal.pending())
+            replay_journal(db_manager, journal)
+            replayed += pending
+        except Exception as e:
+            print(f"Error al reproducir el diario {name}: {e}")
+        finally:
+            journal.close()
+
+    # Las marcas de eventos aplicados solo se necesitan mientras haya diarios por reproducir
+    db_manager.execute_query(
+        "DELETE FROM applied_events WHERE applied_at < datetime('now', '-30 days')"
+    )
+
+    return replayed
+
+
+class ActivityWriter:
+    """Escritor en segundo plano (write-behind) de eventos de actividad.
+
+    Los eventos se encolan en memoria y un hilo los guarda en lotes: cuando
+    se juntan batch_size eventos o pasan flush_interval segundos desde el
+    primero pendiente. flush() fuerza la escritura y espera a que termine;
+    si la base de datos falla, el lote se reintenta sin perder eventos.
+    """
+
+    def __init__(self, db_manager, batch_size=50, flush_interval=2.0, retry_delay=1.0,
+                 journal=None):
+        self.db_manager = db_manager
+        self.journal = journal
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+
+        self._events = collections.deque()
+        self._condition = threading.Condition()
+        self._unwritten = 0
+        self._flush_requested = False
+        self._closing = False
+
+        self._thread = threading.Thread(target=self._run, name="ActivityWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, event):
+        """Encola un evento para escribirlo más tarde"""
+        with self._condition:
+            if self._closing:
+                raise RuntimeError("El escritor de actividades está cerrado")
+
+            self._events.append(event)
+            self._unwritten += 1
+            # Despertar al hilo con el primer evento (inicia el plazo) o con un lote lleno
+            if len(self._events) == 1 or len(self._events) >= self.batch_size:
+                self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Escribe de inmediato los eventos pendientes y espera a que se confirmen"""
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._unwritten == 0, timeout)
+
+    def close(self, timeout=None):
+        """Escribe lo pendiente y detiene el hilo"""
+        flushed = self.flush(timeout)
+
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+
+        self._thread.join(timeout)
+        return flushed
+
+    def pending_count(self):
+        """Cantidad de eventos aún no confirmados en la base de datos"""
+        with self._condition:
+            return self._unwritten
+
+    def _next_batch(self):
+        """Espera hasta que haya un lote listo; None al cerrar sin pendientes"""
+        deadline = None
+
+        with self._condition:
+            while True:
+                if not self._events:
+                    if self._closing:
+                        return None
+                    deadline = None
+                    self._condition.wait()
+                    continue
+
+                if (len(self._events) >= self.batch_size or self._flush_requested
+                        or self._closing):
+                    break
+
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            count = min(len(self._events), self.batch_size)
+            return [self._events.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            try:
+                apply_activity_events(self.db_manager, batch)
+                if self.journal:
+                    self.journal.acknowledge(batch)
+            except Exception as e:
+                print(f"Error al guardar eventos de actividad, se reintentará: {e}")
+                with self._condition:
+                    self._events.extendleft(reversed(batch))
+                    if self._closing:
+                        # Al cerrar no se reintenta indefinidamente
+                        return
+                time.sleep(self.retry_delay)
+                continue
+
+            with self._condition:
+                self._unwritten -= len(batch)
+                if self._unwritten == 0:
+                    self._flush_requested = False
+                self._condition.notify_all()
\ No newline at end of file
@@ -1,39 +1,123 @@
+import csv
 import datetime
+import json
+import threading
+from controllers.user_directory import UserDirectory
 from models.user import User
+from utils.lru_cache import LRUCache
+
+# Filas por página del reporte histórico
+REPORT_PAGE_SIZE = 500
+
+# Máximo de filas de reportes guardadas en la caché
+REPORT_CACHE_ROWS = 20000
+
+# Filas por lote al importar usuarios
+IMPORT_BATCH_SIZE = 500
+
+# Resultados por búsqueda de usuarios
+SEARCH_LIMIT = 50
+
+# Usuarios por transacción en las operaciones masivas por tramos
+USER_BULK_CHUNK_SIZE = 100
+
+USER_ROLES = ('admin', 'employee')
+
+
+def report_key(record):
+    """Clave de paginación de una fila del reporte histórico"""
+    return (record['date'], record['username'], record['id'])
+
+
+def rollup_segments(from_date, to_date):
+    """Divide un rango de fechas (inclusive) en períodos completos de time_rollups.
+    
+    Usa meses completos donde se puede, luego semanas ISO completas y días
+    para el resto. Devuelve [(período, primer inicio, último inicio), ...].
+    """
+    start = datetime.date.fromisoformat(from_date)
+    end = datetime.date.fromisoformat(to_date)
+    one_day = datetime.timedelta(days=1)
+    
+    def next_month(day):
+        return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    
+    # Meses completos dentro del rango
+    segments = []
+    first_month = start if start.day == 1 else next_month(start)
+    month = first_month
+    while next_month(month) - one_day <= end:
+        segments.append(('month', month, next_month(month) - one_day))
+        month = next_month(month)
+    
+    if segments:
+        gaps = [(start, first_month - one_day), (month, end)]
+    else:
+        gaps = [(start, end)]
+    
+    # En los extremos: semanas completas (de lunes a domingo) y días sueltos
+    for gap_start, gap_end in gaps:
+        day = gap_start
+        while day <= gap_end:
+            if day.weekday() == 0 and day + datetime.timedelta(days=6) <= gap_end:
+                segments.append(('week', day, day + datetime.timedelta(days=6)))
+                day += datetime.timedelta(days=7)
+            else:
+                segments.append(('day', day, day))
+                day += one_day
+    
+    # Unir tramos contiguos del mismo período en un solo rango de inicios
+    merged = []
+    previous_end = None
+    for period, first, last in segments:
+        if merged and merged[-1][0] == period and previous_end + one_day == first:
+            merged[-1] = (period, merged[-1][1], first)
+        else:
+            merged.append((period, first, first))
+        previous_end = last
+    
+    return [(period, first.isoformat(), last.isoformat()) for period, first, last in merged]
+
 
 class AdminController:
     def __init__(self, db_manager):
         self.db_manager = db_manager
-    
-    def get_all_users(self):
-        """Obtiene todos los usuarios"""
-        # Conectar a la base de datos
-        self.db_manager.connect()
-        
-        # Consultar usuarios
-        query = "SELECT * FROM users ORDER BY username"
-        users = self.db_manager.fetch_all(query)
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
+        # Usuarios por ID en memoria; se invalida al modificar usuarios
+        self.user_directory = UserDirectory(db_manager)
         
-        return users
+        # Resultados de reportes por (filtros, versión de los datos)
+        self.report_cache = LRUCache(REPORT_CACHE_ROWS)
+        self._seen_data_version = None
+        self._report_version = None
+        self._version_lock = threading.Lock()  # Lo usan la interfaz y los hilos de AsyncRunner
     
     def get_user_by_id(self, user_id):
         """Obtiene un usuario por su ID"""
-        # Conectar a la base de datos
-        self.db_manager.connect()
-        
-        # Consultar usuario
-        query = "SELECT * FROM users WHERE id = ?"
-        params = (user_id,)
-        
-        user = self.db_manager.fetch_one(query, params)
-        
-        # Cerrar conexión
-        self.db_manager.disconnect()
+        return self.user_directory.get(user_id)
+    
+    def search_users(self, text, limit=SEARCH_LIMIT):
+        """Busca usuarios cuyo usuario o nombre completo empiece con text.
         
-        return user
+        No distingue mayúsculas y usa los índices NOCASE de username y
+        full_name, por lo que no recorre la tabla. Sin texto devuelve los
+        primeros usuarios en orden alfabético.
+        """
+        text = (text or '').strip()
+        if not text:
+            return self.db_manager.fetch_all(
+                "SELECT * FROM users ORDER BY username COLLATE NOCASE LIMIT ?", (limit,)
+            )
+        
+        # Escapar los comodines de LIKE que pueda traer el texto
+        pattern = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        query = """
+            SELECT * FROM users
+            WHERE username LIKE ? ESCAPE '\\' OR full_name LIKE ? ESCAPE '\\'
+            ORDER BY username COLLATE NOCASE
+            LIMIT ?
+        """
+        return self.db_manager.fetch_all(query, (pattern, pattern, limit))
     
     def add_user(self, username, password, full_name, role):
         """Agrega un nuevo usuario"""
@@ -41,9 +125,6 @@ class AdminController:
         if not username or not password or not full_name or not role:
             return False
         
-        # Conectar a la base de datos
-        self.db_manager.connect()
-        
         # Verificar si el usuario ya existe
         query = "SELECT id FROM users WHERE username = ?"
         params = (username,)
@@ -51,7 +132,6 @@ class AdminController:
         existing_user = self.db_manager.fetch_one(query, params)
         
         if existing_user:
-            self.db_manager.disconnect()
             return False
         
         # Insertar nuevo usuario
@@ -64,20 +144,115 @@ class AdminController:
         
         result = self.db_manager.execute_query(query, params)
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
+        if result:
+            self.user_directory.invalidate()
         
         return result
     
+    def import_users_from_csv(self, file_path, batch_size=IMPORT_BATCH_SIZE):
+        """Importa usuarios desde un CSV (usuario,contraseña,nombre_completo,rol).
+        
+        El archivo se lee fila a fila; un encabezado que empiece con
+        "usuario" se omite. Devuelve el resultado por fila de import_users.
+        """
+        with open(file_path, 'r', newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            
+            def numbered_rows():
+                for row in reader:
+                    if reader.line_num == 1 and row and row[0].strip().lower() == 'usuario':
+                        continue  # Saltar encabezado
+                    if any(value.strip() for value in row):
+                        yield reader.line_num, row
+            
+            return self.import_users(numbered_rows(), batch_size)
+    
+    def import_users(self, rows, batch_size=IMPORT_BATCH_SIZE):
+        """Agrega muchos usuarios en una sola transacción.
+        
+        rows es un iterable de (número de fila, [usuario, contraseña,
+        nombre completo, rol]). Las filas se procesan por lotes: una sola
+        consulta verifica qué usuarios del lote ya existen y los nuevos se
+        insertan con executemany. Si falla la base de datos no se importa
+        ninguno y se propaga el error.
+        
+        Devuelve una lista con un diccionario por fila: row, username,
+        status ('imported', 'duplicate' o 'invalid') y message.
+        """
+        outcomes = []
+        seen = set()  # Usuarios ya vistos en el archivo
+        
+        with self.db_manager.transaction():
+            batch = []
+            for line, values in rows:
+                batch.append((line, values))
+                if len(batch) >= batch_size:
+                    outcomes.extend(self._import_user_batch(batch, seen))
+                    batch = []
+            if batch:
+                outcomes.extend(self._import_user_batch(batch, seen))
+        
+        if any(outcome['status'] == 'imported' for outcome in outcomes):
+            self.user_directory.invalidate()
+        
+        return outcomes
+    
+    def _import_user_batch(self, batch, seen):
+        """Valida e inserta un lote de usuarios; devuelve el resultado de cada fila"""
+        outcomes = []
+        candidates = []
+        
+        for line, values in batch:
+            values = [value.strip() for value in values]
+            username = values[0] if values else ''
+            outcome = {'row': line, 'username': username, 'status': 'invalid', 'message': ''}
+            outcomes.append(outcome)
+            
+            if len(values) < 4 or not all(values[:3]):
+                outcome['message'] = "Faltan datos (usuario, contraseña, nombre completo y rol)"
+            elif values[3].lower() not in USER_ROLES:
+                outcome['message'] = f"Rol inválido: {values[3]}"
+            elif username in seen:
+                outcome['status'] = 'duplicate'
+                outcome['message'] = "Usuario repetido en el archivo"
+            else:
+                seen.add(username)
+                candidates.append((outcome, (username, values[1], values[2], values[3].lower())))
+        
+        if not candidates:
+            return outcomes
+        
+        # Una sola consulta para todos los usuarios del lote
+        existing = {
+            row['username'] for row in self.db_manager.fetch_all(
+                "SELECT username FROM users WHERE username IN (SELECT value FROM json_each(?))",
+                (json.dumps([user[0] for _, user in candidates]),)
+            )
+        }
+        
+        new_users = []
+        for outcome, user in candidates:
+            if user[0] in existing:
+                outcome['status'] = 'duplicate'
+                outcome['message'] = "El usuario ya existe"
+            else:
+                outcome['status'] = 'imported'
+                new_users.append(user)
+        
+        if new_users:
+            self.db_manager.execute_many(
+                "INSERT INTO users (username, password, full_name, role) VALUES (?, ?, ?, ?)",
+                new_users
+            )
+        
+        return outcomes
+    
     def update_user(self, user_id, password, full_name, role):
         """Actualiza un usuario existente"""
         # Validar parámetros
         if not user_id or not full_name or not role:
             return False
         
-        # Conectar a la base de datos
-        self.db_manager.connect()
-        
         # Actualizar usuario
         if password:
             # Si se proporciona una nueva contraseña, actualizarla
@@ -98,8 +273,10 @@ class AdminController:
         
         result = self.db_manager.execute_query(query, params)
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
+        # Los reportes muestran el nombre completo
+        if result:
+            self.user_directory.invalidate()
+            self.report_cache.clear()
         
         return result
     
@@ -109,84 +286,310 @@ class AdminController:
         if not user_id:
             return False
         
-        # Conectar a la base de datos
-        self.db_manager.connect()
-        
-        # Iniciar transacción
-        self.db_manager.execute_query("BEGIN TRANSACTION")
-        
         try:
-            # Eliminar registros de tiempo relacionados
-            query = "DELETE FROM activity_logs WHERE record_id IN (SELECT id FROM time_records WHERE user_id = ?)"
-            params = (user_id,)
-            self.db_manager.execute_query(query, params)
-            
-            query = "DELETE FROM time_records WHERE user_id = ?"
-            params = (user_id,)
-            self.db_manager.execute_query(query, params)
-            
-            # Eliminar usuario
-            query = "DELETE FROM users WHERE id = ?"
-            params = (user_id,)
-            self.db_manager.execute_query(query, params)
-            
-            # Confirmar transacción
-            self.db_manager.execute_query("COMMIT")
-            
+            self.delete_users([user_id])
             result = True
         except Exception as e:
-            # Revertir transacción en caso de error
-            self.db_manager.execute_query("ROLLBACK")
             print(f"Error al eliminar usuario: {e}")
             result = False
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
-        
         return result
     
-    def get_active_sessions(self, user_id=None):
-        """Obtiene sesiones activas de los usuarios"""
-        # Conectar a la base de datos
-        self.db_manager.connect()
+    def delete_users(self, user_ids, chunk_size=None):
+        """Elimina varios usuarios con todos sus registros de tiempo.
+        
+        Los registros y actividades se borran en cascada (ON DELETE
+        CASCADE) y los triggers actualizan time_rollups y session_changes.
+        Devuelve la cantidad de usuarios eliminados; ver _update_users
+        para chunk_size.
+        """
+        deleted = self._update_users(
+            "DELETE FROM users WHERE id IN (SELECT value FROM json_each(?))",
+            (), user_ids, chunk_size
+        )
+        self.report_cache.clear()
+        return deleted
+    
+    def deactivate_users(self, user_ids, chunk_size=None):
+        """Desactiva varios usuarios: conservan su historial pero no pueden iniciar sesión"""
+        return self._update_users(
+            "UPDATE users SET active = 0 WHERE active = 1 AND id IN (SELECT value FROM json_each(?))",
+            (), user_ids, chunk_size
+        )
+    
+    def activate_users(self, user_ids, chunk_size=None):
+        """Vuelve a habilitar el inicio de sesión de varios usuarios"""
+        return self._update_users(
+            "UPDATE users SET active = 1 WHERE active = 0 AND id IN (SELECT value FROM json_each(?))",
+            (), user_ids, chunk_size
+        )
+    
+    def change_users_role(self, user_ids, role, chunk_size=None):
+        """Asigna el mismo rol a varios usuarios"""
+        if role not in USER_ROLES:
+            raise ValueError(f"Rol inválido: {role}")
+        
+        return self._update_users(
+            "UPDATE users SET role = ? WHERE role <> ? AND id IN (SELECT value FROM json_each(?))",
+            (role, role), user_ids, chunk_size
+        )
+    
+    def _update_users(self, query, params, user_ids, chunk_size):
+        """Ejecuta una modificación masiva sobre una lista de IDs de usuario.
+        
+        La lista se pasa como un solo parámetro JSON (json_each), así que
+        cada tramo es una sola instrucción. Sin chunk_size todo se aplica en
+        una transacción; con chunk_size cada tramo de esa cantidad de
+        usuarios va en su propia transacción, para no retener el bloqueo de
+        escritura durante un borrado grande (si falla un tramo, los
+        anteriores quedan aplicados). Los errores se propagan. Devuelve la
+        cantidad de usuarios afectados.
+        """
+        user_ids = list(dict.fromkeys(int(user_id) for user_id in user_ids))
+        size = chunk_size or len(user_ids) or 1
+        affected = 0
+        
+        try:
+            for start in range(0, len(user_ids), size):
+                chunk = json.dumps(user_ids[start:start + size])
+                with self.db_manager.transaction() as connection:
+                    affected += connection.execute(query, params + (chunk,)).rowcount
+        finally:
+            if affected:
+                self.user_directory.invalidate()
+        
+        return affected
+    
+    def get_active_sessions(self, user_id=None, record_ids=None):
+        """Obtiene sesiones activas de los usuarios (opcionalmente solo de ciertos registros).
+        
+        Incluye la actividad en curso y su hora de inicio (activity_start) para
+        que la vista pueda calcular el tiempo transcurrido sin volver a consultar.
+        """
+        # Preparar consulta: las actividades abiertas salen del índice parcial
+        # idx_activity_logs_open; si hubiera más de una se toma la más reciente
+        query = """
+            SELECT u.username, t.*, 
+            a.activity_type as current_activity, a.start_time as activity_start
+            FROM time_records t
+            JOIN users u ON t.user_id = u.id
+            LEFT JOIN (
+                SELECT record_id, activity_type, MAX(start_time) as start_time
+                FROM activity_logs
+                WHERE end_time IS NULL
+                GROUP BY record_id
+            ) a ON a.record_id = t.id
+            WHERE t.logout_time IS NULL
+        """
+        params = []
         
-        # Preparar consulta
         if user_id and user_id != -1:
-            query = """
-                SELECT u.username, t.*, 
-                (SELECT activity_type FROM activity_logs 
-                WHERE record_id = t.id AND end_time IS NULL) as current_activity
-                FROM time_records t
-                JOIN users u ON t.user_id = u.id
-                WHERE t.logout_time IS NULL AND t.user_id = ?
-                ORDER BY t.login_time DESC
-            """
-            params = (user_id,)
-        else:
-            query = """
-                SELECT u.username, t.*, 
-                (SELECT activity_type FROM activity_logs 
-                WHERE record_id = t.id AND end_time IS NULL) as current_activity
-                FROM time_records t
-                JOIN users u ON t.user_id = u.id
-                WHERE t.logout_time IS NULL
-                ORDER BY t.login_time DESC
-            """
-            params = None
+            query += " AND t.user_id = ?"
+            params.append(user_id)
         
-        active_sessions = self.db_manager.fetch_all(query, params)
+        if record_ids is not None:
+            query += " AND t.id IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(record_ids)))
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
+        query += " ORDER BY t.login_time DESC"
+        
+        active_sessions = self.db_manager.fetch_all(query, params if params else None)
         
         return active_sessions
     
+    def get_change_token(self):
+        """Obtiene el número del último cambio registrado en las sesiones"""
+        row = self.db_manager.fetch_one("SELECT COALESCE(MAX(seq), 0) FROM session_changes")
+        return row[0] if row else 0
+    
+    def get_active_session_changes(self, since_token=None, user_id=None):
+        """Obtiene solo las sesiones activas que cambiaron desde since_token.
+        
+        Devuelve un diccionario con:
+          - token: valor a enviar en la próxima consulta
+          - reset: True si se devuelven todas las sesiones (sin token previo)
+          - updated: filas de sesiones activas nuevas o modificadas
+          - removed: IDs de registros que dejaron de estar activos
+        """
+        token = self.get_change_token()
+        
+        if since_token is None:
+            return {
+                'token': token,
+                'reset': True,
+                'updated': self.get_active_sessions(user_id),
+                'removed': []
+            }
+        
+        if token == since_token:
+            return {'token': token, 'reset': False, 'updated': [], 'removed': []}
+        
+        # Registros modificados desde el token (rango sobre el índice de seq)
+        query = "SELECT record_id FROM session_changes WHERE seq > ? AND seq <= ?"
+        changed_ids = [row['record_id'] for row in self.db_manager.fetch_all(query, (since_token, token))]
+        
+        updated = self.get_active_sessions(user_id, changed_ids)
+        active_ids = {row['id'] for row in updated}
+        
+        return {
+            'token': token,
+            'reset': False,
+            'updated': updated,
+            'removed': [record_id for record_id in changed_ids if record_id not in active_ids]
+        }
+    
     def get_historical_report(self, user_id=None, from_date=None, to_date=None):
         """Obtiene reporte histórico de tiempos"""
-        # Conectar a la base de datos
-        self.db_manager.connect()
-        
         # Preparar consulta
+        query, params = self._historical_report_query(user_id, from_date, to_date)
+        query += " ORDER BY t.date DESC, u.username, t.id"
+        
+        report_data = self.db_manager.fetch_all(query, params if params else None)
+        
+        return report_data
+    
+    def get_historical_report_page(self, user_id=None, from_date=None, to_date=None,
+                                   after=None, limit=REPORT_PAGE_SIZE):
+        """Obtiene una página del reporte histórico.
+        
+        Las filas se ordenan por (fecha descendente, usuario, ID) y la
+        paginación es por clave: after es la clave (report_key) de la última
+        fila de la página anterior, o None para la primera. Así cada página
+        cuesta lo mismo sin importar cuántas filas haya antes.
+        """
+        cache_key = ('page', user_id, from_date, to_date, after, limit, self.get_report_version())
+        page = self.report_cache.get(cache_key)
+        if page is not None:
+            return page
+        
+        query, params = self._historical_report_query(user_id, from_date, to_date)
+        
+        if after is not None:
+            date, username, record_id = after
+            # "t.date <= ?" va aparte para que el índice por fecha recorra en
+            # orden y la consulta se detenga al completar la página
+            query += """
+                AND t.date <= ?
+                AND (t.date < ? OR u.username > ? OR (u.username = ? AND t.id > ?))
+            """
+            params.extend([date, date, username, username, record_id])
+        
+        query += " ORDER BY t.date DESC, u.username, t.id LIMIT ?"
+        params.append(limit)
+        
+        page = self.db_manager.fetch_all(query, params)
+        self.report_cache.put(cache_key, page)
+        return page
+    
+    def iter_historical_report(self, user_id=None, from_date=None, to_date=None,
+                               page_size=REPORT_PAGE_SIZE):
+        """Recorre el reporte histórico completo página por página, sin cargarlo entero"""
+        after = None
+        while True:
+            page = self.get_historical_report_page(user_id, from_date, to_date, after, page_size)
+            yield from page
+            
+            if len(page) < page_size:
+                return
+            after = report_key(page[-1])
+    
+    def get_time_summary(self, user_id=None, from_date=None, to_date=None):
+        """Obtiene los totales por usuario de un rango de fechas.
+        
+        Se calcula desde time_rollups en lugar de recorrer time_records: el
+        rango se cubre con los períodos más grandes que encajan en él
+        (meses, semanas ISO y días), por lo que un año completo por usuario
+        son solo doce filas.
+        """
+        if not from_date or not to_date:
+            bounds = self.db_manager.fetch_one(
+                "SELECT MIN(period_start), MAX(period_start) FROM time_rollups WHERE period = 'day'"
+            )
+            if not bounds or bounds[0] is None:
+                return []
+            from_date = from_date or bounds[0]
+            to_date = to_date or bounds[1]
+        
+        cache_key = ('summary', user_id, from_date, to_date, self.get_report_version())
+        summary = self.report_cache.get(cache_key)
+        if summary is not None:
+            return summary
+        
+        segments = rollup_segments(from_date, to_date)
+        if not segments:
+            return []
+        
+        conditions = " OR ".join(
+            "(r.period = ? AND r.period_start BETWEEN ? AND ?)" for _ in segments
+        )
+        params = [value for segment in segments for value in segment]
+        
+        query = f"""
+            SELECT u.id as user_id, u.username, u.full_name,
+            SUM(r.sessions) as sessions,
+            SUM(r.total_work_time) as total_work_time,
+            SUM(r.total_break_time) as total_break_time,
+            SUM(r.total_lunch_time) as total_lunch_time,
+            SUM(r.total_bathroom_time) as total_bathroom_time,
+            SUM(r.total_meeting_time) as total_meeting_time
+            FROM time_rollups r
+            JOIN users u ON r.user_id = u.id
+            WHERE ({conditions})
+        """
+        
+        if user_id and user_id != -1:
+            query += " AND r.user_id = ?"
+            params.append(user_id)
+        
+        query += " GROUP BY u.id HAVING SUM(r.sessions) > 0 ORDER BY u.username"
+        
+        summary = self.db_manager.fetch_all(query, params)
+        self.report_cache.put(cache_key, summary)
+        return summary
+    
+    def get_report_version(self):
+        """Versión de los datos de los reportes; cambia cuando cambian registros o usuarios.
+        
+        Primero se consulta PRAGMA data_version (sin leer tablas): si nadie
+        confirmó cambios se reutiliza la versión anterior. Si hubo cambios
+        se leen el token de session_changes, que solo avanza cuando cambian
+        registros o actividades (no con los latidos), y el contador de
+        user_changes (altas, bajas y cambios de nombre, aunque los haga otro
+        proceso). Al cambiar la versión se vacía la caché de reportes.
+        """
+        with self._version_lock:
+            data_version = self.db_manager.data_version()
+            if data_version != self._seen_data_version:
+                self._seen_data_version = data_version
+                row = self.db_manager.fetch_one("""
+                    SELECT (SELECT COALESCE(MAX(seq), 0) FROM session_changes),
+                    (SELECT seq FROM user_changes WHERE id = 1)
+                """)
+                version = tuple(row) if row else None
+                if version != self._report_version:
+                    self._report_version = version
+                    self.report_cache.clear()
+            return self._report_version
+    
+    def count_historical_report(self, user_id=None, from_date=None, to_date=None):
+        """Cantidad de filas del reporte histórico"""
+        query, params = self._historical_report_query(user_id, from_date, to_date)
+        row = self.db_manager.fetch_one(f"SELECT COUNT(*) FROM ({query})", params)
+        return row[0] if row else 0
+    
+    def stream_historical_report(self, user_id=None, from_date=None, to_date=None):
+        """Recorre el reporte histórico completo directamente desde el cursor.
+        
+        Pensado para exportaciones: no pasa por la caché ni arma páginas.
+        Debe consumirse (o cerrarse) en el hilo que lo inicia.
+        """
+        query, params = self._historical_report_query(user_id, from_date, to_date)
+        query += " ORDER BY t.date DESC, u.username, t.id"
+        
+        return self.db_manager.iter_rows(query, params)
+    
+    def _historical_report_query(self, user_id, from_date, to_date):
+        """Consulta base (sin orden) y parámetros del reporte histórico"""
         query = """
             SELECT u.username, t.*
             FROM time_records t
@@ -207,11 +610,4 @@ class AdminController:
             query += " AND t.date <= ?"
             params.append(to_date)
         
-        query += " ORDER BY t.date DESC, u.username"
-        
-        report_data = self.db_manager.fetch_all(query, params if params else None)
-        
-        # Cerrar conexión
-        self.db_manager.disconnect()
-        
-        return report_data
\ No newline at end of file
+        return query, params
\ No newline at end of file
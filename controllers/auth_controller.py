@@ -6,18 +6,12 @@ class AuthController:
     
     def login(self, username, password):
         """Realiza la autenticación de un usuario"""
-        # Conectar a la base de datos
-        self.db_manager.connect()
-        
-        # Buscar usuario
-        query = "SELECT * FROM users WHERE username = ? AND password = ?"
+        # Buscar usuario (los desactivados no pueden iniciar sesión)
+        query = "SELECT * FROM users WHERE username = ? AND password = ? AND active = 1"
         params = (username, password)
         
         user_data = self.db_manager.fetch_one(query, params)
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
-        
         if user_data:
             # Crear objeto de usuario
             return User.from_db_row(user_data)
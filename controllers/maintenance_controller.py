@@ -0,0 +1,244 @@
+import datetime
+import os
+import socket
+import sqlite3
+import uuid
+
+from models.time_record import ACTIVITY_TYPES
+
+# Última hora conocida de una sesión: su último latido o, si no hay, su
+# última actividad o su hora de inicio (t y h son time_records y session_heartbeats)
+_LAST_KNOWN = """COALESCE(
+    h.last_seen,
+    (SELECT MAX(COALESCE(a.end_time, a.start_time))
+     FROM activity_logs a WHERE a.record_id = t.id),
+    t.login_time
+)"""
+
+
+class MaintenanceController:
+    """Tareas de mantenimiento sobre sesiones que quedaron abiertas"""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        # Identifica a este proceso como dueño de los turnos de mantenimiento
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire_lease(self, name, ttl_seconds):
+        """Toma o renueva el turno de una tarea compartida por todos los clientes.
+
+        Solo un proceso lo tiene a la vez: se obtiene si está libre, vencido
+        o ya es nuestro, y vence ttl_seconds después si no se renueva.
+        Devuelve True si este proceso tiene el turno.
+        """
+        now = datetime.datetime.now()
+        expires_at = (now + datetime.timedelta(seconds=ttl_seconds)).isoformat()
+        query = """
+            INSERT INTO maintenance_leases (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE
+            SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE maintenance_leases.owner = excluded.owner OR maintenance_leases.expires_at < ?
+        """
+
+        try:
+            with self.db_manager.connection() as connection:
+                return connection.execute(query, (name, self.owner, expires_at, now.isoformat())).rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error al tomar el turno de {name}: {e}")
+            return False
+
+    def release_lease(self, name):
+        """Libera el turno de una tarea si lo tiene este proceso"""
+        return self.db_manager.execute_query(
+            "DELETE FROM maintenance_leases WHERE name = ? AND owner = ?", (name, self.owner)
+        )
+
+    def run_auto_logout(self, idle_minutes, ttl_seconds):
+        """Ejecuta close_idle_sessions solo si este proceso tiene el turno de auto-logout"""
+        if not self.acquire_lease('auto_logout', ttl_seconds):
+            return 0
+        return self.close_idle_sessions(idle_minutes)
+
+    def reconcile_orphaned_sessions(self, stale_after_hours=12):
+        """Cierra las sesiones abiertas sin actividad desde hace stale_after_hours.
+
+        Sirve para registros que quedaron con logout_time IS NULL (y
+        actividades con end_time IS NULL) porque la aplicación se cerró de
+        forma inesperada. La hora de cierre es el último latido conocido de
+        la sesión o, si no hay, su última actividad o su hora de inicio.
+        También cierra, a su hora de salida, las actividades que quedaron
+        abiertas en registros ya cerrados. Devuelve la cantidad de sesiones
+        corregidas.
+
+        Antes de tomar el bloqueo de escritura se comprueba con lecturas
+        (por los índices parciales de sesiones y actividades abiertas) si
+        hay algo que cerrar, para que el arranque no espere a otros clientes.
+        """
+        cutoff = (datetime.datetime.now() - datetime.timedelta(hours=stale_after_hours)).isoformat()
+
+        stale_query = f"""
+            SELECT id, last_known FROM (
+                SELECT t.id, {_LAST_KNOWN} AS last_known
+                FROM time_records t
+                LEFT JOIN session_heartbeats h ON h.record_id = t.id
+                WHERE t.logout_time IS NULL
+            )
+            WHERE last_known < ?
+        """
+
+        # Actividades abiertas en registros cerrados (por ejemplo, de una
+        # sesión retomada tras un cierre inesperado)
+        closed_query = """
+            SELECT a.record_id, t.logout_time
+            FROM activity_logs a
+            JOIN time_records t ON t.id = a.record_id
+            WHERE a.end_time IS NULL AND t.logout_time IS NOT NULL
+            GROUP BY a.record_id
+        """
+
+        fixed = 0
+        for query, params in ((stale_query, (cutoff,)), (closed_query, ())):
+            if self.db_manager.fetch_one(f"SELECT 1 FROM ({query}) LIMIT 1", params):
+                fixed += self._close_sessions(
+                    f"INSERT INTO stale_sessions (record_id, close_time) {query}", params
+                )
+
+        return fixed
+
+    def close_open_activities(self, record_id):
+        """Cierra las actividades abiertas de un registro que sigue abierto.
+
+        Se usa al retomar una sesión tras un cierre inesperado: las
+        actividades que quedaron sin fin se cierran en el último latido (o
+        la última hora conocida, nunca después de ahora) y los totales se recalculan, en una sola
+        transacción y sin registrar la salida. Devuelve True si había algo
+        que cerrar.
+        """
+        if not self.db_manager.fetch_one(
+            "SELECT 1 FROM activity_logs WHERE record_id = ? AND end_time IS NULL LIMIT 1", (record_id,)
+        ):
+            return False
+
+        query = f"""
+            INSERT INTO stale_sessions (record_id, close_time)
+            SELECT t.id, MIN({_LAST_KNOWN}, ?)
+            FROM time_records t
+            LEFT JOIN session_heartbeats h ON h.record_id = t.id
+            WHERE t.id = ?
+        """
+        now = datetime.datetime.now().isoformat()
+
+        return self._close_sessions(query, (now, record_id), end_sessions=False) > 0
+
+    def close_idle_sessions(self, idle_minutes, batch_size=500):
+        """Cierra (auto-logout) las sesiones sin latido en los últimos idle_minutes.
+
+        Solo consulta session_heartbeats por su índice de last_seen, sin
+        recorrer time_records. Las sesiones se cierran en lotes de
+        batch_size, cada lote con una sola transacción, usando como hora de
+        salida el último latido. Devuelve la cantidad de sesiones cerradas.
+        """
+        cutoff = (datetime.datetime.now() - datetime.timedelta(minutes=idle_minutes)).isoformat()
+
+        # Lectura previa barata: no tomar el bloqueo de escritura si no hay nada que cerrar
+        if not self.db_manager.fetch_one(
+            "SELECT 1 FROM session_heartbeats WHERE last_seen < ? LIMIT 1", (cutoff,)
+        ):
+            return 0
+
+        query = """
+            INSERT INTO stale_sessions (record_id, close_time)
+            SELECT h.record_id, h.last_seen
+            FROM session_heartbeats h
+            JOIN time_records t ON t.id = h.record_id AND t.logout_time IS NULL
+            WHERE h.last_seen < ?
+            ORDER BY h.last_seen
+            LIMIT ?
+        """
+
+        # Latidos de sesiones ya cerradas por otra vía: solo se descartan
+        self.db_manager.execute_query("""
+            DELETE FROM session_heartbeats
+            WHERE last_seen < ? AND EXISTS (
+                SELECT 1 FROM time_records t
+                WHERE t.id = session_heartbeats.record_id AND t.logout_time IS NOT NULL
+            )
+        """, (cutoff,))
+
+        total_closed = 0
+        while True:
+            closed = self._close_sessions(query, (cutoff, batch_size))
+            total_closed += closed
+            if closed < batch_size:
+                break
+
+        return total_closed
+
+    def _close_sessions(self, select_query, params, end_sessions=True):
+        """Cierra en bloque las sesiones que inserta select_query en stale_sessions.
+
+        Todo ocurre en una transacción y con instrucciones sobre conjuntos:
+        se cierran las actividades abiertas, se recalculan los totales a
+        partir de activity_logs y, con end_sessions, se registra la hora de
+        salida (sin cambiar la de los registros que ya la tenían).
+        """
+        totals = ",\n".join(
+            f"SUM(CASE WHEN activity_type = '{activity_type}' THEN duration ELSE 0 END) AS {activity_type}"
+            for activity_type in ACTIVITY_TYPES
+        )
+        assignments = ",\n".join(
+            f"total_{activity_type}_time = COALESCE(x.{activity_type}, total_{activity_type}_time)"
+            for activity_type in ACTIVITY_TYPES
+        )
+
+        try:
+            with self.db_manager.transaction():
+                self.db_manager.execute_query("""
+                    CREATE TEMP TABLE IF NOT EXISTS stale_sessions (
+                        record_id INTEGER PRIMARY KEY,
+                        close_time TEXT NOT NULL
+                    )
+                """)
+                self.db_manager.execute_query("DELETE FROM stale_sessions")
+                self.db_manager.execute_query(select_query, params)
+
+                closed = self.db_manager.fetch_one("SELECT COUNT(*) FROM stale_sessions")[0]
+                if not closed:
+                    return 0
+
+                # Cerrar actividades abiertas (nunca antes de su inicio)
+                self.db_manager.execute_query("""
+                    UPDATE activity_logs AS a
+                    SET end_time = MAX(s.close_time, a.start_time),
+                        duration = MAX(0, CAST((julianday(s.close_time) - julianday(a.start_time)) * 86400 AS INTEGER))
+                    FROM stale_sessions s
+                    WHERE a.record_id = s.record_id AND a.end_time IS NULL
+                """)
+
+                # Recalcular totales y registrar la salida
+                logout = (
+                    ",\nlogout_time = COALESCE(t.logout_time, MAX(s.close_time, COALESCE(t.login_time, s.close_time)))"
+                    if end_sessions else ""
+                )
+                self.db_manager.execute_query(f"""
+                    UPDATE time_records AS t
+                    SET {assignments}{logout}
+                    FROM stale_sessions s
+                    LEFT JOIN (
+                        SELECT record_id, {totals}
+                        FROM activity_logs
+                        WHERE record_id IN (SELECT record_id FROM stale_sessions)
+                        GROUP BY record_id
+                    ) x ON x.record_id = s.record_id
+                    WHERE t.id = s.record_id
+                """)
+
+                if end_sessions:
+                    self.db_manager.execute_query(
+                        "DELETE FROM session_heartbeats WHERE record_id IN (SELECT record_id FROM stale_sessions)"
+                    )
+        except Exception as e:
+            print(f"Error al cerrar sesiones huérfanas: {e}")
+            return 0
+
+        return closed
\ No newline at end of file
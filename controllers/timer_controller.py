@@ -1,19 +1,41 @@
 import datetime
-from models.time_record import TimeRecord, ActivityLog
+import os
+from models.time_record import TimeRecord, ActivityLog, ACTIVITY_TYPES
+from controllers.activity_writer import ActivityWriter, apply_activity_events, replay_journal
+from controllers.maintenance_controller import MaintenanceController
+from database.event_journal import EventJournal
 
 class TimerController:
-    def __init__(self, db_manager, user):
+    ACTIVITY_TYPES = ACTIVITY_TYPES
+    
+    def __init__(self, db_manager, user, write_behind=False, journal_dir=None):
         self.db_manager = db_manager
         self.user = user
         self.current_record_id = None
         self.current_activity_id = None
         self.current_activity = "work"
         self.start_time = datetime.datetime.now()
+        self.activity_open = False
+        
+        # Diario local: cada transición se guarda primero en disco y luego en la
+        # base de datos, así no se pierde si esta está bloqueada o no disponible
+        self.journal = None
+        if journal_dir:
+            self.journal = EventJournal(os.path.join(journal_dir, f"events_{user.id}.journal"))
+        
+        # En modo write-behind las transiciones se guardan en lotes en segundo plano
+        self.writer = None
+        if write_behind:
+            self.writer = ActivityWriter(db_manager, journal=self.journal)
+        
+        # Totales de la sesión en memoria (actividades ya finalizadas)
+        self.login_time = None
+        self.totals = dict.fromkeys(self.ACTIVITY_TYPES, 0)
     
     def start_session(self):
         """Inicia una sesión de trabajo"""
-        # Conectar a la base de datos
-        self.db_manager.connect()
+        # Aplicar primero lo que haya quedado pendiente en el diario local
+        self.replay_pending()
         
         # Verificar si ya existe un registro para hoy
         today = datetime.date.today().strftime("%Y-%m-%d")
@@ -26,8 +48,20 @@ class TimerController:
         existing_record = self.db_manager.fetch_one(query, params)
         
         if existing_record:
-            # Ya existe un registro abierto
+            # Ya existe un registro abierto: si la aplicación se cerró de forma
+            # inesperada pueden quedar actividades sin fin; se cierran en el
+            # último latido y se recalculan los totales antes de continuar
+            if MaintenanceController(self.db_manager).close_open_activities(existing_record['id']):
+                existing_record = self.db_manager.fetch_one(
+                    "SELECT * FROM time_records WHERE id = ?", (existing_record['id'],)
+                )
+            
             self.current_record_id = existing_record['id']
+            self.login_time = existing_record['login_time']
+            
+            # Cargar una sola vez los totales acumulados
+            for activity_type in self.ACTIVITY_TYPES:
+                self.totals[activity_type] = existing_record[f"total_{activity_type}_time"]
         else:
             # Crear nuevo registro
             now = datetime.datetime.now().isoformat()
@@ -39,21 +73,16 @@ class TimerController:
             """
             params = (self.user.id, now, today)
             
-            self.db_manager.execute_query(query, params)
-            
-            # Obtener el ID del registro creado
-            query = "SELECT last_insert_rowid() as id"
-            result = self.db_manager.fetch_one(query)
+            record_id = self.db_manager.execute_insert(query, params)
             
-            if result:
-                self.current_record_id = result['id']
+            if record_id:
+                self.current_record_id = record_id
+                self.login_time = now
+                self.totals = dict.fromkeys(self.ACTIVITY_TYPES, 0)
         
         # Iniciar actividad de trabajo
         self.start_activity("work")
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
-        
         return self.current_record_id is not None
     
     def end_session(self):
@@ -61,145 +90,200 @@ class TimerController:
         if not self.current_record_id:
             return False
         
-        # Conectar a la base de datos
-        self.db_manager.connect()
-        
-        # Finalizar la actividad actual
-        self.end_activity()
-        
-        # Actualizar registro
-        now = datetime.datetime.now().isoformat()
+        # Cerrar actividad y registro con un solo evento (una transacción)
+        event = self._transition_event("end", datetime.datetime.now())
         
-        query = """
-            UPDATE time_records 
-            SET logout_time = ? 
-            WHERE id = ?
-        """
-        params = (now, self.current_record_id)
+        try:
+            self._record(event)
+        except Exception as e:
+            print(f"Error al finalizar sesión: {e}")
+            return False
         
-        result = self.db_manager.execute_query(query, params)
+        self._finish_activity(event)
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
+        # En modo write-behind, no salir sin haber guardado todo
+        if self.writer:
+            # Con diario local no hace falta esperar indefinidamente: lo pendiente ya está en disco
+            flushed = self.writer.close(timeout=5.0 if self.journal else None)
+            return flushed or self.journal is not None
         
-        return result
+        return True
     
     def start_activity(self, activity_type):
-        """Inicia una nueva actividad"""
+        """Inicia una nueva actividad, cerrando la anterior en la misma transacción"""
         if not self.current_record_id:
             return False
         
-        # Conectar a la base de datos
-        self.db_manager.connect()
-        
-        # Finalizar actividad anterior si existe
-        if self.current_activity_id:
-            self.end_activity()
-        
-        # Registrar inicio de actividad
-        now = datetime.datetime.now().isoformat()
-        
-        query = """
-            INSERT INTO activity_logs 
-            (record_id, activity_type, start_time) 
-            VALUES (?, ?, ?)
-        """
-        params = (self.current_record_id, activity_type, now)
-        
-        self.db_manager.execute_query(query, params)
-        
-        # Obtener el ID de la actividad creada
-        query = "SELECT last_insert_rowid() as id"
-        result = self.db_manager.fetch_one(query)
+        now = datetime.datetime.now()
+        event = self._transition_event("switch", now)
+        event['activity'] = activity_type
+        
+        try:
+            # Cierre, totales e inserción se confirman juntos (un solo commit)
+            activity_id = self._record(event)
+        except Exception as e:
+            print(f"Error al iniciar actividad: {e}")
+            return False
         
-        if result:
-            self.current_activity_id = result['id']
-            self.current_activity = activity_type
-            self.start_time = datetime.datetime.now()
+        # Actualizar el estado en memoria solo después de confirmar
+        self._finish_activity(event)
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
+        self.current_activity_id = activity_id
+        self.current_activity = activity_type
+        self.start_time = now
+        self.activity_open = True
         
-        return self.current_activity_id is not None
+        return True
     
     def end_activity(self):
         """Finaliza la actividad actual"""
-        if not self.current_activity_id:
+        if not self.activity_open:
             return False
         
-        # Conectar a la base de datos
-        self.db_manager.connect()
+        event = self._transition_event("stop", datetime.datetime.now())
         
-        # Calcular duración
-        now = datetime.datetime.now()
-        duration = int((now - self.start_time).total_seconds())
+        try:
+            self._record(event)
+        except Exception as e:
+            print(f"Error al finalizar actividad: {e}")
+            return False
         
-        # Actualizar actividad
-        query = """
-            UPDATE activity_logs 
-            SET end_time = ?, duration = ? 
-            WHERE id = ?
-        """
-        params = (now.isoformat(), duration, self.current_activity_id)
+        self._finish_activity(event)
         
-        self.db_manager.execute_query(query, params)
+        return True
+    
+    def change_activity(self, activity_type):
+        """Cambia a una nueva actividad en una única transacción"""
+        return self.start_activity(activity_type)
+    
+    def heartbeat(self):
+        """Registra que la sesión sigue activa (una escritura mínima por sesión).
         
-        # Actualizar tiempos totales en el registro
-        time_field = f"total_{self.current_activity}_time"
+        El latido solo se guarda mientras el registro siga abierto, para no
+        revivir una sesión que ya se cerró. Devuelve False si el registro ya
+        está cerrado (por ejemplo por el auto-logout); los errores de la base
+        de datos se propagan y no cuentan como cierre.
+        """
+        record_id = self.current_record_id
+        if not record_id:
+            return False
         
-        query = f"""
-            UPDATE time_records 
-            SET {time_field} = {time_field} + ? 
-            WHERE id = ?
+        query = """
+            INSERT INTO session_heartbeats (record_id, last_seen)
+            SELECT id, ? FROM time_records WHERE id = ? AND logout_time IS NULL
+            ON CONFLICT (record_id) DO UPDATE SET last_seen = excluded.last_seen
         """
-        params = (duration, self.current_record_id)
+        params = (datetime.datetime.now().isoformat(), record_id)
         
-        self.db_manager.execute_query(query, params)
+        with self.db_manager.connection() as connection:
+            return connection.execute(query, params).rowcount > 0
+    
+    def abandon_session(self):
+        """Olvida la sesión en memoria cuando el registro ya se cerró en la base de datos.
         
-        # Resetear actividad actual
-        self.current_activity_id = None
+        No registra un evento de fin: la salida y los totales ya los fijó
+        quien cerró el registro. Lo pendiente del modo write-behind se
+        guarda igual (los eventos del registro cerrado se descartan).
+        """
+        if self.writer:
+            self.writer.close(timeout=5.0 if self.journal else None)
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
+        self.current_record_id = None
+        self.current_activity_id = None
+        self.activity_open = False
+    
+    def flush(self, timeout=None):
+        """Guarda los eventos pendientes del modo write-behind"""
+        if self.writer:
+            return self.writer.flush(timeout)
+        return self.replay_pending()
+    
+    def replay_pending(self):
+        """Intenta aplicar los eventos que quedaron en el diario local"""
+        if not self.journal or not self.journal.has_pending() or self.writer:
+            return True
+        
+        try:
+            replay_journal(self.db_manager, self.journal)
+        except Exception as e:
+            print(f"No se pudo reproducir el diario local: {e}")
+            return False
         
         return True
     
-    def change_activity(self, activity_type):
-        """Cambia a una nueva actividad"""
-        self.end_activity()
-        return self.start_activity(activity_type)
+    def _transition_event(self, event_type, now):
+        """Crea el evento de una transición, incluyendo la actividad que se cierra"""
+        event = {
+            'type': event_type,
+            'record_id': self.current_record_id,
+            'time': now.isoformat(),
+            'ended': None,
+            'ended_start': None,
+            'duration': None
+        }
+        
+        if self.activity_open:
+            event['ended'] = self.current_activity
+            event['ended_start'] = self.start_time.isoformat()
+            event['duration'] = int((now - self.start_time).total_seconds())
+        
+        return event
     
-    def get_current_statistics(self):
-        """Obtiene estadísticas de la sesión actual"""
-        if not self.current_record_id:
-            return None
+    def _record(self, event):
+        """Guarda un evento en la base de datos o lo encola en modo write-behind.
         
-        # Conectar a la base de datos
-        self.db_manager.connect()
+        Con diario local el evento se escribe primero en disco; si luego la base
+        de datos falla queda pendiente y se reproduce en el próximo intento.
+        Devuelve el ID de la actividad creada (None si quedó pendiente).
+        """
+        if self.journal:
+            self.journal.append(event)
         
-        # Obtener datos del registro actual
-        query = "SELECT * FROM time_records WHERE id = ?"
-        params = (self.current_record_id,)
+        if self.writer:
+            self.writer.submit(event)
+            return None
         
-        record = self.db_manager.fetch_one(query, params)
+        if not self.journal:
+            return apply_activity_events(self.db_manager, [event])
         
-        # Cerrar conexión
-        self.db_manager.disconnect()
+        try:
+            # Aplica en orden este evento y cualquier otro pendiente
+            return replay_journal(self.db_manager, self.journal)
+        except Exception as e:
+            print(f"Base de datos no disponible, el evento quedó en el diario local: {e}")
+            return None
+    
+    def _finish_activity(self, event):
+        """Refleja en memoria el cierre de la actividad registrado por el evento"""
+        if event['ended']:
+            self.totals[event['ended']] += event['duration']
         
-        if not record:
+        self.current_activity_id = None
+        self.activity_open = False
+    
+    def get_current_statistics(self):
+        """Obtiene estadísticas de la sesión actual sin consultar la base de datos"""
+        if not self.current_record_id or not self.login_time:
             return None
         
+        now = datetime.datetime.now()
+        totals = dict(self.totals)
+        
+        # Sumar el tiempo transcurrido de la actividad en curso
+        if self.activity_open:
+            totals[self.current_activity] += int((now - self.start_time).total_seconds())
+        
         # Calcular tiempo total
-        login_time = datetime.datetime.fromisoformat(record['login_time'])
-        total_time = int((datetime.datetime.now() - login_time).total_seconds())
+        login_time = datetime.datetime.fromisoformat(self.login_time)
+        total_time = int((now - login_time).total_seconds())
         
         # Retornar estadísticas
         return {
-            'login_time': record['login_time'],
-            'total_work_time': record['total_work_time'],
-            'total_break_time': record['total_break_time'],
-            'total_lunch_time': record['total_lunch_time'],
-            'total_bathroom_time': record['total_bathroom_time'],
-            'total_meeting_time': record['total_meeting_time'],
+            'login_time': self.login_time,
+            'total_work_time': totals['work'],
+            'total_break_time': totals['break'],
+            'total_lunch_time': totals['lunch'],
+            'total_bathroom_time': totals['bathroom'],
+            'total_meeting_time': totals['meeting'],
             'total_time': total_time
         }
\ No newline at end of file
@@ -0,0 +1,37 @@
+import threading
+
+
+class UserDirectory:
+    """Caché de usuarios por ID compartida por las pantallas de administración.
+
+    Cada usuario se lee una sola vez y se reutiliza hasta que se llama a
+    invalidate(), lo que hacen las operaciones que modifican usuarios.
+    Las listas de usuarios no pasan por aquí: los filtros y la tabla
+    buscan por prefijo con AdminController.search_users.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.version = 0
+        self._by_id = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Un usuario por su ID, o None si no existe"""
+        with self._lock:
+            if user_id in self._by_id:
+                return self._by_id[user_id]
+            version = self.version
+
+        user = self.db_manager.fetch_one("SELECT * FROM users WHERE id = ?", (user_id,))
+
+        with self._lock:
+            if user is not None and version == self.version:
+                self._by_id[user_id] = user
+        return user
+
+    def invalidate(self):
+        """Descarta la copia en memoria; la próxima lectura consulta la base de datos"""
+        with self._lock:
+            self._by_id = {}
+            self.version += 1
\ No newline at end of file
@@ -1,103 +1,291 @@
 import sqlite3
 import os
 import datetime
+import queue
+import threading
+from contextlib import contextmanager
+
+from database.migrations import LATEST_VERSION, get_schema_version, run_migrations
 
 class DatabaseManager:
-    def __init__(self, db_path):
+    # PRAGMAs aplicados una sola vez a cada conexión del pool
+    CONNECTION_PRAGMAS = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA busy_timeout = 5000",
+        "PRAGMA cache_size = -16000",
+        "PRAGMA mmap_size = 268435456",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA foreign_keys = ON",  # ON DELETE CASCADE de registros y actividades
+    )
+
+    def __init__(self, db_path, pool_size=4):
         self.db_path = db_path
-        self.connection = None
-        self.cursor = None
-    
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._local = threading.local()
+        self._version_connection = None
+        self._version_lock = threading.Lock()
+
+    def _create_connection(self):
+        """Crea una conexión nueva y la configura para uso prolongado"""
+        # Sin transacciones implícitas: se controlan con transaction()
+        connection = sqlite3.connect(self.db_path, check_same_thread=False,
+                                     isolation_level=None)
+        connection.row_factory = sqlite3.Row  # Para acceder a las columnas por nombre
+        for pragma in self.CONNECTION_PRAGMAS:
+            connection.execute(pragma)
+        return connection
+
+    def _acquire(self):
+        """Obtiene una conexión del pool para el hilo actual"""
+        if getattr(self._local, 'connection', None) is None:
+            try:
+                self._local.connection = self._pool.get_nowait()
+            except queue.Empty:
+                self._local.connection = self._create_connection()
+            self._local.depth = 0
+            self._local.savepoints = 0
+
+        self._local.depth += 1
+        return self._local.connection
+
+    def _release(self):
+        """Devuelve la conexión del hilo actual al pool cuando ya no se usa"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            return
+
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+
+        self._local.connection = None
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    @contextmanager
+    def connection(self):
+        """Entrega una conexión del pool; las llamadas anidadas reutilizan la misma"""
+        connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            self._release()
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa varias instrucciones en una única transacción atómica.
+
+        Las transacciones anidadas se convierten en savepoints. Si ocurre un
+        error dentro del bloque se revierte todo y se propaga la excepción.
+        """
+        with self.connection() as connection:
+            if connection.in_transaction:
+                with self._savepoint(connection):
+                    yield connection
+                return
+
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            else:
+                connection.execute("COMMIT")
+
+    @contextmanager
+    def _savepoint(self, connection):
+        """Abre un savepoint dentro de la transacción en curso"""
+        self._local.savepoints += 1
+        name = f"sp_{self._local.savepoints}"
+        connection.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException:
+            connection.execute(f"ROLLBACK TO {name}")
+            connection.execute(f"RELEASE {name}")
+            raise
+        else:
+            connection.execute(f"RELEASE {name}")
+        finally:
+            self._local.savepoints -= 1
+
+    def in_transaction(self):
+        """Indica si el hilo actual tiene una transacción abierta"""
+        connection = getattr(self._local, 'connection', None)
+        return connection is not None and connection.in_transaction
+
     def connect(self):
-        """Establece conexión con la base de datos"""
+        """Reserva una conexión del pool para el hilo actual"""
         try:
-            self.connection = sqlite3.connect(self.db_path)
-            self.connection.row_factory = sqlite3.Row  # Para acceder a las columnas por nombre
-            self.cursor = self.connection.cursor()
+            self._acquire()
             return True
         except sqlite3.Error as e:
             print(f"Error al conectar a la base de datos: {e}")
             return False
-    
+
     def disconnect(self):
-        """Cierra la conexión con la base de datos"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-            self.cursor = None
-    
+        """Libera la conexión reservada con connect()"""
+        self._release()
+
+    def close_all(self):
+        """Cierra todas las conexiones inactivas del pool"""
+        while True:
+            try:
+                connection = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+
+        with self._version_lock:
+            if self._version_connection is not None:
+                self._version_connection.close()
+                self._version_connection = None
+
+    def data_version(self):
+        """Número que cambia cada vez que cualquier conexión confirma cambios.
+
+        Se lee PRAGMA data_version en una conexión propia que nunca escribe,
+        de modo que cuenta tanto las escrituras del pool como las de otros
+        procesos. Es muy barato: no lee ninguna tabla.
+        """
+        with self._version_lock:
+            if self._version_connection is None:
+                self._version_connection = sqlite3.connect(
+                    self.db_path, check_same_thread=False, isolation_level=None
+                )
+            return self._version_connection.execute("PRAGMA data_version").fetchone()[0]
+
     def execute_query(self, query, params=None):
-        """Ejecuta una consulta SQL"""
+        """Ejecuta una consulta SQL.
+
+        Fuera de una transacción se confirma de inmediato; dentro de
+        transaction() forma parte de ella y los errores se propagan.
+        """
         try:
-            if not self.connection:
-                self.connect()
-            
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-                
-            self.connection.commit()
+            with self.connection() as connection:
+                connection.execute(query, params or ())
             return True
         except sqlite3.Error as e:
+            if self.in_transaction():
+                raise
             print(f"Error al ejecutar consulta: {e}")
             return False
-    
+
+    def execute_insert(self, query, params=None):
+        """Ejecuta un INSERT y devuelve el ID de la fila creada"""
+        try:
+            with self.connection() as connection:
+                return connection.execute(query, params or ()).lastrowid
+        except sqlite3.Error as e:
+            if self.in_transaction():
+                raise
+            print(f"Error al ejecutar consulta: {e}")
+            return None
+
+    def execute_many(self, query, params_list):
+        """Ejecuta la misma consulta para varios parámetros en una sola transacción"""
+        try:
+            with self.transaction() as connection:
+                connection.executemany(query, params_list)
+            return True
+        except sqlite3.Error as e:
+            if self.in_transaction():
+                raise
+            print(f"Error al ejecutar consultas: {e}")
+            return False
+
+    def executescript(self, script):
+        """Ejecuta un script con varias instrucciones en una sola transacción"""
+        try:
+            with self.transaction() as connection:
+                for statement in self.split_statements(script):
+                    connection.execute(statement)
+            return True
+        except sqlite3.Error as e:
+            if self.in_transaction():
+                raise
+            print(f"Error al ejecutar script: {e}")
+            return False
+
+    @staticmethod
+    def split_statements(script):
+        """Divide un script SQL en instrucciones completas"""
+        statement = ""
+        for part in script.split(';'):
+            statement += part + ';'
+            if sqlite3.complete_statement(statement):
+                if statement.strip(' \t\r\n;'):
+                    yield statement.strip()
+                statement = ""
+
     def fetch_all(self, query, params=None):
         """Ejecuta una consulta y devuelve todos los resultados"""
         try:
-            if not self.connection:
-                self.connect()
-            
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-                
-            return self.cursor.fetchall()
+            with self.connection() as connection:
+                return connection.execute(query, params or ()).fetchall()
         except sqlite3.Error as e:
+            if self.in_transaction():
+                raise
             print(f"Error al realizar consulta: {e}")
             return []
-    
+
     def fetch_one(self, query, params=None):
         """Ejecuta una consulta y devuelve un solo resultado"""
         try:
-            if not self.connection:
-                self.connect()
-            
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-                
-            return self.cursor.fetchone()
+            with self.connection() as connection:
+                return connection.execute(query, params or ()).fetchone()
         except sqlite3.Error as e:
+            if self.in_transaction():
+                raise
             print(f"Error al realizar consulta: {e}")
             return None
-    
+
+    def iter_rows(self, query, params=None, batch_size=1000):
+        """Recorre el resultado de una consulta con un cursor, por lotes.
+
+        No carga el resultado completo en memoria. El generador conserva la
+        conexión del hilo hasta agotarse, por lo que debe consumirse (o
+        cerrarse con close()) en el mismo hilo. Los errores se propagan.
+        """
+        with self.connection() as connection:
+            cursor = connection.execute(query, params or ())
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield from rows
+            finally:
+                cursor.close()
+
     def setup_database(self):
-        """Configura la base de datos con las tablas necesarias"""
-        if not os.path.exists(os.path.dirname(self.db_path)):
-            os.makedirs(os.path.dirname(self.db_path))
-        
-        self.connect()
-        
-        # Leer y ejecutar el esquema SQL
-        with open('database/schema.sql', 'r') as f:
-            schema = f.read()
-        
-        # Dividir por punto y coma para ejecutar múltiples instrucciones
-        statements = schema.split(';')
-        for statement in statements:
-            if statement.strip():
-                self.execute_query(statement)
-        
+        """Configura la base de datos con las tablas necesarias.
+
+        En un arranque en caliente solo se lee PRAGMA user_version; el esquema
+        y el usuario administrador se preparan únicamente al instalar o al
+        actualizar a una versión nueva del esquema.
+        """
+        if os.path.exists(self.db_path) and get_schema_version(self) == LATEST_VERSION:
+            return
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        # Crear o actualizar el esquema aplicando las migraciones pendientes
+        run_migrations(self)
+
         # Verificar si existe el usuario administrador, si no, crearlo
         admin = self.fetch_one("SELECT * FROM users WHERE username = ?", ("admin",))
         if not admin:
             self.execute_query(
                 "INSERT INTO users (username, password, full_name, role) VALUES (?, ?, ?, ?)",
                 ("admin", "admin123", "Administrator", "admin")
-            )
-        
-        self.disconnect()
\ No newline at end of file
+            )
\ No newline at end of file
@@ -0,0 +1,125 @@
+import os
+import threading
+import uuid
+
+
+class EventJournal:
+    """Diario local de solo anexado para eventos de actividad.
+
+    Cada evento se guarda en una línea separada por tabuladores y se hace
+    fsync antes de devolver el control, de modo que sobrevive a un cierre
+    inesperado aunque la base de datos compartida no esté disponible. Los
+    eventos confirmados en la base de datos se retiran con acknowledge();
+    cuando no queda ninguno pendiente el archivo se trunca.
+    """
+
+    FIELDS = ('id', 'type', 'record_id', 'time', 'ended', 'ended_start', 'duration', 'activity')
+    INT_FIELDS = ('record_id', 'duration')
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        journal_dir = os.path.dirname(path)
+        if journal_dir and not os.path.exists(journal_dir):
+            os.makedirs(journal_dir)
+
+        self._pending = self._read()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def append(self, event):
+        """Agrega un evento al diario y lo fuerza a disco; le asigna un ID si no tiene"""
+        if not event.get('id'):
+            event['id'] = uuid.uuid4().hex
+
+        with self._lock:
+            self._file.write(self._encode(event))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending.append(event)
+
+        return event['id']
+
+    def pending(self):
+        """Eventos aún no confirmados en la base de datos, en orden"""
+        with self._lock:
+            return list(self._pending)
+
+    def has_pending(self):
+        """Indica si hay eventos sin confirmar"""
+        with self._lock:
+            return bool(self._pending)
+
+    def acknowledge(self, events):
+        """Retira del diario los eventos ya confirmados en la base de datos"""
+        applied_ids = {event['id'] for event in events}
+
+        with self._lock:
+            self._pending = [event for event in self._pending if event['id'] not in applied_ids]
+
+            if not self._pending:
+                self._file.truncate(0)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            else:
+                self._rewrite()
+
+    def close(self):
+        """Cierra el archivo del diario"""
+        with self._lock:
+            self._file.close()
+
+    def _rewrite(self):
+        """Reescribe de forma atómica el diario con los eventos pendientes"""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for event in self._pending:
+                f.write(self._encode(event))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._file.close()
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _read(self):
+        """Lee los eventos pendientes; ignora una última línea incompleta"""
+        if not os.path.exists(self.path):
+            return []
+
+        events = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # Escritura interrumpida por un cierre inesperado
+                event = self._decode(line)
+                if event:
+                    events.append(event)
+        return events
+
+    @classmethod
+    def _encode(cls, event):
+        values = []
+        for field in cls.FIELDS:
+            value = event.get(field)
+            values.append('' if value is None else str(value))
+        return '\t'.join(values) + '\n'
+
+    @classmethod
+    def _decode(cls, line):
+        values = line.rstrip('\n').split('\t')
+        if len(values) != len(cls.FIELDS):
+            return None
+
+        event = {}
+        for field, value in zip(cls.FIELDS, values):
+            if value == '':
+                event[field] = None
+            elif field in cls.INT_FIELDS:
+                try:
+                    event[field] = int(value)
+                except ValueError:
+                    return None
+            else:
+                event[field] = value
+        return event
\ No newline at end of file
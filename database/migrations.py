@@ -0,0 +1,390 @@
+import os
+import sqlite3
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+
+
+def _base_schema():
+    """Lee el esquema base desde schema.sql"""
+    with open(SCHEMA_PATH, 'r') as f:
+        return f.read()
+
+
+# Índices de time_records y activity_logs (migración 2)
+_RECORD_INDEXES = """
+        -- Sesión abierta de un usuario en una fecha (start_session)
+        CREATE INDEX IF NOT EXISTS idx_time_records_user_date
+            ON time_records (user_id, date, logout_time);
+
+        -- Reportes históricos por rango de fechas
+        CREATE INDEX IF NOT EXISTS idx_time_records_date
+            ON time_records (date);
+
+        -- Sesiones activas ordenadas por hora de inicio
+        CREATE INDEX IF NOT EXISTS idx_time_records_open
+            ON time_records (login_time) WHERE logout_time IS NULL;
+
+        -- Actividades de un registro y actividad en curso
+        CREATE INDEX IF NOT EXISTS idx_activity_logs_record
+            ON activity_logs (record_id, end_time);
+    """
+
+# Triggers que numeran los cambios de cada sesión (migración 5)
+_SESSION_CHANGE_TRIGGERS = """
+        CREATE TRIGGER IF NOT EXISTS trg_time_records_insert_change
+        AFTER INSERT ON time_records
+        BEGIN
+            INSERT INTO session_changes (record_id, seq)
+            VALUES (NEW.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM session_changes))
+            ON CONFLICT (record_id) DO UPDATE SET seq = excluded.seq;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_time_records_update_change
+        AFTER UPDATE ON time_records
+        BEGIN
+            INSERT INTO session_changes (record_id, seq)
+            VALUES (NEW.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM session_changes))
+            ON CONFLICT (record_id) DO UPDATE SET seq = excluded.seq;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_time_records_delete_change
+        AFTER DELETE ON time_records
+        BEGIN
+            INSERT INTO session_changes (record_id, seq)
+            VALUES (OLD.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM session_changes))
+            ON CONFLICT (record_id) DO UPDATE SET seq = excluded.seq;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_activity_logs_insert_change
+        AFTER INSERT ON activity_logs
+        BEGIN
+            INSERT INTO session_changes (record_id, seq)
+            VALUES (NEW.record_id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM session_changes))
+            ON CONFLICT (record_id) DO UPDATE SET seq = excluded.seq;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_activity_logs_end_change
+        AFTER UPDATE OF end_time ON activity_logs
+        BEGIN
+            INSERT INTO session_changes (record_id, seq)
+            VALUES (NEW.record_id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM session_changes))
+            ON CONFLICT (record_id) DO UPDATE SET seq = excluded.seq;
+        END;
+    """
+
+# Índice parcial de actividades en curso (migración 6)
+_OPEN_ACTIVITY_INDEX = """
+        -- Solo contiene las actividades abiertas: pequeño y cubre la consulta
+        -- de sesiones activas (actividad actual y su hora de inicio)
+        CREATE INDEX IF NOT EXISTS idx_activity_logs_open
+            ON activity_logs (record_id, start_time, activity_type)
+            WHERE end_time IS NULL;
+    """
+
+
+# Columnas de tiempo por actividad de time_records (y de time_rollups)
+_TIME_COLUMNS = ("total_work_time", "total_break_time", "total_lunch_time",
+                 "total_bathroom_time", "total_meeting_time")
+
+# Inicio de cada período a partir de una fecha: día, semana ISO (lunes) y mes
+_ROLLUP_PERIODS = (
+    ("day", "{date}"),
+    ("week", "date({date}, 'weekday 0', '-6 days')"),
+    ("month", "date({date}, 'start of month')"),
+)
+
+
+def _rollup_upsert(row, sign):
+    """SQL de trigger que suma (sign='') o resta (sign='-') una fila a sus tres períodos"""
+    periods = "\n                UNION ALL ".join(
+        f"SELECT '{period}' AS period, {expr.format(date=row + '.date')} AS period_start"
+        for period, expr in _ROLLUP_PERIODS
+    )
+    values = ", ".join(f"{sign}COALESCE({row}.{column}, 0)" for column in _TIME_COLUMNS)
+    updates = ",\n                ".join(
+        f"{column} = {column} + excluded.{column}" for column in _TIME_COLUMNS
+    )
+    return f"""
+            INSERT INTO time_rollups (period, period_start, user_id, sessions, {", ".join(_TIME_COLUMNS)})
+            SELECT p.period, p.period_start, {row}.user_id, {sign}1, {values}
+            FROM ({periods}) p
+            WHERE true
+            ON CONFLICT (period, period_start, user_id) DO UPDATE SET
+                sessions = sessions + excluded.sessions,
+                {updates};"""
+
+
+def _rollup_triggers():
+    """Triggers que mantienen time_rollups al cambiar time_records"""
+    # Al borrar solo se revisan las tres filas afectadas (por clave primaria)
+    emptied = " OR ".join(
+        f"(period = '{period}' AND period_start = {expr.format(date='OLD.date')})"
+        for period, expr in _ROLLUP_PERIODS
+    )
+
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS trg_time_records_insert_rollup
+        AFTER INSERT ON time_records
+        BEGIN{_rollup_upsert("NEW", "")}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_time_records_update_rollup
+        AFTER UPDATE OF user_id, date, {", ".join(_TIME_COLUMNS)} ON time_records
+        BEGIN{_rollup_upsert("OLD", "-")}{_rollup_upsert("NEW", "")}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_time_records_delete_rollup
+        AFTER DELETE ON time_records
+        BEGIN{_rollup_upsert("OLD", "-")}
+            DELETE FROM time_rollups
+            WHERE user_id = OLD.user_id AND sessions <= 0 AND ({emptied});
+        END;
+    """
+
+
+def _rollups_schema():
+    """Tabla time_rollups, su carga inicial y los triggers que la mantienen"""
+    backfill = "\n".join(f"""
+        INSERT INTO time_rollups (period, period_start, user_id, sessions, {", ".join(_TIME_COLUMNS)})
+        SELECT '{period}', {expr.format(date='date')}, user_id, COUNT(*),
+            {", ".join(f"COALESCE(SUM({column}), 0)" for column in _TIME_COLUMNS)}
+        FROM time_records
+        GROUP BY 2, user_id;""" for period, expr in _ROLLUP_PERIODS)
+
+    return f"""
+        -- period: 'day', 'week' (period_start = lunes) o 'month' (día 1)
+        CREATE TABLE IF NOT EXISTS time_rollups (
+            period TEXT NOT NULL CHECK (period IN ('day', 'week', 'month')),
+            period_start TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            total_work_time INTEGER NOT NULL DEFAULT 0,
+            total_break_time INTEGER NOT NULL DEFAULT 0,
+            total_lunch_time INTEGER NOT NULL DEFAULT 0,
+            total_bathroom_time INTEGER NOT NULL DEFAULT 0,
+            total_meeting_time INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (period, period_start, user_id)
+        ) WITHOUT ROWID;
+
+        -- Carga inicial a partir de los registros existentes
+        {backfill}
+
+        -- Mantenimiento incremental: cada cambio en time_records suma su diferencia
+        {_rollup_triggers()}
+    """
+
+
+def _cascade_schema():
+    """Reconstruye time_records y activity_logs con ON DELETE CASCADE.
+
+    SQLite no permite cambiar una clave foránea con ALTER TABLE: se crean
+    las tablas nuevas, se copian los datos y se reemplazan las viejas,
+    volviendo a crear sus índices y triggers. Las filas que ya apuntaban a
+    un usuario o registro inexistente no se copian (no podrían borrarse en
+    cascada).
+    """
+    record_columns = ", ".join(("id", "user_id", "login_time", "logout_time") + _TIME_COLUMNS + ("date",))
+    activity_columns = "id, record_id, activity_type, start_time, end_time, duration"
+
+    return f"""
+        CREATE TABLE time_records_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            login_time TIMESTAMP,
+            logout_time TIMESTAMP,
+            total_work_time INTEGER DEFAULT 0,  -- In seconds
+            total_break_time INTEGER DEFAULT 0,  -- In seconds
+            total_lunch_time INTEGER DEFAULT 0,  -- In seconds
+            total_bathroom_time INTEGER DEFAULT 0,  -- In seconds
+            total_meeting_time INTEGER DEFAULT 0,  -- In seconds
+            date TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        );
+
+        INSERT INTO time_records_new ({record_columns})
+        SELECT {record_columns} FROM time_records
+        WHERE user_id IN (SELECT id FROM users);
+
+        CREATE TABLE activity_logs_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            record_id INTEGER NOT NULL,
+            activity_type TEXT NOT NULL CHECK (activity_type IN ('work', 'break', 'lunch', 'bathroom', 'meeting')),
+            start_time TIMESTAMP NOT NULL,
+            end_time TIMESTAMP,
+            duration INTEGER DEFAULT 0,  -- In seconds
+            FOREIGN KEY (record_id) REFERENCES time_records (id) ON DELETE CASCADE
+        );
+
+        INSERT INTO activity_logs_new ({activity_columns})
+        SELECT {activity_columns} FROM activity_logs
+        WHERE record_id IN (SELECT id FROM time_records_new);
+
+        -- Conservar el contador de AUTOINCREMENT para no reutilizar IDs borrados
+        DELETE FROM sqlite_sequence WHERE name IN ('time_records_new', 'activity_logs_new');
+        UPDATE sqlite_sequence SET name = name || '_new' WHERE name IN ('time_records', 'activity_logs');
+
+        DROP TABLE activity_logs;
+        DROP TABLE time_records;
+        ALTER TABLE time_records_new RENAME TO time_records;
+        ALTER TABLE activity_logs_new RENAME TO activity_logs;
+
+        -- Datos derivados de las filas que no se copiaron
+        DELETE FROM session_heartbeats WHERE record_id NOT IN (SELECT id FROM time_records);
+        DELETE FROM time_rollups WHERE user_id NOT IN (SELECT id FROM users);
+
+        {_RECORD_INDEXES}
+        {_OPEN_ACTIVITY_INDEX}
+        {_SESSION_CHANGE_TRIGGERS}
+        {_rollup_triggers()}
+
+        -- Los usuarios desactivados conservan su historial pero no pueden iniciar sesión
+        ALTER TABLE users ADD COLUMN active INTEGER NOT NULL DEFAULT 1 CHECK (active IN (0, 1));
+    """
+
+
+# Migraciones en orden: (versión, descripción, SQL o función que lo devuelve).
+# La versión aplicada se guarda en PRAGMA user_version. Nunca modificar una
+# migración ya publicada: agregar una nueva al final de la lista.
+MIGRATIONS = [
+    (1, "Esquema base", _base_schema),
+    (2, "Índices para sesiones activas y reportes", _RECORD_INDEXES),
+    (3, "Eventos de actividad ya aplicados (reproducción idempotente)", """
+        CREATE TABLE IF NOT EXISTS applied_events (
+            event_id TEXT PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID;
+    """),
+    (4, "Último latido conocido de cada sesión abierta", """
+        CREATE TABLE IF NOT EXISTS session_heartbeats (
+            record_id INTEGER PRIMARY KEY,
+            last_seen TIMESTAMP NOT NULL,
+            FOREIGN KEY (record_id) REFERENCES time_records (id) ON DELETE CASCADE
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_session_heartbeats_last_seen
+            ON session_heartbeats (last_seen);
+    """),
+    (5, "Contador de cambios por sesión para el panel en tiempo real", """
+        -- Último número de cambio de cada registro; MAX(seq) es el token actual
+        CREATE TABLE IF NOT EXISTS session_changes (
+            record_id INTEGER PRIMARY KEY,
+            seq INTEGER NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_session_changes_seq
+            ON session_changes (seq);
+    """ + _SESSION_CHANGE_TRIGGERS),
+    (6, "Índice parcial de actividades en curso", _OPEN_ACTIVITY_INDEX),
+    (7, "Totales acumulados por usuario y día, semana ISO y mes", _rollups_schema),
+    (8, "Índices para búsqueda de usuarios por prefijo", """
+        -- LIKE 'texto%' sin distinguir mayúsculas se resuelve como rango en estos índices
+        CREATE INDEX IF NOT EXISTS idx_users_username_nocase
+            ON users (username COLLATE NOCASE);
+
+        CREATE INDEX IF NOT EXISTS idx_users_full_name_nocase
+            ON users (full_name COLLATE NOCASE);
+    """),
+    (9, "Borrado en cascada de registros y usuarios inactivos", _cascade_schema),
+    (10, "Cambios de sesión también al corregir o borrar actividades", """
+        -- Con estos triggers, cualquier cambio en las actividades de un
+        -- registro avanza su seq (lo usan las cachés por día)
+        CREATE TRIGGER IF NOT EXISTS trg_activity_logs_update_change
+        AFTER UPDATE OF record_id, activity_type, start_time ON activity_logs
+        BEGIN
+            INSERT INTO session_changes (record_id, seq)
+            VALUES (NEW.record_id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM session_changes))
+            ON CONFLICT (record_id) DO UPDATE SET seq = excluded.seq;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_activity_logs_delete_change
+        AFTER DELETE ON activity_logs
+        BEGIN
+            INSERT INTO session_changes (record_id, seq)
+            VALUES (OLD.record_id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM session_changes))
+            ON CONFLICT (record_id) DO UPDATE SET seq = excluded.seq;
+        END;
+    """),
+    (11, "Turnos de tareas de mantenimiento compartidas", """
+        -- Un solo proceso (el dueño vigente) ejecuta cada tarea periódica
+        CREATE TABLE IF NOT EXISTS maintenance_leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at TEXT NOT NULL
+        );
+    """),
+    (12, "Contador de cambios de usuarios para la caché de reportes", """
+        -- Una sola fila; avanza con altas, bajas y cambios de nombre (que
+        -- se muestran en los reportes), también desde otros procesos
+        CREATE TABLE IF NOT EXISTS user_changes (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            seq INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO user_changes (id, seq) VALUES (1, 0);
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_insert_change
+        AFTER INSERT ON users
+        BEGIN
+            UPDATE user_changes SET seq = seq + 1 WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_update_change
+        AFTER UPDATE OF username, full_name ON users
+        BEGIN
+            UPDATE user_changes SET seq = seq + 1 WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_delete_change
+        AFTER DELETE ON users
+        BEGIN
+            UPDATE user_changes SET seq = seq + 1 WHERE id = 1;
+        END;
+    """),
+]
+
+# Migraciones que reconstruyen tablas: se aplican con las claves foráneas
+# desactivadas (PRAGMA foreign_keys no tiene efecto dentro de una
+# transacción) y se verifica la integridad antes de confirmarlas.
+_TABLE_REBUILDS = {9}
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(db_manager):
+    """Obtiene la versión del esquema guardada en la base de datos"""
+    row = db_manager.fetch_one("PRAGMA user_version")
+    return row[0] if row else 0
+
+
+def run_migrations(db_manager):
+    """Aplica las migraciones pendientes, cada una en su propia transacción"""
+    current_version = get_schema_version(db_manager)
+    applied = []
+
+    for version, description, source in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        sql = source() if callable(source) else source
+        rebuild = version in _TABLE_REBUILDS
+
+        try:
+            # La misma conexión para el PRAGMA y la transacción
+            with db_manager.connection() as connection:
+                if rebuild:
+                    connection.execute("PRAGMA foreign_keys = OFF")
+                try:
+                    with db_manager.transaction():
+                        db_manager.executescript(sql)
+                        if rebuild and db_manager.fetch_all("PRAGMA foreign_key_check"):
+                            raise sqlite3.IntegrityError("claves foráneas inválidas después de reconstruir")
+                        db_manager.execute_query(f"PRAGMA user_version = {version}")
+                finally:
+                    if rebuild:
+                        connection.execute("PRAGMA foreign_keys = ON")
+        except Exception as e:
+            print(f"Error al aplicar la migración {version} ({description}): {e}")
+            raise
+
+        applied.append(version)
+
+    return applied
\ No newline at end of file
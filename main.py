@@ -3,8 +3,11 @@ import os
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtGui import QIcon
 from database.db_manager import DatabaseManager
+from controllers.activity_writer import replay_journal_dir
+from controllers.maintenance_controller import MaintenanceController
 from views.login_view import LoginView
 from utils.config import load_config
+from utils.scheduler import PeriodicTask
 
 def main():
     # Cargar configuraciones
@@ -14,6 +17,25 @@ def main():
     db_manager = DatabaseManager(config['database_path'])
     db_manager.setup_database()
     
+    # Aplicar eventos de actividad que quedaron en el diario local (también
+    # los del directorio por defecto si se desactivó el diario después)
+    replay_journal_dir(db_manager, config.get('journal_dir') or 'data/journal')
+    
+    # Cerrar sesiones que quedaron abiertas por cierres inesperados
+    maintenance_controller = MaintenanceController(db_manager)
+    maintenance_controller.reconcile_orphaned_sessions(config.get('stale_session_hours', 12))
+    
+    # Cerrar periódicamente las sesiones sin latido (auto_logout en minutos).
+    # Todos los clientes programan la tarea, pero solo la ejecuta el que tiene
+    # el turno; si ese proceso termina, otro lo toma al vencer.
+    refresh_interval = config.get('refresh_interval', 30)
+    auto_logout_task = PeriodicTask(
+        refresh_interval,
+        lambda: maintenance_controller.run_auto_logout(config.get('auto_logout', 60), 3 * refresh_interval),
+        "AutoLogout"
+    )
+    auto_logout_task.start()
+    
     # Inicializar aplicación
     app = QApplication(sys.argv)
     app.setWindowIcon(QIcon('resources/images/app_icon.png'))
@@ -23,7 +45,10 @@ def main():
     login_window = LoginView(db_manager)
     login_window.show()
     
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    auto_logout_task.stop()
+    maintenance_controller.release_lease('auto_logout')
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,8 @@
 import datetime
 
+# Tipos de actividad admitidos por activity_logs y sus columnas total_<tipo>_time
+ACTIVITY_TYPES = ("work", "break", "lunch", "bathroom", "meeting")
+
 class TimeRecord:
     def __init__(self, id=None, user_id=None, login_time=None, logout_time=None, 
                  total_work_time=0, total_break_time=0, total_lunch_time=0,
@@ -1,11 +1,12 @@
 class User:
-    def __init__(self, id=None, username=None, password=None, full_name=None, role=None, created_at=None):
+    def __init__(self, id=None, username=None, password=None, full_name=None, role=None, created_at=None, active=True):
         self.id = id
         self.username = username
         self.password = password
         self.full_name = full_name
         self.role = role
         self.created_at = created_at
+        self.active = active
     
     @classmethod
     def from_db_row(cls, row):
@@ -19,7 +20,8 @@ class User:
             password=row['password'],
             full_name=row['full_name'],
             role=row['role'],
-            created_at=row['created_at']
+            created_at=row['created_at'],
+            active=bool(row['active'])
         )
     
     def is_admin(self):
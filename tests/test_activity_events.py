@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from controllers.activity_writer import apply_activity_events, replay_journal_dir
+from controllers.auth_controller import AuthController
+from controllers.timer_controller import TimerController
+from database.db_manager import DatabaseManager
+from database.event_journal import EventJournal
+
+
+class ActivityEventsTestCase(unittest.TestCase):
+    """Base de datos temporal con un registro abierto y una actividad de trabajo en curso"""
+
+    LOGIN = '2025-03-03T09:00:00'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_manager = DatabaseManager(os.path.join(self.directory, 'test.db'))
+        self.db_manager.setup_database()
+
+        self.user_id = self.db_manager.fetch_one("SELECT id FROM users WHERE username = 'admin'")[0]
+        self.record_id = self.db_manager.execute_insert(
+            "INSERT INTO time_records (user_id, login_time, date) VALUES (?, ?, '2025-03-03')",
+            (self.user_id, self.LOGIN)
+        )
+        apply_activity_events(self.db_manager, [self.switch(None, self.LOGIN, 'work')])
+
+    def tearDown(self):
+        self.db_manager.close_all()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def switch(self, ended, time, activity, ended_start=None, duration=None, event_id=None):
+        return {
+            'id': event_id, 'type': 'switch', 'record_id': self.record_id, 'time': time,
+            'ended': ended, 'ended_start': ended_start, 'duration': duration, 'activity': activity,
+        }
+
+    def record(self):
+        return self.db_manager.fetch_one("SELECT * FROM time_records WHERE id = ?", (self.record_id,))
+
+    def activities(self):
+        return self.db_manager.fetch_all(
+            "SELECT activity_type, start_time, end_time, duration FROM activity_logs "
+            "WHERE record_id = ? ORDER BY start_time", (self.record_id,)
+        )
+
+
+class ActivitySwitchTest(ActivityEventsTestCase):
+    """Cambio de actividad atómico (user-007)"""
+
+    def test_switch_closes_previous_activity_and_updates_totals(self):
+        apply_activity_events(self.db_manager, [
+            self.switch('work', '2025-03-03T10:00:00', 'break', self.LOGIN, 3600)
+        ])
+
+        activities = self.activities()
+        self.assertEqual([tuple(row) for row in activities], [
+            ('work', self.LOGIN, '2025-03-03T10:00:00', 3600),
+            ('break', '2025-03-03T10:00:00', None, 0),
+        ])
+        self.assertEqual(self.record()['total_work_time'], 3600)
+
+    def test_failed_batch_is_rolled_back(self):
+        with self.assertRaises(ValueError):
+            apply_activity_events(self.db_manager, [
+                self.switch('work', '2025-03-03T10:00:00', 'break', self.LOGIN, 3600),
+                self.switch('nap', '2025-03-03T10:15:00', 'work', '2025-03-03T10:00:00', 900),
+            ])
+
+        self.assertEqual([tuple(row) for row in self.activities()], [('work', self.LOGIN, None, 0)])
+        self.assertEqual(self.record()['total_work_time'], 0)
+
+    def test_already_closed_activity_is_not_counted_twice(self):
+        event = self.switch('work', '2025-03-03T10:00:00', 'break', self.LOGIN, 3600)
+        apply_activity_events(self.db_manager, [event])
+        apply_activity_events(self.db_manager, [dict(event, activity='lunch')])
+
+        self.assertEqual(self.record()['total_work_time'], 3600)
+
+    def test_events_for_closed_record_are_discarded(self):
+        self.db_manager.execute_query(
+            "UPDATE time_records SET logout_time = '2025-03-03T09:30:00' WHERE id = ?", (self.record_id,)
+        )
+        apply_activity_events(self.db_manager, [
+            self.switch('work', '2025-03-03T10:00:00', 'break', self.LOGIN, 3600)
+        ])
+
+        self.assertEqual(len(self.activities()), 1)
+        self.assertEqual(self.record()['total_work_time'], 0)
+
+    def test_timer_controller_switch(self):
+        user = AuthController(self.db_manager).login('admin', 'admin123')
+        self.db_manager.execute_query("DELETE FROM time_records")
+
+        timer = TimerController(self.db_manager, user)
+        self.assertTrue(timer.start_session())
+        self.assertTrue(timer.change_activity('meeting'))
+        self.assertTrue(timer.end_session())
+
+        rows = self.db_manager.fetch_all(
+            "SELECT activity_type, end_time IS NOT NULL FROM activity_logs ORDER BY id"
+        )
+        self.assertEqual([tuple(row) for row in rows], [('work', 1), ('meeting', 1)])
+        self.assertIsNotNone(
+            self.db_manager.fetch_one("SELECT logout_time FROM time_records")[0]
+        )
+
+
+class JournalReplayTest(ActivityEventsTestCase):
+    """Reproducción idempotente del diario local (user-009)"""
+
+    def setUp(self):
+        super().setUp()
+        self.journal_dir = os.path.join(self.directory, 'journal')
+        self.journal_path = os.path.join(self.journal_dir, 'events_1.journal')
+
+    def write_journal(self, events):
+        journal = EventJournal(self.journal_path)
+        for event in events:
+            journal.append(event)
+        journal.close()
+
+    def test_replay_applies_and_clears_journal(self):
+        self.write_journal([
+            self.switch('work', '2025-03-03T10:00:00', 'break', self.LOGIN, 3600),
+            self.switch('break', '2025-03-03T10:10:00', 'work', '2025-03-03T10:00:00', 600),
+        ])
+
+        self.assertEqual(replay_journal_dir(self.db_manager, self.journal_dir), 2)
+        self.assertEqual(os.path.getsize(self.journal_path), 0)
+        self.assertEqual(self.record()['total_work_time'], 3600)
+        self.assertEqual(self.record()['total_break_time'], 600)
+
+    def test_replaying_applied_events_is_a_no_op(self):
+        event = self.switch('work', '2025-03-03T10:00:00', 'break', self.LOGIN, 3600, event_id='e1')
+        apply_activity_events(self.db_manager, [dict(event)])
+
+        # Cierre inesperado después de confirmar pero antes de retirar el evento del diario
+        self.write_journal([dict(event)])
+        replay_journal_dir(self.db_manager, self.journal_dir)
+
+        self.assertEqual(len(self.activities()), 2)
+        self.assertEqual(self.record()['total_work_time'], 3600)
+
+    def test_incomplete_last_line_is_ignored(self):
+        self.write_journal([self.switch('work', '2025-03-03T10:00:00', 'break', self.LOGIN, 3600)])
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write('cortado\tswitch')
+
+        journal = EventJournal(self.journal_path)
+        try:
+            self.assertEqual(len(journal.pending()), 1)
+        finally:
+            journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,31 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from database.db_manager import DatabaseManager
+from utils.analytics import INTERVAL_DTYPE, ActivityIntervals, analyze, summarize
+
+
+class EmptyRangeTest(unittest.TestCase):
+    """Un rango sin actividades no debe fallar (instalación nueva)"""
+
+    def test_summarize_without_intervals(self):
+        intervals = ActivityIntervals(np.zeros(0, dtype=INTERVAL_DTYPE))
+        self.assertEqual(summarize(intervals), {'users': [], 'teams': []})
+        self.assertEqual(summarize(intervals, groups={1: "Soporte"}), {'users': [], 'teams': []})
+
+    def test_analyze_on_empty_database(self):
+        directory = tempfile.mkdtemp()
+        db_manager = DatabaseManager(os.path.join(directory, 'empty.db'))
+        db_manager.setup_database()
+        try:
+            result = analyze(db_manager, '2025-01-01', '2025-01-31')
+        finally:
+            db_manager.close_all()
+        self.assertEqual(result, {'users': [], 'teams': []})
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,142 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from database.db_manager import DatabaseManager
+from database.migrations import LATEST_VERSION, get_schema_version
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Base de datos nueva en un directorio temporal para cada prueba"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, 'test.db')
+        self.db_manager = DatabaseManager(self.db_path)
+        self.db_manager.setup_database()
+
+    def tearDown(self):
+        self.db_manager.close_all()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def count(self, table):
+        return self.db_manager.fetch_one(f"SELECT COUNT(*) FROM {table}")[0]
+
+
+class ConnectionPoolTest(DatabaseTestCase):
+    """Pool de conexiones (user-001)"""
+
+    def test_connection_is_reused(self):
+        with self.db_manager.connection() as first:
+            pass
+        with self.db_manager.connection() as second:
+            pass
+        self.assertIs(first, second)
+
+    def test_nested_calls_share_the_thread_connection(self):
+        with self.db_manager.connection() as outer:
+            with self.db_manager.connection() as inner:
+                self.assertIs(outer, inner)
+
+    def test_threads_get_their_own_connection(self):
+        connections = []
+
+        def worker():
+            with self.db_manager.connection() as connection:
+                connections.append(connection)
+                barrier.wait()
+
+        barrier = threading.Barrier(2)
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIsNot(connections[0], connections[1])
+
+    def test_pragmas_are_applied(self):
+        with self.db_manager.connection() as connection:
+            self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            self.assertEqual(connection.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+
+    def test_warm_start_skips_migrations(self):
+        self.assertEqual(get_schema_version(self.db_manager), LATEST_VERSION)
+
+        reopened = DatabaseManager(self.db_path)
+        try:
+            reopened.setup_database()
+            self.assertEqual(reopened.fetch_one("SELECT COUNT(*) FROM users")[0], 1)
+        finally:
+            reopened.close_all()
+
+
+class TransactionTest(DatabaseTestCase):
+    """Transacciones, savepoints y escrituras en lote (user-002)"""
+
+    def add_user(self, username):
+        self.db_manager.execute_query(
+            "INSERT INTO users (username, password, full_name, role) VALUES (?, 'p', ?, 'employee')",
+            (username, username)
+        )
+
+    def test_commit(self):
+        with self.db_manager.transaction():
+            self.add_user('ana')
+            self.add_user('bruno')
+        self.assertEqual(self.count('users'), 3)
+
+    def test_error_rolls_back_everything(self):
+        with self.assertRaises(RuntimeError):
+            with self.db_manager.transaction():
+                self.add_user('ana')
+                raise RuntimeError("falla")
+        self.assertEqual(self.count('users'), 1)
+        self.assertFalse(self.db_manager.in_transaction())
+
+    def test_sql_error_propagates_inside_transaction(self):
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.db_manager.transaction():
+                self.add_user('ana')
+                self.add_user('ana')
+        self.assertEqual(self.count('users'), 1)
+
+    def test_sql_error_outside_transaction_returns_false(self):
+        self.add_user('ana')
+        self.assertFalse(self.db_manager.execute_query(
+            "INSERT INTO users (username, password, full_name, role) VALUES ('ana', 'p', 'x', 'employee')"
+        ))
+
+    def test_nested_transaction_is_a_savepoint(self):
+        with self.db_manager.transaction():
+            self.add_user('ana')
+            with self.assertRaises(RuntimeError):
+                with self.db_manager.transaction():
+                    self.add_user('bruno')
+                    raise RuntimeError("falla")
+            self.add_user('carla')
+
+        usernames = [row[0] for row in self.db_manager.fetch_all("SELECT username FROM users ORDER BY username")]
+        self.assertEqual(usernames, ['admin', 'ana', 'carla'])
+
+    def test_execute_many_is_atomic(self):
+        query = "INSERT INTO users (username, password, full_name, role) VALUES (?, 'p', ?, 'employee')"
+        self.assertTrue(self.db_manager.execute_many(query, [('ana', 'Ana'), ('bruno', 'Bruno')]))
+        self.assertFalse(self.db_manager.execute_many(query, [('carla', 'Carla'), ('carla', 'Carla')]))
+        self.assertEqual(self.count('users'), 3)
+
+    def test_executescript(self):
+        self.assertTrue(self.db_manager.executescript("""
+            INSERT INTO users (username, password, full_name, role) VALUES ('ana', 'p', 'Ana; A.', 'employee');
+            INSERT INTO users (username, password, full_name, role) VALUES ('bruno', 'p', 'Bruno', 'employee');
+        """))
+        self.assertEqual(
+            self.db_manager.fetch_one("SELECT full_name FROM users WHERE username = 'ana'")[0], 'Ana; A.'
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,202 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from controllers.admin_controller import AdminController, rollup_segments
+from controllers.auth_controller import AuthController
+from database.db_manager import DatabaseManager
+
+ROLLUP_TOTALS = """
+    SELECT COUNT(*), SUM(total_work_time), SUM(total_break_time)
+    FROM time_records WHERE user_id = ? AND date BETWEEN ? AND ?
+"""
+
+
+class TriggerTestCase(unittest.TestCase):
+    """Base de datos temporal con dos empleados"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_manager = DatabaseManager(os.path.join(self.directory, 'test.db'))
+        self.db_manager.setup_database()
+        self.admin_controller = AdminController(self.db_manager)
+
+        for username in ('ana', 'bruno'):
+            self.admin_controller.add_user(username, 'p', username.title(), 'employee')
+        self.ana, self.bruno = (
+            self.db_manager.fetch_one("SELECT id FROM users WHERE username = ?", (username,))[0]
+            for username in ('ana', 'bruno')
+        )
+
+    def tearDown(self):
+        self.db_manager.close_all()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def add_record(self, user_id, date, work=0, brk=0, logout=True):
+        return self.db_manager.execute_insert(
+            """
+            INSERT INTO time_records
+            (user_id, login_time, logout_time, date, total_work_time, total_break_time)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (user_id, f"{date}T09:00:00", f"{date}T17:00:00" if logout else None, date, work, brk)
+        )
+
+    def count(self, query, params=()):
+        return self.db_manager.fetch_one(query, params)[0]
+
+
+class ChangeFeedTest(TriggerTestCase):
+    """Cambios incrementales de las sesiones activas (user-012)"""
+
+    def test_changes_since_token(self):
+        first = self.admin_controller.get_active_session_changes()
+        self.assertTrue(first['reset'])
+        self.assertEqual(first['updated'], [])
+
+        record_id = self.add_record(self.ana, '2025-03-03', logout=False)
+        changes = self.admin_controller.get_active_session_changes(first['token'])
+        self.assertEqual([row['id'] for row in changes['updated']], [record_id])
+        self.assertEqual(changes['removed'], [])
+
+        unchanged = self.admin_controller.get_active_session_changes(changes['token'])
+        self.assertEqual((unchanged['updated'], unchanged['removed']), ([], []))
+        self.assertEqual(unchanged['token'], changes['token'])
+
+        self.db_manager.execute_query(
+            "UPDATE time_records SET logout_time = '2025-03-03T17:00:00' WHERE id = ?", (record_id,)
+        )
+        closed = self.admin_controller.get_active_session_changes(changes['token'])
+        self.assertEqual(closed['updated'], [])
+        self.assertEqual(closed['removed'], [record_id])
+
+    def test_heartbeats_do_not_advance_the_token(self):
+        record_id = self.add_record(self.ana, '2025-03-03', logout=False)
+        token = self.admin_controller.get_change_token()
+
+        self.db_manager.execute_query(
+            "INSERT INTO session_heartbeats (record_id, last_seen) VALUES (?, '2025-03-03T09:05:00')",
+            (record_id,)
+        )
+        self.assertEqual(self.admin_controller.get_change_token(), token)
+
+        self.db_manager.execute_query(
+            "INSERT INTO activity_logs (record_id, activity_type, start_time) VALUES (?, 'work', ?)",
+            (record_id, '2025-03-03T09:00:00')
+        )
+        self.assertGreater(self.admin_controller.get_change_token(), token)
+
+    def test_user_changes_invalidate_report_version(self):
+        version = self.admin_controller.get_report_version()
+        self.admin_controller.update_user(self.ana, None, 'Ana María', 'employee')
+        self.assertNotEqual(self.admin_controller.get_report_version(), version)
+
+
+class RollupTest(TriggerTestCase):
+    """time_rollups mantenida por triggers (user-015)"""
+
+    def assert_rollups_match(self, user_id, from_date, to_date):
+        expected = self.db_manager.fetch_one(ROLLUP_TOTALS, (user_id, from_date, to_date))
+        summary = {
+            row['user_id']: row
+            for row in self.admin_controller.get_time_summary(user_id, from_date, to_date)
+        }
+        if expected[0] == 0:
+            self.assertNotIn(user_id, summary)
+            return
+        row = summary[user_id]
+        self.assertEqual(
+            (row['sessions'], row['total_work_time'], row['total_break_time']), tuple(expected)
+        )
+
+    def test_insert_update_delete(self):
+        ids = [self.add_record(self.ana, f"2025-01-{day:02}", work=3600, brk=60 * day)
+               for day in range(1, 32)]
+        self.add_record(self.ana, '2025-02-03', work=100)
+        self.add_record(self.bruno, '2025-01-15', work=7200)
+
+        self.db_manager.execute_query(
+            "UPDATE time_records SET total_work_time = total_work_time + 60 WHERE id = ?", (ids[9],)
+        )
+        self.db_manager.execute_query(
+            "UPDATE time_records SET date = '2025-02-10', user_id = ? WHERE id = ?", (self.bruno, ids[20])
+        )
+        self.db_manager.execute_query("DELETE FROM time_records WHERE id = ?", (ids[4],))
+
+        for user_id in (self.ana, self.bruno):
+            for from_date, to_date in [('2025-01-01', '2025-02-28'), ('2025-01-06', '2025-01-19'),
+                                       ('2025-01-05', '2025-02-03'), ('2025-02-11', '2025-02-28')]:
+                self.assert_rollups_match(user_id, from_date, to_date)
+
+    def test_empty_periods_are_removed(self):
+        record_id = self.add_record(self.ana, '2025-03-03', work=10)
+        self.db_manager.execute_query("DELETE FROM time_records WHERE id = ?", (record_id,))
+        self.assertEqual(self.count("SELECT COUNT(*) FROM time_rollups"), 0)
+
+    def test_segments_cover_the_range_once(self):
+        one_day = datetime.timedelta(days=1)
+        for from_date, to_date in [('2025-01-01', '2025-12-31'), ('2024-12-30', '2025-03-05'),
+                                   ('2025-02-14', '2025-02-14'), ('2025-01-06', '2025-01-12')]:
+            days = []
+            for period, first, last in rollup_segments(from_date, to_date):
+                start = datetime.date.fromisoformat(first)
+                while start <= datetime.date.fromisoformat(last):
+                    if period == 'day':
+                        end = start
+                    elif period == 'week':
+                        self.assertEqual(start.weekday(), 0)
+                        end = start + 6 * one_day
+                    else:
+                        self.assertEqual(start.day, 1)
+                        end = (start.replace(day=28) + 4 * one_day).replace(day=1) - one_day
+                    while start <= end:
+                        days.append(start)
+                        start += one_day
+
+            expected = datetime.date.fromisoformat(from_date)
+            for day in sorted(days):
+                self.assertEqual(day, expected)
+                expected += one_day
+            self.assertEqual(expected - one_day, datetime.date.fromisoformat(to_date))
+            self.assertEqual(len(days), len(set(days)))
+
+
+class BulkUserTest(TriggerTestCase):
+    """Operaciones masivas de usuarios y borrado en cascada (user-022)"""
+
+    def test_delete_cascades_to_records_activities_and_rollups(self):
+        record_id = self.add_record(self.ana, '2025-03-03', work=60)
+        self.db_manager.execute_query(
+            "INSERT INTO activity_logs (record_id, activity_type, start_time) VALUES (?, 'work', ?)",
+            (record_id, '2025-03-03T09:00:00')
+        )
+        self.add_record(self.bruno, '2025-03-03', work=60)
+
+        self.assertEqual(self.admin_controller.delete_users([self.ana, self.ana]), 1)
+
+        self.assertEqual(self.count("SELECT COUNT(*) FROM time_records WHERE user_id = ?", (self.ana,)), 0)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM activity_logs"), 0)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM time_rollups WHERE user_id = ?", (self.ana,)), 0)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM time_rollups WHERE user_id = ?", (self.bruno,)), 3)
+
+    def test_chunked_updates(self):
+        self.assertEqual(
+            self.admin_controller.deactivate_users([self.ana, self.bruno], chunk_size=1), 2
+        )
+        self.assertIsNone(AuthController(self.db_manager).login('ana', 'p'))
+
+        # Los ya activos no cuentan como modificados
+        self.assertEqual(self.admin_controller.activate_users([self.ana]), 1)
+        self.assertEqual(self.admin_controller.activate_users([self.ana]), 0)
+        self.assertIsNotNone(AuthController(self.db_manager).login('ana', 'p'))
+
+    def test_change_role(self):
+        self.assertEqual(self.admin_controller.change_users_role([self.ana, self.bruno], 'admin'), 2)
+        with self.assertRaises(ValueError):
+            self.admin_controller.change_users_role([self.ana], 'root')
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,287 @@
+"""Estadísticas de actividades calculadas con NumPy.
+
+Los intervalos de activity_logs de un rango de fechas se cargan una sola
+vez en arreglos (inicio y fin en segundos, usuario, actividad, registro) y
+todas las métricas se calculan con operaciones vectorizadas, sin recorrer
+las filas en Python:
+
+  - duración media, mediana y p95 de los descansos
+  - proporción del tiempo en cada actividad
+  - cambios de actividad por hora registrada
+
+por usuario y por equipo (todos los usuarios del rango, o los grupos que
+se indiquen).
+
+Uso sin interfaz:
+
+    python -m utils.analytics --from 2025-01-01 --to 2025-12-31 --format csv
+"""
+import argparse
+import csv
+import datetime
+import json
+import sys
+from contextlib import closing
+
+import numpy as np
+
+# Código numérico de cada actividad (posición en la tupla)
+ACTIVITIES = ('work', 'break', 'lunch', 'bathroom', 'meeting')
+
+INTERVAL_DTYPE = np.dtype([
+    ('start', 'i8'), ('end', 'i8'), ('user_id', 'i8'), ('activity', 'i1'), ('record_id', 'i8'),
+])
+
+
+def _epoch_seconds(column):
+    """Segundos desde 1970 calculados en SQLite.
+
+    julianday acepta tanto 'AAAA-MM-DDTHH:MM:SS.ffffff' como
+    'AAAA-MM-DD HH:MM:SS' y es algo más rápido que strftime('%s').
+    """
+    return f"CAST(round((julianday({column}) - 2440587.5) * 86400) AS INTEGER)"
+
+
+_ACTIVITY_CODES = " ".join(f"WHEN '{name}' THEN {code}" for code, name in enumerate(ACTIVITIES))
+
+INTERVALS_QUERY = f"""
+    SELECT {_epoch_seconds('a.start_time')},
+    {_epoch_seconds('COALESCE(a.end_time, ?)')},
+    t.user_id,
+    CASE a.activity_type {_ACTIVITY_CODES} END,
+    a.record_id
+    FROM time_records t
+    JOIN activity_logs a ON a.record_id = t.id
+    WHERE t.date BETWEEN ? AND ? {{user_filter}}
+"""
+
+STAT_FIELDS = (
+    ['intervals', 'tracked_time', 'break_count', 'break_mean', 'break_median', 'break_p95']
+    + [f'share_{activity}' for activity in ACTIVITIES]
+    + ['switches', 'switches_per_hour']
+)
+
+# Filas leídas del cursor por lote
+FETCH_SIZE = 10000
+
+
+class ActivityIntervals:
+    """Intervalos de actividad en arreglos paralelos de NumPy.
+
+    start y end están en segundos (hora local tratada como UTC, así que
+    sirven para duraciones y para la hora del día), activity es el índice
+    en ACTIVITIES y user es la posición de cada intervalo en user_ids.
+    """
+
+    def __init__(self, data):
+        self.start = data['start']
+        self.end = np.maximum(data['end'], data['start'])  # fin anterior al inicio = 0 s
+        self.activity = data['activity'].astype(np.intp)
+        self.record_id = data['record_id']
+        self.user_ids, self.user = np.unique(data['user_id'], return_inverse=True)
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+def load_intervals(db_manager, from_date, to_date, user_id=None, now=None):
+    """Carga los intervalos de las sesiones entre dos fechas (inclusive).
+
+    Las actividades en curso terminan en now (por defecto, ahora). Las filas
+    se leen como tuplas directamente del cursor a un arreglo estructurado,
+    sin crear objetos por fila.
+    """
+    now = (now or datetime.datetime.now()).isoformat()
+    params = [now, from_date, to_date]
+    user_filter = ""
+    if user_id and user_id != -1:
+        user_filter = "AND t.user_id = ?"
+        params.append(user_id)
+
+    with db_manager.connection() as connection:
+        cursor = connection.cursor()
+        cursor.row_factory = None  # Tuplas simples: np.fromiter las copia sin conversión
+        with closing(cursor):
+            cursor.arraysize = FETCH_SIZE
+            cursor.execute(INTERVALS_QUERY.format(user_filter=user_filter), params)
+            data = np.fromiter(_fetch_batches(cursor), dtype=INTERVAL_DTYPE)
+
+    return ActivityIntervals(data)
+
+
+def _fetch_batches(cursor):
+    while True:
+        rows = cursor.fetchmany()
+        if not rows:
+            return
+        yield from rows
+
+
+def summarize(intervals, groups=None):
+    """Calcula las estadísticas por usuario y por equipo.
+
+    groups es opcional: {user_id: nombre del equipo}. Sin groups, todos los
+    usuarios forman un único equipo "Todos". Devuelve un diccionario con
+    'users' y 'teams', listas de diccionarios con STAT_FIELDS más user_id o
+    team. Sin intervalos, ambas listas quedan vacías.
+    """
+    if len(intervals) == 0:
+        return {'users': [], 'teams': []}
+
+    user_stats = _group_stats(intervals, intervals.user, len(intervals.user_ids))
+    users = [dict(user_id=int(user_id), **stats) for user_id, stats in zip(intervals.user_ids, user_stats)]
+
+    if groups is None:
+        names = ["Todos"]
+        team_of_user = np.zeros(len(intervals.user_ids), dtype=np.intp)
+    else:
+        labels = [groups.get(int(user_id), "Sin equipo") for user_id in intervals.user_ids]
+        names, team_of_user = np.unique(np.array(labels, dtype=object), return_inverse=True)
+        names = list(names)
+
+    team_stats = _group_stats(intervals, team_of_user[intervals.user], len(names))
+    teams = [dict(team=name, **stats) for name, stats in zip(names, team_stats)]
+
+    return {'users': users, 'teams': teams}
+
+
+def _group_stats(intervals, labels, size):
+    """STAT_FIELDS de cada grupo; labels indica el grupo de cada intervalo"""
+    duration = intervals.duration
+    activity = intervals.activity
+
+    # Tiempo por (grupo, actividad) en una sola pasada (bincount da enteros si no hay pesos)
+    per_activity = np.bincount(
+        labels * len(ACTIVITIES) + activity, weights=duration, minlength=size * len(ACTIVITIES)
+    ).reshape(size, len(ACTIVITIES)).astype(np.float64)
+    tracked = per_activity.sum(axis=1)
+    shares = np.divide(per_activity, tracked[:, None], out=np.zeros_like(per_activity), where=tracked[:, None] > 0)
+
+    # Descansos: cantidad, media y percentiles por grupo
+    is_break = activity == ACTIVITIES.index('break')
+    break_labels = labels[is_break]
+    break_durations = duration[is_break]
+    break_count = np.bincount(break_labels, minlength=size)
+    break_sum = np.bincount(break_labels, weights=break_durations, minlength=size)
+    break_mean = np.divide(break_sum, break_count, out=np.zeros(size), where=break_count > 0)
+    break_median, break_p95 = _group_percentiles(break_labels, break_durations, break_count, (50, 95))
+
+    # Cambios de actividad: intervalos consecutivos del mismo registro con
+    # distinta actividad, contados en el grupo del segundo
+    order = np.lexsort((intervals.start, intervals.record_id))
+    same_record = intervals.record_id[order][1:] == intervals.record_id[order][:-1]
+    changed = activity[order][1:] != activity[order][:-1]
+    switches = np.bincount(labels[order][1:][same_record & changed], minlength=size)
+    hours = tracked / 3600
+    switches_per_hour = np.divide(switches, hours, out=np.zeros(size), where=hours > 0)
+
+    intervals_count = np.bincount(labels, minlength=size)
+
+    columns = (
+        [intervals_count, tracked.astype(np.int64), break_count, break_mean, break_median, break_p95]
+        + [shares[:, code] for code in range(len(ACTIVITIES))]
+        + [switches, switches_per_hour]
+    )
+    return [
+        {field: _plain(column[index]) for field, column in zip(STAT_FIELDS, columns)}
+        for index in range(size)
+    ]
+
+
+def _group_percentiles(labels, values, counts, percentiles):
+    """Percentiles por grupo (interpolación lineal, como np.percentile).
+
+    Ordena una sola vez por (grupo, valor) y toma las posiciones de cada
+    percentil dentro del tramo de cada grupo. Los grupos vacíos dan 0.
+    """
+    order = np.lexsort((values, labels))
+    ordered = values[order].astype(float)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has_values = counts > 0
+
+    results = []
+    for percentile in percentiles:
+        position = (counts - 1).clip(min=0) * (percentile / 100)
+        low = np.floor(position).astype(np.intp)
+        high = np.ceil(position).astype(np.intp)
+        low_values = np.zeros(len(counts))
+        high_values = np.zeros(len(counts))
+        low_values[has_values] = ordered[(offsets + low)[has_values]]
+        high_values[has_values] = ordered[(offsets + high)[has_values]]
+        results.append(low_values + (high_values - low_values) * (position - low))
+    return results
+
+
+def _plain(value):
+    """Convierte escalares de NumPy a int o float de Python (para JSON y la interfaz)"""
+    value = value.item()
+    return round(value, 4) if isinstance(value, float) else value
+
+
+def analyze(db_manager, from_date, to_date, user_id=None, groups=None):
+    """Carga los intervalos del rango y devuelve summarize() con usuario y nombre de cada fila"""
+    intervals = load_intervals(db_manager, from_date, to_date, user_id)
+    result = summarize(intervals, groups)
+
+    names = {
+        row['id']: row for row in db_manager.fetch_all(
+            "SELECT id, username, full_name FROM users WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps([stats['user_id'] for stats in result['users']]),)
+        )
+    }
+    for stats in result['users']:
+        user = names.get(stats['user_id'])
+        stats['username'] = user['username'] if user else ''
+        stats['full_name'] = user['full_name'] if user else ''
+
+    return result
+
+
+def main(argv=None):
+    """Punto de entrada sin interfaz gráfica"""
+    from database.db_manager import DatabaseManager
+    from utils.config import load_config
+
+    today = datetime.date.today().isoformat()
+    parser = argparse.ArgumentParser(description="Estadísticas de actividades por usuario y equipo")
+    parser.add_argument('--from', dest='from_date', required=True, help="fecha inicial (AAAA-MM-DD)")
+    parser.add_argument('--to', dest='to_date', default=today, help="fecha final (AAAA-MM-DD)")
+    parser.add_argument('--user', dest='user_id', type=int, help="solo este ID de usuario")
+    parser.add_argument('--format', dest='fmt', choices=('csv', 'json'), default='csv')
+    parser.add_argument('--groups', help="archivo JSON {ID de usuario: equipo} para las filas por equipo")
+    parser.add_argument('--database', help="ruta de la base de datos (por defecto la de config.json)")
+    args = parser.parse_args(argv)
+
+    groups = None
+    if args.groups:
+        with open(args.groups, encoding='utf-8') as f:
+            groups = {int(user_id): team for user_id, team in json.load(f).items()}
+
+    db_manager = DatabaseManager(args.database or load_config()['database_path'])
+    db_manager.setup_database()
+    try:
+        result = analyze(db_manager, args.from_date, args.to_date, args.user_id, groups)
+    finally:
+        db_manager.close_all()
+
+    if args.fmt == 'json':
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+
+    # CSV: una fila por usuario y luego una por equipo
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['tipo', 'id', 'usuario'] + STAT_FIELDS)
+    for stats in result['users']:
+        writer.writerow(['usuario', stats['user_id'], stats['username']] + [stats[field] for field in STAT_FIELDS])
+    for stats in result['teams']:
+        writer.writerow(['equipo', '', stats['team']] + [stats[field] for field in STAT_FIELDS])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
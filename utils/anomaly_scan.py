@@ -0,0 +1,420 @@
+"""Búsqueda de anomalías en los registros de tiempo y sus actividades.
+
+Una sola pasada por tramo de fechas recorre time_records con sus
+activity_logs ordenadas por (registro, inicio), leyendo del cursor con
+memoria constante, y detecta:
+
+  - overlap: una actividad empieza antes de que termine la anterior (o
+    con la anterior todavía abierta)
+  - end_before_start: end_time anterior a start_time
+  - long_session: sesión de más de 24 horas (hasta la salida o hasta ahora)
+  - totals_mismatch: los total_<tipo>_time de una sesión cerrada no
+    coinciden con la suma de las duraciones de sus actividades
+
+Los tramos son independientes (cada registro pertenece a un solo día), así
+que pueden revisarse en paralelo, cada uno en un proceso con su propia
+conexión. Además del informe se arma un plan de reparación que no se
+aplica por defecto:
+
+  - end_before_start: el fin pasa a ser el inicio (duración 0)
+  - overlap: la actividad anterior termina donde empieza la siguiente
+  - totales: se recalculan con las duraciones ya corregidas
+  - long_session: solo se informa, requiere revisión manual
+
+Uso sin interfaz (por ejemplo, cada noche):
+
+    python -m utils.anomaly_scan --workers 4 --plan reparaciones.json > anomalias.csv
+    python -m utils.anomaly_scan --state data/anomaly_scan.json   # solo lo modificado desde la última vez
+    python -m utils.anomaly_scan --apply reparaciones.json        # aplicar un plan revisado
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from itertools import groupby
+from operator import itemgetter
+
+from models.time_record import ACTIVITY_TYPES
+from utils.bulk_export import date_chunks
+
+KINDS = ('overlap', 'end_before_start', 'long_session', 'totals_mismatch')
+
+REPORT_FIELDS = ('kind', 'record_id', 'user_id', 'date', 'activity_id', 'detail')
+
+# Duración máxima de una sesión antes de considerarla anómala
+MAX_SESSION_HOURS = 24
+
+# Columnas que un plan de reparación puede modificar, por tabla
+REPAIRABLE = {
+    'activity_logs': ('end_time', 'duration'),
+    'time_records': tuple(f'total_{activity_type}_time' for activity_type in ACTIVITY_TYPES),
+}
+
+# Filas leídas del cursor por lote
+FETCH_SIZE = 10000
+
+
+def _epoch_seconds(column):
+    """Segundos desde 1970 (con fracción) calculados en SQLite; acepta 'T' o espacio"""
+    return f"(julianday({column}) - 2440587.5) * 86400.0"
+
+
+_TOTAL_COLUMNS = ", ".join(f"total_{activity_type}_time" for activity_type in ACTIVITY_TYPES)
+
+# Registros y actividades se leen con dos cursores en el mismo orden
+# (fecha, id), el del índice de fechas, y se recorren a la par: así no hay
+# ordenamiento en SQLite ni columnas del registro repetidas en cada fila
+RECORDS_QUERY = f"""
+    SELECT id, user_id, date,
+    {_epoch_seconds('login_time')},
+    {_epoch_seconds('COALESCE(logout_time, ?)')},
+    logout_time IS NULL,
+    {_TOTAL_COLUMNS}
+    FROM time_records t
+    WHERE date BETWEEN ? AND ? {{change_filter}}
+    ORDER BY date, id
+"""
+
+ACTIVITIES_QUERY = f"""
+    SELECT t.id, a.id, a.activity_type,
+    {_epoch_seconds('a.start_time')},
+    {_epoch_seconds('a.end_time')},
+    a.duration
+    FROM time_records t
+    JOIN activity_logs a ON a.record_id = t.id
+    WHERE t.date BETWEEN ? AND ? {{change_filter}}
+    ORDER BY t.date, t.id
+"""
+
+CHANGE_FILTER = "AND t.id IN (SELECT record_id FROM session_changes WHERE seq > ?)"
+
+
+def scan_partition(db_manager, from_date, to_date, now=None, changed_after=None,
+                   max_session_hours=MAX_SESSION_HOURS):
+    """Revisa los registros entre dos fechas (inclusive).
+
+    now es la hora que se usa para las sesiones abiertas (texto ISO, por
+    defecto ahora). Con changed_after solo se revisan los registros cuyo
+    número de cambio en session_changes es mayor. Devuelve
+    (anomalías, reparaciones): listas de diccionarios con REPORT_FIELDS y
+    con table, id, set, old y reason respectivamente.
+    """
+    now = now or datetime.datetime.now().isoformat()
+    params = [from_date, to_date]
+    change_filter = ""
+    if changed_after is not None:
+        change_filter = CHANGE_FILTER
+        params.append(changed_after)
+
+    anomalies = []
+    repairs = []
+    with db_manager.connection() as connection:
+        # Las dos lecturas en la misma instantánea (en WAL no bloquea escrituras)
+        own_snapshot = not connection.in_transaction
+        if own_snapshot:
+            connection.execute("BEGIN")
+        try:
+            records = connection.cursor()
+            activities = connection.cursor()
+            with closing(records), closing(activities):
+                for cursor in (records, activities):
+                    cursor.row_factory = None  # Tuplas simples, sin sqlite3.Row por fila
+                    cursor.arraysize = FETCH_SIZE
+                records.execute(RECORDS_QUERY.format(change_filter=change_filter), [now] + params)
+                activities.execute(ACTIVITIES_QUERY.format(change_filter=change_filter), params)
+
+                groups = groupby(_fetch_batches(activities), key=itemgetter(0))
+                group = next(groups, None)
+                for record in _fetch_batches(records):
+                    rows = []
+                    if group is not None and group[0] == record[0]:
+                        rows = list(group[1])
+                        group = next(groups, None)
+                    _check_record(record, rows, max_session_hours * 3600, anomalies, repairs)
+
+            _fill_end_times(connection, repairs)
+        finally:
+            if own_snapshot:
+                connection.execute("COMMIT")
+
+    return anomalies, repairs
+
+
+def _fetch_batches(cursor):
+    while True:
+        rows = cursor.fetchmany()
+        if not rows:
+            return
+        yield from rows
+
+
+def _check_record(record, rows, max_session_seconds, anomalies, repairs):
+    """Revisa un registro; rows son las filas de ACTIVITIES_QUERY de ese registro"""
+    record_id, user_id, date, login, logout, is_open = record[:6]
+    current = dict(zip(ACTIVITY_TYPES, (total or 0 for total in record[6:])))
+
+    def report(kind, activity_id, detail):
+        anomalies.append({
+            'kind': kind, 'record_id': record_id, 'user_id': user_id, 'date': date,
+            'activity_id': activity_id, 'detail': detail,
+        })
+
+    if login is not None and logout is not None and logout - login > max_session_seconds:
+        detail = f"Sesión de {(logout - login) / 3600:.1f} h"
+        report('long_session', None, detail + " (abierta)" if is_open else detail)
+
+    # Recorrido en orden de (inicio, id); fixes guarda, por actividad, el ID de
+    # la actividad cuyo inicio pasa a ser su fin, la nueva duración y el motivo
+    try:
+        rows.sort(key=itemgetter(3, 1))
+    except TypeError:  # Algún inicio ilegible (NULL): al final
+        rows.sort(key=lambda row: (row[3] is None, row[3] or 0, row[1]))
+    fixes = {}
+    previous = None  # (id, inicio, fin) de la actividad anterior, ya corregida
+    for _, activity_id, _, start, end, _ in rows:
+        if start is None:
+            continue  # Inicio ilegible: no se puede comparar
+
+        if end is not None and end < start:
+            report('end_before_start', activity_id, f"Termina {start - end:.0f} s antes de empezar")
+            fixes[activity_id] = (activity_id, 0, 'end_before_start')
+            end = start
+
+        if previous is not None and (previous[2] is None or previous[2] > start):
+            previous_id, previous_start, previous_end = previous
+            if previous_end is None:
+                report('overlap', activity_id, f"Empieza con la actividad {previous_id} todavía abierta")
+            else:
+                report('overlap', activity_id, f"Se superpone {previous_end - start:.0f} s con la actividad {previous_id}")
+            # La anterior termina donde empieza esta
+            reason = fixes[previous_id][2] if previous_id in fixes else 'overlap'
+            fixes[previous_id] = (activity_id, round(start - previous_start), reason)
+
+        previous = (activity_id, start, end)
+
+    # Totales guardados en las actividades y totales con las correcciones
+    stored = dict.fromkeys(ACTIVITY_TYPES, 0)
+    fixed = dict.fromkeys(ACTIVITY_TYPES, 0)
+    for _, activity_id, activity_type, _, _, duration in rows:
+        duration = duration or 0
+        new_duration = duration
+        if activity_id in fixes:
+            end_source, new_duration, reason = fixes[activity_id]
+            # end_time (nuevo y anterior) se completa en _fill_end_times
+            repairs.append({
+                'table': 'activity_logs', 'id': activity_id, 'set': {'end_time': end_source, 'duration': new_duration},
+                'old': {'end_time': None, 'duration': duration}, 'reason': reason,
+            })
+        if activity_type in stored:
+            stored[activity_type] += duration
+            fixed[activity_type] += new_duration
+
+    # Las sesiones abiertas todavía acumulan tiempo (y pueden tener cambios sin guardar)
+    if is_open:
+        return
+
+    differences = [
+        f"{activity_type}: {current[activity_type]} != {stored[activity_type]}"
+        for activity_type in ACTIVITY_TYPES if current[activity_type] != stored[activity_type]
+    ]
+    if differences:
+        report('totals_mismatch', None, "; ".join(differences))
+
+    changed = [activity_type for activity_type in ACTIVITY_TYPES if current[activity_type] != fixed[activity_type]]
+    if changed:
+        repairs.append({
+            'table': 'time_records', 'id': record_id,
+            'set': {f'total_{activity_type}_time': fixed[activity_type] for activity_type in changed},
+            'old': {f'total_{activity_type}_time': current[activity_type] for activity_type in changed},
+            'reason': 'totals_mismatch' if differences else 'recalculated',
+        })
+
+
+def _fill_end_times(connection, repairs):
+    """Completa los end_time de las reparaciones de actividades con el texto guardado.
+
+    El recorrido solo lee segundos; el nuevo fin es el start_time original
+    de otra actividad (se copia tal cual, con su formato) y el fin anterior
+    se conserva para aplicar el plan solo si no cambió.
+    """
+    activity_repairs = [repair for repair in repairs if repair['table'] == 'activity_logs']
+    if not activity_repairs:
+        return
+
+    ids = {repair['id'] for repair in activity_repairs} | {repair['set']['end_time'] for repair in activity_repairs}
+    times = {
+        row[0]: (row[1], row[2]) for row in connection.execute(
+            "SELECT id, start_time, end_time FROM activity_logs WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(sorted(ids)),)
+        )
+    }
+    for repair in activity_repairs:
+        repair['set']['end_time'] = times[repair['set']['end_time']][0]
+        repair['old']['end_time'] = times[repair['id']][1]
+
+
+def scan_history(db_manager, from_date, to_date, chunk_days=31, workers=1, now=None,
+                 changed_after=None, max_session_hours=MAX_SESSION_HOURS, progress=None):
+    """Revisa todos los registros entre dos fechas, por tramos.
+
+    Con workers > 1 cada tramo se revisa en un proceso aparte que abre su
+    propia conexión a db_manager.db_path (el recorrido es Python puro, así
+    que los hilos no se reparten el trabajo). progress(terminados, total) se
+    llama al completar cada tramo. Devuelve (anomalías, reparaciones) en
+    orden de fecha.
+    """
+    now = now or datetime.datetime.now().isoformat()
+    chunks = date_chunks(from_date, to_date, chunk_days)
+    options = dict(now=now, changed_after=changed_after, max_session_hours=max_session_hours)
+    anomalies = []
+    repairs = []
+
+    if workers <= 1 or len(chunks) <= 1 or db_manager.db_path == ':memory:':
+        results = (scan_partition(db_manager, *chunk, **options) for chunk in chunks)
+        return _collect(results, len(chunks), anomalies, repairs, progress)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_scan_chunk, [db_manager.db_path] * len(chunks), chunks, [options] * len(chunks))
+        return _collect(results, len(chunks), anomalies, repairs, progress)
+
+
+def _collect(results, total, anomalies, repairs, progress):
+    for done, (chunk_anomalies, chunk_repairs) in enumerate(results, 1):
+        anomalies.extend(chunk_anomalies)
+        repairs.extend(chunk_repairs)
+        if progress:
+            progress(done, total)
+    return anomalies, repairs
+
+
+def _scan_chunk(db_path, chunk, options):
+    """Revisa un tramo con una conexión propia; se ejecuta en un proceso del pool"""
+    from database.db_manager import DatabaseManager
+
+    db_manager = DatabaseManager(db_path, pool_size=1)
+    try:
+        return scan_partition(db_manager, *chunk, **options)
+    finally:
+        db_manager.close_all()
+
+
+def last_change(db_manager):
+    """Último número de cambio de session_changes (0 si no hay ninguno)"""
+    row = db_manager.fetch_one("SELECT COALESCE(MAX(seq), 0) FROM session_changes")
+    return row[0] if row else 0
+
+
+def apply_repair_plan(db_manager, repairs):
+    """Aplica un plan de reparación en una sola transacción.
+
+    Cada cambio solo se aplica si las columnas siguen teniendo los valores
+    de old, de modo que un plan revisado tarde no pisa datos modificados
+    después del escaneo. Devuelve (aplicados, omitidos). Lanza ValueError
+    si el plan menciona tablas o columnas que no se pueden reparar.
+    """
+    statements = []
+    for repair in repairs:
+        table = repair['table']
+        columns = tuple(repair['set'])
+        if table not in REPAIRABLE or not columns or not set(columns) <= set(REPAIRABLE[table]):
+            raise ValueError(f"Reparación inválida: {table} {columns}")
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        conditions = " AND ".join(f"{column} IS ?" for column in columns)
+        params = [repair['set'][column] for column in columns] + [repair['id']]
+        params += [repair['old'][column] for column in columns]
+        statements.append((f"UPDATE {table} SET {assignments} WHERE id = ? AND {conditions}", params))
+
+    applied = 0
+    with db_manager.transaction() as connection:
+        for query, params in statements:
+            applied += connection.execute(query, params).rowcount
+
+    return applied, len(statements) - applied
+
+
+def write_report(f, anomalies):
+    """Escribe las anomalías como CSV con REPORT_FIELDS"""
+    writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(anomalies)
+
+
+def main(argv=None):
+    """Punto de entrada sin interfaz gráfica"""
+    from database.db_manager import DatabaseManager
+    from utils.config import load_config
+
+    today = datetime.date.today().isoformat()
+    parser = argparse.ArgumentParser(description="Búsqueda de anomalías en registros de tiempo y actividades")
+    parser.add_argument('--from', dest='from_date', help="fecha inicial (AAAA-MM-DD, por defecto el primer registro)")
+    parser.add_argument('--to', dest='to_date', default=today, help="fecha final (AAAA-MM-DD)")
+    parser.add_argument('--format', dest='fmt', choices=('csv', 'json'), default='csv')
+    parser.add_argument('--plan', help="archivo JSON donde guardar el plan de reparación")
+    parser.add_argument('--apply', dest='apply_plan', help="aplicar un plan de reparación guardado (sin escanear)")
+    parser.add_argument('--state', help="archivo JSON con el último cambio revisado: solo se revisa lo modificado después")
+    parser.add_argument('--max-session-hours', type=float, default=MAX_SESSION_HOURS)
+    parser.add_argument('--chunk-days', type=int, default=31)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--database', help="ruta de la base de datos (por defecto la de config.json)")
+    args = parser.parse_args(argv)
+
+    db_manager = DatabaseManager(args.database or load_config()['database_path'])
+    db_manager.setup_database()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} tramos", end='', file=sys.stderr, flush=True)
+
+    try:
+        if args.apply_plan:
+            with open(args.apply_plan, encoding='utf-8') as f:
+                applied, skipped = apply_repair_plan(db_manager, json.load(f))
+            print(f"{applied} cambios aplicados, {skipped} omitidos (datos modificados)", file=sys.stderr)
+            return 0
+
+        changed_after = None
+        if args.state and os.path.exists(args.state):
+            with open(args.state, encoding='utf-8') as f:
+                changed_after = json.load(f)['last_change']
+        checkpoint = last_change(db_manager)  # Antes de escanear: lo posterior se revisa la próxima vez
+
+        from_date = args.from_date
+        if not from_date:
+            row = db_manager.fetch_one("SELECT MIN(date) FROM time_records")
+            from_date = row[0] if row and row[0] else today
+
+        try:
+            anomalies, repairs = scan_history(
+                db_manager, from_date, args.to_date, chunk_days=args.chunk_days, workers=args.workers,
+                changed_after=changed_after, max_session_hours=args.max_session_hours, progress=progress
+            )
+        finally:
+            print(file=sys.stderr)
+    finally:
+        db_manager.close_all()
+
+    if args.fmt == 'json':
+        json.dump(anomalies, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        write_report(sys.stdout, anomalies)
+
+    if args.plan:
+        with open(args.plan, 'w', encoding='utf-8') as f:
+            json.dump(repairs, f, ensure_ascii=False, indent=2)
+    if args.state:
+        with open(args.state, 'w', encoding='utf-8') as f:
+            json.dump({'last_change': checkpoint}, f)
+
+    counts = Counter(anomaly['kind'] for anomaly in anomalies)
+    summary = ", ".join(f"{kind}: {counts[kind]}" for kind in KINDS)
+    print(f"{len(anomalies)} anomalías ({summary}); {len(repairs)} reparaciones propuestas", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
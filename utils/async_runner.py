@@ -0,0 +1,128 @@
+import itertools
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _TaskSignals(QObject):
+    """Señales para devolver resultados al hilo de la interfaz"""
+    finished = pyqtSignal(object, object)  # (id de tarea, resultado)
+    failed = pyqtSignal(object, object)    # (id de tarea, excepción)
+    progress = pyqtSignal(object, object)  # (id de tarea, avance)
+
+
+class _Task(QRunnable):
+    """Ejecuta una función en un hilo del pool"""
+    def __init__(self, task_id, fn, args, kwargs, signals):
+        super().__init__()
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.task_id, e)
+            return
+        self.signals.finished.emit(self.task_id, result)
+
+
+class AsyncRunner(QObject):
+    """Ejecuta llamadas a los controladores fuera del hilo de la interfaz.
+
+    Cada solicitud se identifica con una clave ("report", "active_sessions",
+    ...). Al enviar una nueva solicitud con la misma clave, la anterior se
+    cancela: si aún no empezó se retira de la cola y, si ya está en curso,
+    su resultado se descarta. Los callbacks siempre se ejecutan en el hilo
+    de la interfaz.
+
+    Con progress_callback, la función recibe un argumento progress(*valores)
+    que puede llamar desde el hilo del pool para informar su avance.
+    """
+
+    def __init__(self, parent=None, max_threads=2):
+        super().__init__(parent)
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+
+        self._signals = _TaskSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._signals.progress.connect(self._on_progress)
+
+        self._task_ids = itertools.count(1)
+        self._pending = {}  # id de tarea -> (clave, tarea, callback, error_callback, progress_callback)
+        self._latest = {}   # clave -> id de la tarea vigente
+
+    def submit(self, key, fn, *args, callback=None, error_callback=None,
+               progress_callback=None, **kwargs):
+        """Envía fn(*args, **kwargs) al pool reemplazando la solicitud previa con la misma clave"""
+        self.cancel(key)
+
+        task_id = next(self._task_ids)
+        if progress_callback:
+            kwargs['progress'] = lambda *values: self._signals.progress.emit(task_id, values)
+        task = _Task(task_id, fn, args, kwargs, self._signals)
+        task.setAutoDelete(False)
+
+        self._pending[task_id] = (key, task, callback, error_callback, progress_callback)
+        self._latest[key] = task_id
+        self.pool.start(task)
+
+        return task_id
+
+    def cancel(self, key):
+        """Cancela la solicitud vigente con la clave indicada"""
+        task_id = self._latest.pop(key, None)
+        if task_id is None:
+            return
+
+        task = self._pending.pop(task_id)[1]
+        self.pool.tryTake(task)
+
+    def cancel_all(self):
+        """Cancela todas las solicitudes pendientes"""
+        for key in list(self._latest):
+            self.cancel(key)
+
+    def is_pending(self, key):
+        """Indica si hay una solicitud sin resolver para la clave"""
+        return key in self._latest
+
+    def wait_for_done(self, msecs=-1):
+        """Espera a que terminen las tareas en curso"""
+        return self.pool.waitForDone(msecs)
+
+    def _take(self, task_id):
+        """Retira una tarea terminada; None si fue cancelada o reemplazada"""
+        entry = self._pending.pop(task_id, None)
+        if entry is None:
+            return None
+
+        key = entry[0]
+        if self._latest.get(key) == task_id:
+            del self._latest[key]
+        return entry
+
+    def _on_finished(self, task_id, result):
+        entry = self._take(task_id)
+        if entry and entry[2]:
+            entry[2](result)
+
+    def _on_progress(self, task_id, values):
+        entry = self._pending.get(task_id)
+        if entry and self._latest.get(entry[0]) == task_id:
+            entry[4](*values)
+
+    def _on_failed(self, task_id, error):
+        entry = self._take(task_id)
+        if not entry:
+            return
+
+        if entry[3]:
+            entry[3](error)
+        else:
+            print(f"Error en tarea en segundo plano: {error}")
\ No newline at end of file
@@ -0,0 +1,340 @@
+"""Exportación masiva de time_records y activity_logs para análisis externos.
+
+Los datos se dividen en tramos de fechas que se exportan en paralelo (un
+archivo por tabla y tramo) leyendo directamente del cursor, con memoria
+constante. Formatos:
+
+  - csv: texto separado por comas con encabezado
+  - csv.gz: el mismo CSV comprimido con gzip
+  - columnar: binario por columnas (.ettc), ver write_columnar/read_columnar
+
+Uso sin interfaz:
+
+    python -m utils.bulk_export --from 2025-01-01 --to 2025-12-31 --format csv.gz --output exports
+"""
+import argparse
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+
+FORMATS = {'csv': 'csv', 'csv.gz': 'csv.gz', 'columnar': 'ettc'}
+
+# Columnas exportadas por tabla: (nombre, tipo) con tipo 'int' o 'text'
+TABLES = {
+    'time_records': (
+        ('id', 'int'), ('user_id', 'int'), ('login_time', 'text'), ('logout_time', 'text'),
+        ('total_work_time', 'int'), ('total_break_time', 'int'), ('total_lunch_time', 'int'),
+        ('total_bathroom_time', 'int'), ('total_meeting_time', 'int'), ('date', 'text'),
+    ),
+    'activity_logs': (
+        ('id', 'int'), ('record_id', 'int'), ('user_id', 'int'), ('date', 'text'),
+        ('activity_type', 'text'), ('start_time', 'text'), ('end_time', 'text'),
+        ('duration', 'int'),
+    ),
+}
+
+QUERIES = {
+    'time_records': """
+        SELECT id, user_id, login_time, logout_time, total_work_time, total_break_time,
+        total_lunch_time, total_bathroom_time, total_meeting_time, date
+        FROM time_records
+        WHERE date BETWEEN ? AND ?
+        ORDER BY date, id
+    """,
+    'activity_logs': """
+        SELECT a.id, a.record_id, t.user_id, t.date, a.activity_type, a.start_time,
+        a.end_time, a.duration
+        FROM time_records t
+        JOIN activity_logs a ON a.record_id = t.id
+        WHERE t.date BETWEEN ? AND ?
+        ORDER BY t.date, a.record_id, a.start_time
+    """,
+}
+
+# Filas por grupo en el formato columnar y cada cuánto se revisa la cancelación
+ROW_GROUP_SIZE = 65536
+CHECK_EVERY = 1000
+
+COLUMNAR_MAGIC = b'ETTC1\n'
+
+
+class ExportCancelled(Exception):
+    """La exportación se canceló antes de terminar"""
+
+
+def date_chunks(from_date, to_date, chunk_days=31):
+    """Divide un rango de fechas (inclusive) en tramos de chunk_days días"""
+    start = datetime.date.fromisoformat(from_date)
+    end = datetime.date.fromisoformat(to_date)
+
+    chunks = []
+    while start <= end:
+        chunk_end = min(start + datetime.timedelta(days=chunk_days - 1), end)
+        chunks.append((start.isoformat(), chunk_end.isoformat()))
+        start = chunk_end + datetime.timedelta(days=1)
+    return chunks
+
+
+def export_history(db_manager, output_dir, from_date, to_date, fmt='csv.gz',
+                   tables=tuple(TABLES), chunk_days=31, workers=4,
+                   progress=None, is_cancelled=None):
+    """Exporta las tablas indicadas entre dos fechas a output_dir.
+
+    Cada (tabla, tramo) se escribe en su propio archivo y en un hilo del
+    pool. progress(terminados, total) se llama al completar cada archivo.
+    Devuelve [(ruta, filas), ...].
+
+    Los tramos se escriben como .part y solo se renombran cuando terminaron
+    todos: si uno falla o se cancela la exportación (ExportCancelled), los
+    demás se detienen y se borran todos los .part, sin dejar una
+    exportación incompleta en output_dir.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de exportación inválido: {fmt}")
+    for table in tables:
+        if table not in TABLES:
+            raise ValueError(f"Tabla inválida: {table}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    is_cancelled = is_cancelled or (lambda: False)
+
+    # Al fallar un tramo se detienen también los que están en curso
+    failed = threading.Event()
+
+    def should_stop():
+        return failed.is_set() or is_cancelled()
+
+    jobs = [(table, chunk) for chunk in date_chunks(from_date, to_date, chunk_days) for table in tables]
+    paths = [_chunk_path(output_dir, table, chunk, fmt) for table, chunk in jobs]
+    results = []
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="BulkExport") as executor:
+            futures = [
+                executor.submit(_export_chunk, db_manager, path, table, chunk, fmt, should_stop)
+                for path, (table, chunk) in zip(paths, jobs)
+            ]
+            try:
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    if progress:
+                        progress(len(results), len(jobs))
+            except BaseException:
+                failed.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+        for path in paths:
+            os.replace(path + '.part', path)
+    except BaseException:
+        # El pool ya terminó: ningún hilo sigue escribiendo estos archivos
+        for path in paths:
+            if os.path.exists(path + '.part'):
+                os.remove(path + '.part')
+        raise
+
+    return sorted(results)
+
+
+def _chunk_path(output_dir, table, chunk, fmt):
+    """Ruta final del archivo de una tabla en un tramo de fechas"""
+    return os.path.join(output_dir, f"{table}_{chunk[0]}_{chunk[1]}.{FORMATS[fmt]}")
+
+
+def _export_chunk(db_manager, file_path, table, chunk, fmt, is_cancelled):
+    """Exporta una tabla en un tramo de fechas a file_path + '.part'; se ejecuta en un hilo del pool"""
+    if is_cancelled():
+        raise ExportCancelled()
+
+    temp_path = file_path + '.part'
+    columns = TABLES[table]
+
+    # closing() libera la conexión del pool en este mismo hilo
+    with closing(db_manager.iter_rows(QUERIES[table], chunk)) as rows:
+        rows = _checked(rows, is_cancelled)
+        if fmt == 'columnar':
+            with open(temp_path, 'wb') as f:
+                count = write_columnar(f, columns, rows)
+        else:
+            opener = gzip.open if fmt == 'csv.gz' else open
+            with opener(temp_path, 'wt', newline='', encoding='utf-8') as f:
+                count = write_csv(f, columns, rows)
+
+    return file_path, count
+
+
+def _checked(rows, is_cancelled):
+    """Recorre las filas revisando cada tanto si se canceló la exportación"""
+    for index, row in enumerate(rows):
+        if index % CHECK_EVERY == 0 and is_cancelled():
+            raise ExportCancelled()
+        yield row
+
+
+def write_csv(f, columns, rows):
+    """Escribe filas como CSV con encabezado; devuelve la cantidad de filas"""
+    writer = csv.writer(f)
+    writer.writerow([name for name, _ in columns])
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_columnar(f, columns, rows):
+    """Escribe filas en el formato columnar .ettc; devuelve la cantidad de filas.
+
+    Estructura: COLUMNAR_MAGIC, encabezado JSON con las columnas y sus tipos
+    (precedido por su largo en uint32) y luego grupos de hasta
+    ROW_GROUP_SIZE filas. Cada grupo guarda su cantidad de filas (uint32) y
+    una sección comprimida con zlib por columna (uint32 de largo + datos):
+    un byte de validez por fila (0 = NULL) seguido de los valores, int64
+    para 'int' y, para 'text', los largos en uint32 y los textos UTF-8
+    concatenados. Todos los enteros son little-endian.
+    """
+    header = json.dumps({'columns': [{'name': name, 'type': kind} for name, kind in columns]}).encode()
+    f.write(COLUMNAR_MAGIC)
+    f.write(struct.pack('<I', len(header)))
+    f.write(header)
+
+    count = 0
+    group = []
+    for row in rows:
+        group.append(row)
+        if len(group) == ROW_GROUP_SIZE:
+            _write_row_group(f, columns, group)
+            count += len(group)
+            group = []
+    if group:
+        _write_row_group(f, columns, group)
+        count += len(group)
+    return count
+
+
+def _write_row_group(f, columns, group):
+    f.write(struct.pack('<I', len(group)))
+    for index, (_, kind) in enumerate(columns):
+        values = [row[index] for row in group]
+        validity = bytes(0 if value is None else 1 for value in values)
+
+        if kind == 'int':
+            data = array('q', (0 if value is None else int(value) for value in values))
+            payload = validity + _little_endian(data)
+        else:
+            encoded = [b'' if value is None else str(value).encode('utf-8') for value in values]
+            lengths = array('I', (len(value) for value in encoded))
+            payload = validity + _little_endian(lengths) + b''.join(encoded)
+
+        section = zlib.compress(payload, 6)
+        f.write(struct.pack('<I', len(section)))
+        f.write(section)
+
+
+def read_columnar(path):
+    """Lee un archivo .ettc; devuelve (columnas, generador de filas como tuplas)"""
+    f = open(path, 'rb')
+    if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        f.close()
+        raise ValueError(f"{path} no es un archivo columnar válido")
+
+    header_length, = struct.unpack('<I', f.read(4))
+    columns = [(column['name'], column['type']) for column in json.loads(f.read(header_length))['columns']]
+
+    def rows():
+        with f:
+            while True:
+                head = f.read(4)
+                if not head:
+                    return
+                size, = struct.unpack('<I', head)
+
+                values = []
+                for _, kind in columns:
+                    section_length, = struct.unpack('<I', f.read(4))
+                    values.append(_decode_column(zlib.decompress(f.read(section_length)), kind, size))
+
+                yield from zip(*values)
+
+    return columns, rows()
+
+
+def _decode_column(payload, kind, size):
+    validity, data = payload[:size], payload[size:]
+
+    if kind == 'int':
+        numbers = _from_little_endian('q', data)
+        return [number if valid else None for number, valid in zip(numbers, validity)]
+
+    lengths = _from_little_endian('I', data[:4 * size])
+    texts = io.BytesIO(data[4 * size:])
+    return [texts.read(length).decode('utf-8') if valid else None
+            for length, valid in zip(lengths, validity)]
+
+
+def _little_endian(data):
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _from_little_endian(typecode, raw):
+    data = array(typecode)
+    data.frombytes(raw)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data
+
+
+def main(argv=None):
+    """Punto de entrada sin interfaz gráfica"""
+    from database.db_manager import DatabaseManager
+    from utils.config import load_config
+
+    today = datetime.date.today().isoformat()
+    parser = argparse.ArgumentParser(description="Exportación masiva de registros de tiempo")
+    parser.add_argument('--from', dest='from_date', required=True, help="fecha inicial (AAAA-MM-DD)")
+    parser.add_argument('--to', dest='to_date', default=today, help="fecha final (AAAA-MM-DD)")
+    parser.add_argument('--format', dest='fmt', choices=sorted(FORMATS), default='csv.gz')
+    parser.add_argument('--output', default='exports', help="directorio de salida")
+    parser.add_argument('--tables', default=','.join(TABLES), help="tablas separadas por comas")
+    parser.add_argument('--chunk-days', type=int, default=31)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--database', help="ruta de la base de datos (por defecto la de config.json)")
+    args = parser.parse_args(argv)
+
+    db_manager = DatabaseManager(args.database or load_config()['database_path'])
+    db_manager.setup_database()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} archivos", end='', file=sys.stderr, flush=True)
+
+    try:
+        results = export_history(
+            db_manager, args.output, args.from_date, args.to_date, args.fmt,
+            tables=tuple(args.tables.split(',')), chunk_days=args.chunk_days,
+            workers=args.workers, progress=progress
+        )
+    finally:
+        print(file=sys.stderr)
+        db_manager.close_all()
+
+    for file_path, count in results:
+        print(f"{file_path}\t{count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
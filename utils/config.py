@@ -11,7 +11,10 @@ def load_config():
             'database_path': 'data/employee_tracker.db',
             'app_name': 'Employee Time Tracker',
             'refresh_interval': 30,  # segundos
-            'auto_logout': 60  # minutos
+            'auto_logout': 60,  # minutos
+            'write_behind': False,  # guardar cambios de actividad en lotes
+            'journal_dir': None,  # diario local de eventos (p. ej. 'data/journal'); cuesta 3 fsync por cambio
+            'stale_session_hours': 12  # horas sin actividad para cerrar una sesión huérfana
         }
         
         with open(config_path, 'w') as f:
@@ -30,5 +33,8 @@ def load_config():
             'database_path': 'data/employee_tracker.db',
             'app_name': 'Employee Time Tracker',
             'refresh_interval': 30,
-            'auto_logout': 60
+            'auto_logout': 60,
+            'write_behind': False,
+            'journal_dir': None,
+            'stale_session_hours': 12
         }
\ No newline at end of file
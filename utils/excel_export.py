@@ -0,0 +1,85 @@
+import itertools
+import os
+
+# Cada cuántas filas se informa el avance
+PROGRESS_EVERY = 1000
+
+# Ancho máximo de columna estimado (en caracteres)
+MAX_COLUMN_WIDTH = 50
+
+
+def export_rows_to_xlsx(file_path, headers, rows, sheet_title="Hoja1", total=None,
+                        progress=None, is_cancelled=None, sample_size=200):
+    """Escribe filas en un archivo Excel sin cargar el libro en memoria.
+
+    Usa el modo write_only de openpyxl: cada fila se escribe y se descarta,
+    así que rows puede ser un generador que lee de un cursor. El ancho de
+    las columnas se estima con las primeras sample_size filas. Se escribe
+    en un archivo temporal que reemplaza a file_path solo al terminar.
+
+    progress(escritas, total) se llama cada PROGRESS_EVERY filas. Si
+    is_cancelled() devuelve True antes de escribir todas las filas se
+    detiene, se borra el archivo temporal y se devuelve None; si no,
+    devuelve la cantidad de filas escritas. Una cancelación que llega con
+    todas las filas ya escritas no descarta el archivo.
+
+    Si lxml está instalado openpyxl lo usa para guardar más rápido; es
+    opcional.
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+
+    # Los anchos deben fijarse antes de escribir la primera fila
+    rows = iter(rows)
+    sample = list(itertools.islice(rows, sample_size))
+    for column, header in enumerate(headers):
+        width = max([len(header)] + [len(str(row[column])) for row in sample if row[column] is not None])
+        sheet.column_dimensions[get_column_letter(column + 1)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+    # Encabezados con estilo; las filas de datos van sin estilo
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        header_cells.append(cell)
+    sheet.append(header_cells)
+
+    temp_path = file_path + '.part'
+    written = 0
+    cancelled = False
+    try:
+        for row in itertools.chain(sample, rows):
+            if is_cancelled and written % PROGRESS_EVERY == 0 and is_cancelled():
+                cancelled = True
+                break
+
+            sheet.append(row)
+            written += 1
+
+            if progress and written % PROGRESS_EVERY == 0:
+                progress(written, total)
+
+        if cancelled:
+            sheet.close()  # Descarta lo escrito sin generar el archivo
+            return None
+
+        workbook.save(temp_path)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    if progress:
+        progress(written, total)
+    return written
\ No newline at end of file
@@ -0,0 +1,56 @@
+import collections
+import threading
+
+
+class LRUCache:
+    """Caché LRU acotada por tamaño total, segura entre hilos.
+
+    El tamaño de cada valor lo calcula sizeof (por defecto len, es decir, la
+    cantidad de filas de un resultado); al superar max_size se descartan los
+    valores usados hace más tiempo. Un valor más grande que max_size no se
+    guarda.
+    """
+
+    def __init__(self, max_size, sizeof=len):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self._entries = collections.OrderedDict()  # clave -> (valor, tamaño)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Devuelve el valor guardado para la clave y lo marca como reciente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        """Guarda un valor descartando los menos usados si hace falta"""
+        size = self.sizeof(value)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+
+            if size > self.max_size:
+                return
+
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        """Descarta todos los valores"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
\ No newline at end of file
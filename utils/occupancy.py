@@ -0,0 +1,172 @@
+"""Ocupación por franjas de 15 minutos: cuántas personas hay en cada actividad.
+
+Para cada día y actividad se calcula el promedio de personas en cada
+franja (segundos-persona de la franja / duración de la franja) con
+arreglos de diferencias de NumPy: cada intervalo suma sus segundos
+parciales en la primera y la última franja y marca con +/- el tramo de
+franjas completas, que se acumula con cumsum. No hay una consulta ni un
+recorrido por franja.
+
+Los resultados se guardan por día. Un día depende de los registros de ese
+día y del anterior (turnos que pasan la medianoche); su firma es la
+cantidad de registros y el último número de cambio (session_changes) de
+esos dos días, de modo que solo se recalculan los días modificados. Los
+días con sesiones abiertas no se guardan, porque cambian con la hora.
+"""
+import datetime
+
+import numpy as np
+
+from utils.analytics import ACTIVITIES, load_intervals
+from utils.lru_cache import LRUCache
+
+SLOT_SECONDS = 15 * 60
+DAY_SECONDS = 24 * 60 * 60
+SLOTS_PER_DAY = DAY_SECONDS // SLOT_SECONDS
+
+# Días guardados como máximo (por usuario filtrado)
+CACHE_DAYS = 800
+
+# Días faltantes calculados por consulta (acota la memoria)
+FILL_CHUNK_DAYS = 31
+
+WEEKDAYS = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+def slot_label(slot):
+    """Hora de inicio de una franja, por ejemplo '08:15'"""
+    minutes = slot * SLOT_SECONDS // 60
+    return f"{minutes // 60:02}:{minutes % 60:02}"
+
+
+def occupancy_by_day(intervals, days):
+    """Ocupación de los días indicados a partir de intervalos ya cargados.
+
+    days es una lista ordenada de días (en días desde 1970). Devuelve un
+    arreglo (días, actividades, franjas) con el promedio de personas en
+    cada franja. Los intervalos que cruzan la medianoche se reparten entre
+    los días que tocan.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    size = len(days) * len(ACTIVITIES) * (SLOTS_PER_DAY + 1)
+    keep = intervals.end > intervals.start
+    start = intervals.start[keep]
+    end = intervals.end[keep]
+    activity = intervals.activity[keep]
+
+    # Dividir en tramos de un día: un intervalo de k días da k tramos
+    first_day = start // DAY_SECONDS
+    spans = (end - 1) // DAY_SECONDS - first_day + 1
+    piece = np.repeat(np.arange(len(start)), spans)
+    piece_day = first_day[piece] + (np.arange(len(piece)) - np.repeat(np.cumsum(spans) - spans, spans))
+
+    wanted = np.isin(piece_day, days)
+    piece, piece_day = piece[wanted], piece_day[wanted]
+    day_start = piece_day * DAY_SECONDS
+    piece_start = np.maximum(start[piece], day_start) - day_start
+    piece_end = np.minimum(end[piece], day_start + DAY_SECONDS) - day_start
+
+    # Fila (día, actividad) de cada tramo en el arreglo de franjas
+    row = (np.searchsorted(days, piece_day) * len(ACTIVITIES) + activity[piece]) * (SLOTS_PER_DAY + 1)
+    first_slot = piece_start // SLOT_SECONDS
+    last_slot = piece_end // SLOT_SECONDS
+    same_slot = first_slot == last_slot
+
+    # Segundos en la primera y la última franja (parciales)
+    first_seconds = np.where(same_slot, piece_end - piece_start, (first_slot + 1) * SLOT_SECONDS - piece_start)
+    last_seconds = np.where(same_slot, 0, piece_end - last_slot * SLOT_SECONDS)
+    seconds = np.bincount(row + first_slot, weights=first_seconds, minlength=size)
+    seconds += np.bincount(row + last_slot, weights=last_seconds, minlength=size)
+
+    # Franjas completas intermedias: +SLOT_SECONDS desde la siguiente a la
+    # primera, -SLOT_SECONDS desde la última, y cumsum por fila
+    full = np.where(same_slot, 0, SLOT_SECONDS)
+    steps = np.bincount(row + first_slot + 1, weights=full, minlength=size)
+    steps -= np.bincount(row + last_slot, weights=full, minlength=size)
+    seconds += np.cumsum(steps.reshape(-1, SLOTS_PER_DAY + 1), axis=1).ravel()
+
+    seconds = seconds.reshape(len(days), len(ACTIVITIES), SLOTS_PER_DAY + 1)[:, :, :SLOTS_PER_DAY]
+    return seconds / SLOT_SECONDS
+
+
+def by_weekday(dates, occupancy):
+    """Promedio por día de la semana: arreglo (7, actividades, franjas), lunes primero"""
+    weekdays = np.array([datetime.date.fromisoformat(date).weekday() for date in dates], dtype=np.intp)
+    totals = np.zeros((7,) + occupancy.shape[1:])
+    np.add.at(totals, weekdays, occupancy)
+    counts = np.bincount(weekdays, minlength=7)
+    return totals / np.maximum(counts, 1)[:, None, None]
+
+
+class OccupancyHeatmap:
+    """Calcula la ocupación por franja de un rango de días con caché por día"""
+
+    def __init__(self, db_manager, max_days=CACHE_DAYS):
+        self.db_manager = db_manager
+        self.cache = LRUCache(max_days, sizeof=lambda entry: 1)
+
+    def compute(self, from_date, to_date, user_id=None):
+        """Ocupación entre dos fechas (inclusive).
+
+        Devuelve (fechas, arreglo (días, actividades, franjas)). Solo se
+        consultan los intervalos de los días que no están en la caché o
+        cuya firma cambió.
+        """
+        user_id = user_id if user_id and user_id != -1 else None
+        first = datetime.date.fromisoformat(from_date)
+        last = datetime.date.fromisoformat(to_date)
+        dates = [(first + datetime.timedelta(days=offset)).isoformat() for offset in range((last - first).days + 1)]
+        signatures = self._record_signatures(first - datetime.timedelta(days=1), last, user_id)
+
+        occupancy = np.zeros((len(dates), len(ACTIVITIES), SLOTS_PER_DAY))
+        missing = []
+        for index, date in enumerate(dates):
+            previous = (first + datetime.timedelta(days=index - 1)).isoformat()
+            signature = (signatures.get(previous), signatures.get(date))
+            if signature == (None, None):
+                continue  # Sin registros: ocupación cero
+
+            cached = self.cache.get((user_id, date))
+            if cached is not None and cached[0] == signature:
+                occupancy[index] = cached[1]
+            else:
+                missing.append((index, signature))
+
+        for offset in range(0, len(missing), FILL_CHUNK_DAYS):
+            self._fill_missing(dates, missing[offset:offset + FILL_CHUNK_DAYS], occupancy, user_id)
+
+        return dates, occupancy
+
+    def _fill_missing(self, dates, missing, occupancy, user_id):
+        """Calcula un tramo de días faltantes con una sola consulta y guarda los que no cambian"""
+        first = datetime.date.fromisoformat(dates[missing[0][0]])
+        last = dates[missing[-1][0]]
+        intervals = load_intervals(
+            self.db_manager, (first - datetime.timedelta(days=1)).isoformat(), last, user_id
+        )
+
+        days = [(datetime.date.fromisoformat(dates[index]) - _EPOCH).days for index, _ in missing]
+        computed = occupancy_by_day(intervals, days)
+
+        for (index, signature), day in zip(missing, computed):
+            occupancy[index] = day
+            if not any(part[2] for part in signature if part):
+                self.cache.put((user_id, dates[index]), (signature, day))
+
+    def _record_signatures(self, first, last, user_id):
+        """{fecha: (registros, último cambio, sesiones abiertas)} de los registros del rango"""
+        query = """
+            SELECT t.date, COUNT(*), MAX(c.seq), SUM(t.logout_time IS NULL)
+            FROM time_records t
+            LEFT JOIN session_changes c ON c.record_id = t.id
+            WHERE t.date BETWEEN ? AND ?
+        """
+        params = [first.isoformat(), last.isoformat()]
+        if user_id:
+            query += " AND t.user_id = ?"
+            params.append(user_id)
+        query += " GROUP BY t.date"
+
+        return {row[0]: tuple(row[1:]) for row in self.db_manager.fetch_all(query, params)}
\ No newline at end of file
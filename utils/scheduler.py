@@ -0,0 +1,38 @@
+import threading
+
+
+class PeriodicTask:
+    """Ejecuta una función cada cierto intervalo (en segundos) en un hilo en segundo plano"""
+
+    def __init__(self, interval, fn, name=None):
+        self.interval = interval
+        self.fn = fn
+        self.name = name or getattr(fn, '__name__', 'PeriodicTask')
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Inicia la ejecución periódica"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Detiene la ejecución periódica"""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def is_running(self):
+        """Indica si la tarea está activa"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.fn()
+            except Exception as e:
+                print(f"Error en tarea periódica {self.name}: {e}")
\ No newline at end of file
@@ -1,13 +1,34 @@
-import datetime, os
+import datetime, os, threading
+from contextlib import closing
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                            QLabel, QPushButton, QMessageBox, QFrame,
-                           QTabWidget, QTableWidget, QTableWidgetItem,
+                           QTabWidget, QTableWidget, QTableWidgetItem, QTableView,
                            QComboBox, QDateEdit, QHeaderView, QDialog,
-                           QFormLayout, QLineEdit)
+                           QFormLayout, QLineEdit, QProgressDialog)
 from PyQt5.QtCore import Qt, QDate, QTimer
-from PyQt5.QtGui import QFont
+from PyQt5.QtGui import QFont, QColor
 
-from controllers.admin_controller import AdminController
+from controllers.admin_controller import AdminController, USER_BULK_CHUNK_SIZE
+from utils.async_runner import AsyncRunner
+from views.report_model import HistoricalReportModel, REPORT_HEADERS, format_report_record
+from views.user_model import UserListModel, ALL_USERS_ID
+from views.user_search import UserSearchBox, SEARCH_DELAY
+
+# Filas que muestra como máximo la tabla de usuarios (se acota con la búsqueda)
+USERS_TABLE_LIMIT = 200
+
+ANALYSIS_HEADERS = [
+    "Usuario", "Intervalos", "Descansos", "Descanso Medio", "Descanso Mediana", "Descanso P95",
+    "% Trabajo", "% Descanso", "% Almuerzo", "% Baño", "% Reunión", "Cambios por Hora",
+]
+
+SUMMARY_HEADERS = [
+    "Usuario", "Sesiones", "Trabajo", "Descanso", "Almuerzo", "Baño", "Reuniones",
+]
+SUMMARY_TOTALS = [
+    'total_work_time', 'total_break_time', 'total_lunch_time',
+    'total_bathroom_time', 'total_meeting_time',
+]
 
 
 class AdminView(QMainWindow):
@@ -18,13 +39,30 @@ class AdminView(QMainWindow):
         self.user = user
         self.admin_controller = AdminController(db_manager)
         
+        # Las consultas pesadas se ejecutan fuera del hilo de la interfaz
+        self.async_runner = AsyncRunner(self)
+        
+        # Token del último cambio visto en las sesiones activas (None = recarga completa)
+        self.session_token = None
+        
+        # Última fila conocida de cada sesión activa, por ID de registro
+        self.active_sessions = {}
+        
+        # Usuarios que coinciden con la búsqueda de la tabla de usuarios
+        self.user_model = UserListModel(self)
+        
         self.init_ui()
         self.load_data()
         
         # Configurar un temporizador para actualizar datos en tiempo real
         self.refresh_timer = QTimer()
         self.refresh_timer.timeout.connect(self.refresh_data)
-        self.refresh_timer.start(30000)  # Actualizar cada 30 segundos
+        self.refresh_timer.start(2000)  # Solo trae cambios, por eso puede ser frecuente
+        
+        # El tiempo de la actividad en curso avanza localmente, sin consultar
+        self.tick_timer = QTimer()
+        self.tick_timer.timeout.connect(self.tick_active_sessions)
+        self.tick_timer.start(1000)
     
     def init_ui(self):
         """Inicializa la interfaz de usuario"""
@@ -77,12 +115,12 @@ class AdminView(QMainWindow):
         
         filter_layout.addWidget(QLabel("Filtrar por:"))
         
-        self.user_filter = QComboBox()
-        self.user_filter.addItem("Todos los usuarios", -1)
+        self.user_filter = UserSearchBox(self.admin_controller.search_users, self.async_runner, "user_filter")
+        self.user_filter.userChanged.connect(lambda _: self.reload_active_sessions())
         filter_layout.addWidget(self.user_filter)
         
         self.refresh_button = QPushButton("Actualizar")
-        self.refresh_button.clicked.connect(self.refresh_data)
+        self.refresh_button.clicked.connect(self.reload_active_sessions)
         filter_layout.addWidget(self.refresh_button)
         
         filter_layout.addStretch()
@@ -110,8 +148,9 @@ class AdminView(QMainWindow):
         report_filter_layout = QHBoxLayout(report_filter_frame)
         
         report_filter_layout.addWidget(QLabel("Usuario:"))
-        self.report_user_filter = QComboBox()
-        self.report_user_filter.addItem("Todos los usuarios", -1)
+        self.report_user_filter = UserSearchBox(
+            self.admin_controller.search_users, self.async_runner, "report_user_filter"
+        )
         report_filter_layout.addWidget(self.report_user_filter)
         
         report_filter_layout.addWidget(QLabel("Desde:"))
@@ -136,18 +175,29 @@ class AdminView(QMainWindow):
         self.export_excel_button.clicked.connect(self.export_to_excel)
         self.export_excel_button.setEnabled(False)  # Inicialmente deshabilitado hasta que haya datos
         report_filter_layout.addWidget(self.export_excel_button)
+
+        # Exportación masiva (CSV, CSV comprimido o columnar) del rango de fechas
+        self.bulk_export_button = QPushButton("Exportación Masiva")
+        self.bulk_export_button.clicked.connect(self.show_bulk_export_dialog)
+        report_filter_layout.addWidget(self.bulk_export_button)
         
         reports_layout.addWidget(report_filter_frame)
         
-        # Tabla de reportes
-        self.reports_table = QTableWidget()
-        self.reports_table.setColumnCount(9)
-        self.reports_table.setHorizontalHeaderLabels([
-            "Usuario", "Fecha", "Hora de Inicio", "Hora de Fin", "Tiempo de Trabajo", 
-            "Tiempo de Descanso", "Tiempo de Almuerzo", "Tiempo en Baño", "Tiempo en Reuniones"
-        ])
+        # Tabla de reportes (las filas se cargan por páginas al desplazarse)
+        self.report_model = None
+        self.export_progress = None
+        self.reports_table = QTableView()
         self.reports_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        reports_layout.addWidget(self.reports_table)
+        reports_layout.addWidget(self.reports_table, 3)
+        
+        # Totales por usuario del período (se calculan desde time_rollups)
+        reports_layout.addWidget(QLabel("Totales del período:"))
+        self.summary_table = QTableWidget()
+        self.summary_table.setColumnCount(len(SUMMARY_HEADERS))
+        self.summary_table.setHorizontalHeaderLabels(SUMMARY_HEADERS)
+        self.summary_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.summary_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        reports_layout.addWidget(self.summary_table, 1)
         
         self.tab_widget.addTab(self.reports_tab, "Reportes Históricos")
         
@@ -159,6 +209,18 @@ class AdminView(QMainWindow):
         users_controls_frame = QFrame()
         users_controls_layout = QHBoxLayout(users_controls_frame)
         
+        # Búsqueda por usuario o nombre; se consulta al dejar de escribir
+        self.users_search = QLineEdit()
+        self.users_search.setPlaceholderText("Buscar usuario...")
+        self.users_search.setClearButtonEnabled(True)
+        users_controls_layout.addWidget(self.users_search)
+        
+        self.users_search_timer = QTimer(self)
+        self.users_search_timer.setSingleShot(True)
+        self.users_search_timer.setInterval(SEARCH_DELAY)
+        self.users_search_timer.timeout.connect(self.search_users_table)
+        self.users_search.textChanged.connect(self.users_search_timer.start)
+        
         self.add_user_button = QPushButton("Agregar Usuario")
         self.add_user_button.clicked.connect(self.show_add_user_dialog)
         users_controls_layout.addWidget(self.add_user_button)
@@ -170,6 +232,19 @@ class AdminView(QMainWindow):
         self.delete_user_button = QPushButton("Eliminar Usuario")
         self.delete_user_button.clicked.connect(self.delete_user)
         users_controls_layout.addWidget(self.delete_user_button)
+        
+        # Acciones sobre todos los usuarios seleccionados
+        self.deactivate_users_button = QPushButton("Desactivar")
+        self.deactivate_users_button.clicked.connect(lambda: self.set_selected_users_active(False))
+        users_controls_layout.addWidget(self.deactivate_users_button)
+        
+        self.activate_users_button = QPushButton("Reactivar")
+        self.activate_users_button.clicked.connect(lambda: self.set_selected_users_active(True))
+        users_controls_layout.addWidget(self.activate_users_button)
+        
+        self.change_role_button = QPushButton("Cambiar Rol")
+        self.change_role_button.clicked.connect(self.change_selected_users_role)
+        users_controls_layout.addWidget(self.change_role_button)
 
         self.import_users_button = QPushButton("Cargar Usuarios Masivamente")
         self.import_users_button.clicked.connect(self.show_import_users_dialog)
@@ -180,63 +255,177 @@ class AdminView(QMainWindow):
         users_layout.addWidget(users_controls_frame)
         
         # Tabla de usuarios
-        self.users_table = QTableWidget()
-        self.users_table.setColumnCount(4)
-        self.users_table.setHorizontalHeaderLabels([
-            "ID", "Usuario", "Nombre Completo", "Rol"
-        ])
+        self.users_table = QTableView()
+        self.users_table.setModel(self.user_model)
         self.users_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.users_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.users_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.users_table.setSelectionBehavior(QTableView.SelectRows)
+        self.users_table.setSelectionMode(QTableView.ExtendedSelection)
         users_layout.addWidget(self.users_table)
         
         self.tab_widget.addTab(self.users_tab, "Gestión de Usuarios")
         
+        # Pestaña de análisis de actividades
+        self.analysis_tab = QWidget()
+        analysis_layout = QVBoxLayout(self.analysis_tab)
+        
+        analysis_filter_frame = QFrame()
+        analysis_filter_layout = QHBoxLayout(analysis_filter_frame)
+        
+        analysis_filter_layout.addWidget(QLabel("Desde:"))
+        self.analysis_from_date = QDateEdit()
+        self.analysis_from_date.setCalendarPopup(True)
+        self.analysis_from_date.setDate(QDate.currentDate().addDays(-30))
+        analysis_filter_layout.addWidget(self.analysis_from_date)
+        
+        analysis_filter_layout.addWidget(QLabel("Hasta:"))
+        self.analysis_to_date = QDateEdit()
+        self.analysis_to_date.setCalendarPopup(True)
+        self.analysis_to_date.setDate(QDate.currentDate())
+        analysis_filter_layout.addWidget(self.analysis_to_date)
+        
+        self.analysis_button = QPushButton("Calcular")
+        self.analysis_button.clicked.connect(self.compute_analytics)
+        analysis_filter_layout.addWidget(self.analysis_button)
+        
+        # Mapa de ocupación por franja de 15 minutos y día de la semana
+        analysis_filter_layout.addWidget(QLabel("Ocupación de:"))
+        self.occupancy_activity = QComboBox()
+        for activity in ('work', 'break', 'lunch', 'bathroom', 'meeting'):
+            self.occupancy_activity.addItem(self.get_activity_name(activity), activity)
+        self.occupancy_activity.currentIndexChanged.connect(self.show_occupancy)
+        analysis_filter_layout.addWidget(self.occupancy_activity)
+        
+        self.occupancy_button = QPushButton("Mapa de Ocupación")
+        self.occupancy_button.clicked.connect(self.compute_occupancy)
+        analysis_filter_layout.addWidget(self.occupancy_button)
+        
+        analysis_filter_layout.addStretch()
+        analysis_layout.addWidget(analysis_filter_frame)
+        
+        self.analysis_views = QTabWidget()
+        
+        # Una fila por equipo (arriba) y una por usuario
+        self.analysis_table = QTableWidget()
+        self.analysis_table.setColumnCount(len(ANALYSIS_HEADERS))
+        self.analysis_table.setHorizontalHeaderLabels(ANALYSIS_HEADERS)
+        self.analysis_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.analysis_views.addTab(self.analysis_table, "Estadísticas")
+        
+        # Una fila por franja y una columna por día de la semana
+        self.occupancy_heatmap = None  # Se crea al usarlo (requiere NumPy)
+        self.occupancy_result = None
+        self.occupancy_table = QTableWidget()
+        self.occupancy_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.analysis_views.addTab(self.occupancy_table, "Ocupación")
+        
+        analysis_layout.addWidget(self.analysis_views)
+        
+        self.tab_widget.addTab(self.analysis_tab, "Análisis")
+        
         main_layout.addWidget(self.tab_widget)
     
     def load_data(self):
         """Carga datos iniciales"""
-        # Cargar usuarios para filtros
-        users = self.admin_controller.get_all_users()
-        
-        for user in users:
-            self.user_filter.addItem(user['full_name'], user['id'])
-            self.report_user_filter.addItem(user['full_name'], user['id'])
-        
-        # Cargar tabla de usuarios
-        self.load_users_table()
+        # Cargar la primera página de la tabla de usuarios
+        self.search_users_table()
         
         # Cargar datos en tiempo real
         self.refresh_data()
     
     def refresh_data(self):
-        """Actualiza los datos en tiempo real"""
+        """Actualiza los datos en tiempo real (solo las sesiones que cambiaron)"""
         # Obtener el filtro de usuario seleccionado
         user_id = self.user_filter.currentData()
         
-        # Obtener datos actualizados
-        active_sessions = self.admin_controller.get_active_sessions(user_id)
-        
-        # Actualizar tabla
-        self.active_users_table.setRowCount(len(active_sessions))
+        # Obtener los cambios desde la última consulta en segundo plano
+        self.async_runner.submit(
+            "active_sessions",
+            self.admin_controller.get_active_session_changes, self.session_token, user_id,
+            callback=self.apply_session_changes
+        )
+    
+    def reload_active_sessions(self):
+        """Recarga por completo las sesiones activas (por ejemplo al cambiar el filtro)"""
+        self.session_token = None
+        self.refresh_data()
+    
+    def apply_session_changes(self, changes):
+        """Aplica a la tabla solo las sesiones nuevas, modificadas o finalizadas"""
+        table = self.active_users_table
+        self.session_token = changes['token']
+        
+        if changes['reset']:
+            table.setRowCount(0)
+            self.active_sessions.clear()
+        
+        # Quitar sesiones finalizadas
+        removed = set(changes['removed'])
+        for record_id in removed:
+            self.active_sessions.pop(record_id, None)
+        if removed:
+            for row in range(table.rowCount() - 1, -1, -1):
+                if table.item(row, 0).data(Qt.UserRole) in removed:
+                    table.removeRow(row)
+        
+        # Actualizar en su lugar las filas existentes
+        rows = {table.item(row, 0).data(Qt.UserRole): row for row in range(table.rowCount())}
+        new_sessions = []
+        for session in changes['updated']:
+            self.active_sessions[session['id']] = session
+            row = rows.get(session['id'])
+            if row is None:
+                new_sessions.append(session)
+            else:
+                self.fill_session_row(row, session)
         
-        for row, session in enumerate(active_sessions):
-            # Usuario
-            self.active_users_table.setItem(row, 0, QTableWidgetItem(session['username']))
-            
-            # Estado actual
-            self.active_users_table.setItem(row, 1, QTableWidgetItem(self.get_activity_name(session['current_activity'])))
-            
-            # Hora de inicio
-            login_time = datetime.datetime.fromisoformat(session['login_time'])
-            self.active_users_table.setItem(row, 2, QTableWidgetItem(login_time.strftime('%H:%M:%S')))
-            
-            # Tiempos de actividades
-            self.active_users_table.setItem(row, 3, QTableWidgetItem(self.format_seconds(session['total_work_time'])))
-            self.active_users_table.setItem(row, 4, QTableWidgetItem(self.format_seconds(session['total_break_time'])))
-            self.active_users_table.setItem(row, 5, QTableWidgetItem(self.format_seconds(session['total_lunch_time'])))
-            self.active_users_table.setItem(row, 6, QTableWidgetItem(self.format_seconds(session['total_bathroom_time'])))
-            self.active_users_table.setItem(row, 7, QTableWidgetItem(self.format_seconds(session['total_meeting_time'])))
+        # Insertar las nuevas arriba, manteniendo el orden por hora de inicio descendente
+        for session in reversed(new_sessions):
+            table.insertRow(0)
+            self.fill_session_row(0, session)
+    
+    def tick_active_sessions(self):
+        """Avanza el tiempo de la actividad en curso de cada sesión visible"""
+        table = self.active_users_table
+        now = datetime.datetime.now()
+        for row in range(table.rowCount()):
+            session = self.active_sessions.get(table.item(row, 0).data(Qt.UserRole))
+            if session is not None and session['activity_start']:
+                self.fill_session_row(row, session, now)
+    
+    def fill_session_row(self, row, session, now=None):
+        """Escribe una sesión en una fila, tocando solo las celdas que cambiaron"""
+        login_time = datetime.datetime.fromisoformat(session['login_time'])
+        
+        # Sumar al total de la actividad en curso el tiempo transcurrido desde su inicio
+        totals = {activity: session[f'total_{activity}_time'] or 0
+                  for activity in ("work", "break", "lunch", "bathroom", "meeting")}
+        current_activity = session['current_activity']
+        if current_activity in totals and session['activity_start']:
+            now = now or datetime.datetime.now()
+            started = datetime.datetime.fromisoformat(session['activity_start'])
+            totals[current_activity] += max(0, int((now - started).total_seconds()))
+        
+        values = [
+            session['username'],
+            self.get_activity_name(current_activity),
+            login_time.strftime('%H:%M:%S'),
+            self.format_seconds(totals['work']),
+            self.format_seconds(totals['break']),
+            self.format_seconds(totals['lunch']),
+            self.format_seconds(totals['bathroom']),
+            self.format_seconds(totals['meeting'])
+        ]
+        
+        for column, text in enumerate(values):
+            item = self.active_users_table.item(row, column)
+            if item is None:
+                item = QTableWidgetItem(text)
+                self.active_users_table.setItem(row, column, item)
+            elif item.text() != text:
+                item.setText(text)
+        
+        # El ID del registro identifica la fila en las próximas actualizaciones
+        self.active_users_table.item(row, 0).setData(Qt.UserRole, session['id'])
     
     def generate_report(self):
         """Genera un reporte histórico"""
@@ -245,57 +434,168 @@ class AdminView(QMainWindow):
         from_date = self.from_date.date().toString("yyyy-MM-dd")
         to_date = self.to_date.date().toString("yyyy-MM-dd")
 
-        # Obtener datos de reporte
-        report_data = self.admin_controller.get_historical_report(user_id, from_date, to_date)
-
-        # Actualizar tabla
-        self.reports_table.setRowCount(len(report_data))
-
-        for row, record in enumerate(report_data):
-            # Usuario
-            self.reports_table.setItem(row, 0, QTableWidgetItem(record['username']))
-
-            # Fecha
-            self.reports_table.setItem(row, 1, QTableWidgetItem(record['date']))
-
-            # Hora de inicio
-            if record['login_time']:
-                login_time = datetime.datetime.fromisoformat(record['login_time'])
-                self.reports_table.setItem(row, 2, QTableWidgetItem(login_time.strftime('%H:%M:%S')))
-            else:
-                self.reports_table.setItem(row, 2, QTableWidgetItem("--"))
+        # Obtener la primera página del reporte en segundo plano; el resto
+        # se carga a medida que se desplaza la tabla
+        self.generate_report_button.setEnabled(False)
+        self.export_excel_button.setEnabled(False)
+        self.async_runner.submit(
+            "report",
+            self.admin_controller.get_historical_report_page, user_id, from_date, to_date,
+            callback=lambda first_page: self.populate_report(user_id, from_date, to_date, first_page),
+            error_callback=self.report_failed
+        )
+        
+        # Los totales del período se leen de time_rollups, sin recorrer los registros
+        self.async_runner.submit(
+            "report_summary",
+            self.admin_controller.get_time_summary, user_id, from_date, to_date,
+            callback=self.populate_summary,
+            error_callback=self.report_failed
+        )
 
-            # Hora de fin
-            if record['logout_time']:
-                logout_time = datetime.datetime.fromisoformat(record['logout_time'])
-                self.reports_table.setItem(row, 3, QTableWidgetItem(logout_time.strftime('%H:%M:%S')))
-            else:
-                self.reports_table.setItem(row, 3, QTableWidgetItem("Activo"))
+    def populate_report(self, user_id, from_date, to_date, first_page):
+        """Muestra el reporte a partir de su primera página"""
+        self.generate_report_button.setEnabled(True)
 
-            # Tiempos de actividades
-            self.reports_table.setItem(row, 4, QTableWidgetItem(self.format_seconds(record['total_work_time'])))
-            self.reports_table.setItem(row, 5, QTableWidgetItem(self.format_seconds(record['total_break_time'])))
-            self.reports_table.setItem(row, 6, QTableWidgetItem(self.format_seconds(record['total_lunch_time'])))
-            self.reports_table.setItem(row, 7, QTableWidgetItem(self.format_seconds(record['total_bathroom_time'])))
-            self.reports_table.setItem(row, 8, QTableWidgetItem(self.format_seconds(record['total_meeting_time'])))
+        # Actualizar tabla; el modelo anterior deja de cargar páginas
+        if self.report_model is not None:
+            self.report_model.cancel()
+        self.report_model = HistoricalReportModel(
+            self.admin_controller, self.async_runner, user_id, from_date, to_date,
+            first_page=first_page, parent=self
+        )
+        self.reports_table.setModel(self.report_model)
 
         # Habilitar o deshabilitar el botón de exportar
-        self.export_excel_button.setEnabled(len(report_data) > 0)
+        self.export_excel_button.setEnabled(len(first_page) > 0)
+
+    def populate_summary(self, summary):
+        """Muestra los totales por usuario del período y, si hay varios, su suma"""
+        rows = [
+            (user['full_name'] or user['username'], user['sessions'],
+             [user[column] for column in SUMMARY_TOTALS])
+            for user in summary
+        ]
+        if len(rows) > 1:
+            rows.append((
+                "Total",
+                sum(sessions for _, sessions, _ in rows),
+                [sum(totals[i] for _, _, totals in rows) for i in range(len(SUMMARY_TOTALS))]
+            ))
+        
+        self.summary_table.setRowCount(len(rows))
+        for row, (name, sessions, totals) in enumerate(rows):
+            values = [name, str(sessions)] + [self.format_seconds(int(total or 0)) for total in totals]
+            for column, text in enumerate(values):
+                self.summary_table.setItem(row, column, QTableWidgetItem(text))
 
-        # Almacenar los datos del reporte para exportar
-        self.current_report_data = report_data
+    def report_failed(self, error):
+        """Informa un error al generar el reporte"""
+        self.generate_report_button.setEnabled(True)
+        QMessageBox.warning(self, "Error", f"Error al generar el reporte: {error}")
+        
+    def search_users_table(self):
+        """Busca en segundo plano los usuarios que muestra la tabla"""
+        self.users_search_timer.stop()
+        self.async_runner.submit(
+            "users_table",
+            self.admin_controller.search_users, self.users_search.text(), USERS_TABLE_LIMIT,
+            callback=self.user_model.set_users
+        )
+    
+    def reload_users(self):
+        """Actualiza la tabla y los filtros de usuario después de modificar usuarios"""
+        self.search_users_table()
+        
+        # Los filtros conservan su usuario: se borran si se eliminó y se
+        # actualiza el nombre si se editó. Al borrarse el filtro de
+        # monitoreo, userChanged recarga las sesiones con todos los usuarios.
+        for search_box in (self.user_filter, self.report_user_filter):
+            user_id = search_box.currentData()
+            if user_id == ALL_USERS_ID:
+                continue
+            
+            user = self.admin_controller.get_user_by_id(user_id)
+            if user is None:
+                search_box.clear_user()
+            elif search_box.text() != user['full_name']:
+                search_box.set_user(user_id, user['full_name'])
+    
+    def selected_user(self):
+        """(ID, usuario) de la primera fila seleccionada en la tabla de usuarios, o None"""
+        selected = self.selected_users()
+        return selected[0] if selected else None
+    
+    def selected_users(self):
+        """[(ID, usuario), ...] de las filas seleccionadas en la tabla de usuarios"""
+        rows = sorted(self.users_table.selectionModel().selectedRows(), key=lambda index: index.row())
+        return [(index.data(Qt.UserRole), index.sibling(index.row(), 1).data()) for index in rows]
+    
+    def selected_users_except_self(self, action):
+        """Usuarios seleccionados sin la cuenta en uso; None si no queda ninguno"""
+        selected = self.selected_users()
+        if not selected:
+            QMessageBox.warning(self, "Error", f"Por favor seleccione los usuarios a {action}")
+            return None
+        
+        others = [user for user in selected if user[0] != self.user.id]
+        if not others:
+            QMessageBox.warning(self, "Error", f"No puede {action} su propia cuenta")
+            return None
+        return others
+    
+    def run_users_bulk_action(self, action, user_ids, done_message, *args):
+        """Ejecuta una operación masiva de usuarios en segundo plano, por tramos"""
+        self.users_tab.setEnabled(False)
+        
+        def finished(count):
+            self.users_tab.setEnabled(True)
+            QMessageBox.information(self, "Éxito", done_message.format(count=count))
+            self.reload_users()
+        
+        def failed(error):
+            self.users_tab.setEnabled(True)
+            QMessageBox.warning(self, "Error", f"Error al modificar usuarios: {error}")
+            # Con tramos, los anteriores al error quedaron aplicados
+            self.reload_users()
+        
+        self.async_runner.submit(
+            "users_bulk",
+            action, user_ids, *args, chunk_size=USER_BULK_CHUNK_SIZE,
+            callback=finished, error_callback=failed
+        )
+    
+    def set_selected_users_active(self, active):
+        """Desactiva o reactiva los usuarios seleccionados"""
+        selected = self.selected_users_except_self("reactivar" if active else "desactivar")
+        if not selected:
+            return
         
-    def load_users_table(self):
-        """Carga la tabla de usuarios"""
-        users = self.admin_controller.get_all_users()
+        if active:
+            action, message = self.admin_controller.activate_users, "Se reactivaron {count} usuarios"
+        else:
+            action, message = self.admin_controller.deactivate_users, "Se desactivaron {count} usuarios"
+        self.run_users_bulk_action(action, [user_id for user_id, _ in selected], message)
+    
+    def change_selected_users_role(self):
+        """Asigna un rol a todos los usuarios seleccionados"""
+        from PyQt5.QtWidgets import QInputDialog
         
-        self.users_table.setRowCount(len(users))
+        selected = self.selected_users_except_self("cambiar de rol")
+        if not selected:
+            return
         
-        for row, user in enumerate(users):
-            self.users_table.setItem(row, 0, QTableWidgetItem(str(user['id'])))
-            self.users_table.setItem(row, 1, QTableWidgetItem(user['username']))
-            self.users_table.setItem(row, 2, QTableWidgetItem(user['full_name']))
-            self.users_table.setItem(row, 3, QTableWidgetItem(user['role']))
+        roles = {"Empleado": "employee", "Administrador": "admin"}
+        label, ok = QInputDialog.getItem(
+            self, "Cambiar Rol", f"Nuevo rol para {len(selected)} usuarios:", list(roles), 0, False
+        )
+        if not ok:
+            return
+        
+        self.run_users_bulk_action(
+            self.admin_controller.change_users_role, [user_id for user_id, _ in selected],
+            "Se cambió el rol de {count} usuarios", roles[label]
+        )
     
     def show_add_user_dialog(self):
         """Muestra diálogo para agregar usuario"""
@@ -355,32 +655,20 @@ class AdminView(QMainWindow):
             QMessageBox.information(dialog, "Éxito", "Usuario agregado correctamente")
             dialog.accept()
             
-            # Recargar datos
-            self.load_users_table()
-            
-            # Actualizar filtros
-            self.user_filter.clear()
-            self.report_user_filter.clear()
-            self.user_filter.addItem("Todos los usuarios", -1)
-            self.report_user_filter.addItem("Todos los usuarios", -1)
-            
-            users = self.admin_controller.get_all_users()
-            for user in users:
-                self.user_filter.addItem(user['full_name'], user['id'])
-                self.report_user_filter.addItem(user['full_name'], user['id'])
+            # Recargar la lista de usuarios (tabla y filtros)
+            self.reload_users()
         else:
             QMessageBox.warning(dialog, "Error", "Error al agregar usuario. El nombre de usuario podría estar en uso.")
     
     def show_edit_user_dialog(self):
         """Muestra diálogo para editar usuario"""
         # Verificar si hay una fila seleccionada
-        selected_items = self.users_table.selectedItems()
-        if not selected_items:
+        selected = self.selected_user()
+        if not selected:
             QMessageBox.warning(self, "Error", "Por favor seleccione un usuario para editar")
             return
         
-        row = selected_items[0].row()
-        user_id = int(self.users_table.item(row, 0).text())
+        user_id = selected[0]
         
         # Obtener datos del usuario
         user = self.admin_controller.get_user_by_id(user_id)
@@ -454,66 +742,55 @@ class AdminView(QMainWindow):
             QMessageBox.information(dialog, "Éxito", "Usuario actualizado correctamente")
             dialog.accept()
             
-            # Recargar datos
-            self.load_users_table()
-            
-            # Actualizar filtros
-            self.user_filter.clear()
-            self.report_user_filter.clear()
-            self.user_filter.addItem("Todos los usuarios", -1)
-            self.report_user_filter.addItem("Todos los usuarios", -1)
-            
-            users = self.admin_controller.get_all_users()
-            for user in users:
-                self.user_filter.addItem(user['full_name'], user['id'])
-                self.report_user_filter.addItem(user['full_name'], user['id'])
+            # Recargar la lista de usuarios (tabla y filtros)
+            self.reload_users()
         else:
             QMessageBox.warning(dialog, "Error", "Error al actualizar usuario")
     
     def delete_user(self):
-        """Elimina un usuario"""
-        # Verificar si hay una fila seleccionada
-        selected_items = self.users_table.selectedItems()
-        if not selected_items:
-            QMessageBox.warning(self, "Error", "Por favor seleccione un usuario para eliminar")
+        """Elimina los usuarios seleccionados"""
+        # Verificar si hay filas seleccionadas
+        selected = self.selected_users_except_self("eliminar")
+        if not selected:
             return
         
-        row = selected_items[0].row()
-        user_id = int(self.users_table.item(row, 0).text())
-        username = self.users_table.item(row, 1).text()
+        if len(selected) == 1:
+            question = f"¿Está seguro de que desea eliminar al usuario '{selected[0][1]}'?"
+        else:
+            question = f"¿Está seguro de que desea eliminar {len(selected)} usuarios?"
         
         # Confirmar eliminación
         reply = QMessageBox.question(self, "Confirmar Eliminación", 
-                                    f"¿Está seguro de que desea eliminar al usuario '{username}'?\n\n"
+                                    f"{question}\n\n"
                                     "Esta acción no se puede deshacer y eliminará todos los registros de tiempo asociados.",
                                     QMessageBox.Yes | QMessageBox.No)
         
         if reply != QMessageBox.Yes:
             return
         
-        success = self.admin_controller.delete_user(user_id)
+        if len(selected) == 1:
+            # Un solo usuario: inmediato, como antes
+            if self.admin_controller.delete_user(selected[0][0]):
+                QMessageBox.information(self, "Éxito", "Usuario eliminado correctamente")
+                
+                # Recargar la lista de usuarios (tabla y filtros)
+                self.reload_users()
+            else:
+                QMessageBox.warning(self, "Error", "Error al eliminar usuario")
+            return
         
-        if success:
-            QMessageBox.information(self, "Éxito", "Usuario eliminado correctamente")
-            
-            # Recargar datos
-            self.load_users_table()
-            
-            # Actualizar filtros
-            self.user_filter.clear()
-            self.report_user_filter.clear()
-            self.user_filter.addItem("Todos los usuarios", -1)
-            self.report_user_filter.addItem("Todos los usuarios", -1)
-            
-            users = self.admin_controller.get_all_users()
-            for user in users:
-                self.user_filter.addItem(user['full_name'], user['id'])
-                self.report_user_filter.addItem(user['full_name'], user['id'])
-        else:
-            QMessageBox.warning(self, "Error", "Error al eliminar usuario")
+        self.run_users_bulk_action(
+            self.admin_controller.delete_users, [user_id for user_id, _ in selected],
+            "Se eliminaron {count} usuarios"
+        )
     
     def handle_logout(self):
         """Maneja el evento de logout"""
+        self.refresh_timer.stop()
+        self.tick_timer.stop()
+        if self.export_progress is not None:
+            self.cancel_export()
+        self.async_runner.cancel_all()
         self.close()
         from views.login_view import LoginView
         self.login_view = LoginView(self.db_manager)
@@ -586,196 +863,307 @@ class AdminView(QMainWindow):
         dialog.exec_()
 
     def import_users_from_csv(self, file_path, dialog):
-        """Importa usuarios desde un archivo CSV"""
-        import csv
+        """Importa usuarios desde un archivo CSV en segundo plano"""
+        # El diálogo queda bloqueado hasta conocer el resultado
+        dialog.setEnabled(False)
+        
+        def failed(error):
+            dialog.setEnabled(True)
+            QMessageBox.critical(dialog, "Error", f"Error al importar usuarios: {error}")
+        
+        self.async_runner.submit(
+            "import_users",
+            self.admin_controller.import_users_from_csv, file_path,
+            callback=lambda outcomes: self.show_import_results(outcomes, dialog),
+            error_callback=failed
+        )
+    
+    def show_import_results(self, outcomes, dialog):
+        """Muestra el resultado de la importación fila por fila"""
+        dialog.setEnabled(True)
         
-        try:
-            # Leer archivo CSV
-            users_to_import = []
-            with open(file_path, 'r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                # Saltar encabezado si existe
-                header = next(reader, None)
-                if header and header[0].lower() == 'usuario':
-                    pass  # Saltar encabezado
-                else:
-                    # Si no hay encabezado, volver al inicio del archivo
-                    file.seek(0)
-                    reader = csv.reader(file)
-                
-                # Leer filas
-                for row in reader:
-                    if len(row) >= 4:
-                        users_to_import.append({
-                            'username': row[0].strip(),
-                            'password': row[1].strip(),
-                            'full_name': row[2].strip(),
-                            'role': row[3].strip().lower()
-                        })
+        imported = [outcome for outcome in outcomes if outcome['status'] == 'imported']
+        rejected = [outcome for outcome in outcomes if outcome['status'] != 'imported']
+        
+        # Mostrar resultado
+        if not rejected:
+            QMessageBox.information(
+                dialog, 
+                "Importación Exitosa", 
+                f"Se importaron {len(imported)} usuarios correctamente."
+            )
+        else:
+            details = "\n".join(
+                f"Fila {outcome['row']} ({outcome['username'] or 'sin usuario'}): {outcome['message']}"
+                for outcome in rejected[:20]
+            )
+            if len(rejected) > 20:
+                details += f"\n... y {len(rejected) - 20} filas más"
             
-            # Validar datos
-            invalid_rows = []
-            for i, user in enumerate(users_to_import):
-                if not all([user['username'], user['password'], user['full_name']]):
-                    invalid_rows.append(i + 1)
-                elif user['role'] not in ['admin', 'employee']:
-                    invalid_rows.append(i + 1)
+            QMessageBox.warning(
+                dialog, 
+                "Importación Parcial", 
+                f"Se importaron {len(imported)} usuarios correctamente.\n"
+                f"No se importaron {len(rejected)} filas:\n\n{details}"
+            )
+        
+        if imported:
+            # Recargar la lista de usuarios (tabla y filtros)
+            self.reload_users()
+        
+        dialog.accept()
+        
+    def compute_analytics(self):
+        """Calcula en segundo plano las estadísticas de actividades del rango"""
+        try:
+            # NumPy solo se carga al usar el análisis
+            from utils.analytics import analyze
+        except ImportError as e:
+            QMessageBox.warning(self, "Error", f"El análisis requiere NumPy: {e}")
+            return
+        
+        from_date = self.analysis_from_date.date().toString("yyyy-MM-dd")
+        to_date = self.analysis_to_date.date().toString("yyyy-MM-dd")
+        
+        self.analysis_button.setEnabled(False)
+        self.async_runner.submit(
+            "analytics",
+            analyze, self.db_manager, from_date, to_date,
+            callback=self.populate_analytics,
+            error_callback=self.analytics_failed
+        )
+    
+    def populate_analytics(self, result):
+        """Muestra las estadísticas por equipo y por usuario"""
+        self.analysis_button.setEnabled(True)
+        
+        rows = ([(f"Equipo: {stats['team']}", stats) for stats in result['teams']]
+                + [(stats['full_name'] or stats['username'], stats) for stats in result['users']])
+        
+        self.analysis_table.setRowCount(len(rows))
+        for row, (name, stats) in enumerate(rows):
+            values = [
+                name,
+                str(stats['intervals']),
+                str(stats['break_count']),
+                self.format_seconds(int(stats['break_mean'])),
+                self.format_seconds(int(stats['break_median'])),
+                self.format_seconds(int(stats['break_p95'])),
+            ] + [
+                f"{stats[f'share_{activity}'] * 100:.1f}"
+                for activity in ('work', 'break', 'lunch', 'bathroom', 'meeting')
+            ] + [f"{stats['switches_per_hour']:.2f}"]
             
-            if invalid_rows:
-                error_msg = f"Se encontraron {len(invalid_rows)} filas con formato inválido (filas: {', '.join(map(str, invalid_rows))})"
-                QMessageBox.warning(dialog, "Error", error_msg)
+            for column, text in enumerate(values):
+                self.analysis_table.setItem(row, column, QTableWidgetItem(text))
+    
+    def analytics_failed(self, error):
+        """Informa un error al calcular el análisis"""
+        self.analysis_button.setEnabled(True)
+        self.occupancy_button.setEnabled(True)
+        QMessageBox.warning(self, "Error", f"Error al calcular el análisis: {error}")
+    
+    def compute_occupancy(self):
+        """Calcula en segundo plano la ocupación por franja del rango"""
+        if self.occupancy_heatmap is None:
+            try:
+                from utils.occupancy import OccupancyHeatmap
+            except ImportError as e:
+                QMessageBox.warning(self, "Error", f"El mapa de ocupación requiere NumPy: {e}")
                 return
-            
-            # Importar usuarios
-            success_count = 0
-            error_count = 0
-            
-            for user in users_to_import:
-                result = self.admin_controller.add_user(
-                    user['username'], 
-                    user['password'], 
-                    user['full_name'], 
-                    user['role']
-                )
-                
-                if result:
-                    success_count += 1
-                else:
-                    error_count += 1
-            
-            # Mostrar resultado
-            if error_count == 0:
-                QMessageBox.information(
-                    dialog, 
-                    "Importación Exitosa", 
-                    f"Se importaron {success_count} usuarios correctamente."
-                )
-            else:
-                QMessageBox.warning(
-                    dialog, 
-                    "Importación Parcial", 
-                    f"Se importaron {success_count} usuarios correctamente.\n"
-                    f"No se pudieron importar {error_count} usuarios (posiblemente ya existen)."
-                )
-            
-            # Actualizar tabla de usuarios
-            self.load_users_table()
-            
-            # Actualizar filtros de usuarios
-            self.user_filter.clear()
-            self.report_user_filter.clear()
-            self.user_filter.addItem("Todos los usuarios", -1)
-            self.report_user_filter.addItem("Todos los usuarios", -1)
-            
-            users = self.admin_controller.get_all_users()
-            for user in users:
-                self.user_filter.addItem(user['full_name'], user['id'])
-                self.report_user_filter.addItem(user['full_name'], user['id'])
-            
-            dialog.accept()
-            
-        except Exception as e:
-            QMessageBox.critical(dialog, "Error", f"Error al importar usuarios: {str(e)}")
+            # Conserva la caché por día entre cálculos
+            self.occupancy_heatmap = OccupancyHeatmap(self.db_manager)
+        
+        from_date = self.analysis_from_date.date().toString("yyyy-MM-dd")
+        to_date = self.analysis_to_date.date().toString("yyyy-MM-dd")
+        
+        self.occupancy_button.setEnabled(False)
+        self.async_runner.submit(
+            "occupancy",
+            self.occupancy_heatmap.compute, from_date, to_date,
+            callback=self.occupancy_ready,
+            error_callback=self.analytics_failed
+        )
+    
+    def occupancy_ready(self, result):
+        """Guarda la ocupación calculada y la muestra"""
+        self.occupancy_button.setEnabled(True)
+        self.occupancy_result = result
+        self.analysis_views.setCurrentWidget(self.occupancy_table)
+        self.show_occupancy()
+    
+    def show_occupancy(self):
+        """Muestra el promedio de personas por franja y día de la semana en la actividad elegida"""
+        if self.occupancy_result is None:
+            return
         
+        from utils.analytics import ACTIVITIES
+        from utils.occupancy import WEEKDAYS, SLOTS_PER_DAY, by_weekday, slot_label
+        
+        dates, occupancy = self.occupancy_result
+        activity = ACTIVITIES.index(self.occupancy_activity.currentData())
+        weekly = by_weekday(dates, occupancy)[:, activity, :]
+        peak = weekly.max() or 1
+        
+        table = self.occupancy_table
+        table.setRowCount(SLOTS_PER_DAY)
+        table.setColumnCount(len(WEEKDAYS))
+        table.setHorizontalHeaderLabels(WEEKDAYS)
+        table.setVerticalHeaderLabels([slot_label(slot) for slot in range(SLOTS_PER_DAY)])
+        
+        for slot in range(SLOTS_PER_DAY):
+            for weekday in range(len(WEEKDAYS)):
+                value = weekly[weekday, slot]
+                item = QTableWidgetItem(f"{value:.1f}")
+                item.setTextAlignment(Qt.AlignCenter)
+                # Más intenso cuanto más cerca del máximo del mapa
+                item.setBackground(QColor(54, 96, 146, int(200 * value / peak)))
+                table.setItem(slot, weekday, item)
+    
     def export_to_excel(self):
-        """Exporta el reporte actual a un archivo Excel"""
-        if not hasattr(self, 'current_report_data') or not self.current_report_data:
+        """Exporta el reporte actual a un archivo Excel en segundo plano"""
+        if self.report_model is None or self.report_model.rowCount() == 0:
             QMessageBox.warning(self, "Error", "No hay datos para exportar")
             return
         
-        try:
-            from PyQt5.QtWidgets import QFileDialog
-            import openpyxl
-            from openpyxl.styles import Font, Alignment, PatternFill
-            
-            # Seleccionar ubicación para guardar
-            file_path, _ = QFileDialog.getSaveFileName(
-                self, "Guardar Reporte Excel", "", "Archivos Excel (*.xlsx)"
-            )
-            
-            if not file_path:
-                return  # Usuario canceló
-            
-            # Agregar extensión si no la tiene
-            if not file_path.endswith('.xlsx'):
-                file_path += '.xlsx'
-            
-            # Crear libro y hoja
-            workbook = openpyxl.Workbook()
-            sheet = workbook.active
-            sheet.title = "Reporte de Tiempos"
-            
-            # Estilos
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            header_alignment = Alignment(horizontal="center", vertical="center")
-            
-            # Títulos
-            headers = [
-                "Usuario", "Fecha", "Hora de Inicio", "Hora de Fin", 
-                "Tiempo de Trabajo", "Tiempo de Descanso", "Tiempo de Almuerzo", 
-                "Tiempo en Baño", "Tiempo en Reuniones"
-            ]
-            
-            for col, header in enumerate(headers, 1):
-                cell = sheet.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-            
-            # Datos
-            for row, record in enumerate(self.current_report_data, 2):
-                # Usuario
-                sheet.cell(row=row, column=1, value=record['username'])
-                
-                # Fecha
-                sheet.cell(row=row, column=2, value=record['date'])
-                
-                # Hora de inicio
-                if record['login_time']:
-                    login_time = datetime.datetime.fromisoformat(record['login_time'])
-                    sheet.cell(row=row, column=3, value=login_time.strftime('%H:%M:%S'))
-                else:
-                    sheet.cell(row=row, column=3, value="--")
-                
-                # Hora de fin
-                if record['logout_time']:
-                    logout_time = datetime.datetime.fromisoformat(record['logout_time'])
-                    sheet.cell(row=row, column=4, value=logout_time.strftime('%H:%M:%S'))
-                else:
-                    sheet.cell(row=row, column=4, value="Activo")
-                
-                # Tiempos de actividades
-                sheet.cell(row=row, column=5, value=self.format_seconds(record['total_work_time']))
-                sheet.cell(row=row, column=6, value=self.format_seconds(record['total_break_time']))
-                sheet.cell(row=row, column=7, value=self.format_seconds(record['total_lunch_time']))
-                sheet.cell(row=row, column=8, value=self.format_seconds(record['total_bathroom_time']))
-                sheet.cell(row=row, column=9, value=self.format_seconds(record['total_meeting_time']))
-            
-            # Ajustar ancho de columnas
-            for column in sheet.columns:
-                max_length = 0
-                column_letter = openpyxl.utils.get_column_letter(column[0].column)
-                for cell in column:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                adjusted_width = max_length + 2
-                sheet.column_dimensions[column_letter].width = adjusted_width
-            
-            # Guardar archivo
-            workbook.save(file_path)
-            
-            QMessageBox.information(
-                self, 
-                "Exportación Exitosa", 
-                f"El reporte ha sido exportado exitosamente a:\n{file_path}"
+        from PyQt5.QtWidgets import QFileDialog
+        
+        # Seleccionar ubicación para guardar
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Guardar Reporte Excel", "", "Archivos Excel (*.xlsx)"
+        )
+        
+        if not file_path:
+            return  # Usuario canceló
+        
+        # Agregar extensión si no la tiene
+        if not file_path.endswith('.xlsx'):
+            file_path += '.xlsx'
+        
+        # Diálogo de progreso; el total se conoce cuando el hilo cuenta las filas
+        self.start_export_progress("Exportar a Excel", "Exportando reporte...")
+        self.async_runner.submit(
+            "export",
+            self.write_report_excel, self.report_model.filters, file_path, self.export_cancelled.is_set,
+            callback=lambda written: self.export_finished(file_path, written),
+            error_callback=self.export_failed,
+            progress_callback=self.update_export_progress
+        )
+    
+    def write_report_excel(self, filters, file_path, is_cancelled, progress):
+        """Escribe el reporte en Excel leyendo del cursor (se ejecuta en un hilo del pool)"""
+        from utils.excel_export import export_rows_to_xlsx
+        
+        total = self.admin_controller.count_historical_report(*filters)
+        progress(0, total)
+        
+        # closing() libera la conexión en este mismo hilo aunque se cancele
+        with closing(self.admin_controller.stream_historical_report(*filters)) as records:
+            return export_rows_to_xlsx(
+                file_path, REPORT_HEADERS, (format_report_record(record) for record in records),
+                sheet_title="Reporte de Tiempos", total=total,
+                progress=progress, is_cancelled=is_cancelled
             )
+    
+    def show_bulk_export_dialog(self):
+        """Exporta time_records y activity_logs del rango de fechas elegido"""
+        from PyQt5.QtWidgets import QFileDialog, QInputDialog
+        from utils.bulk_export import FORMATS, export_history
         
-        except Exception as e:
-            QMessageBox.critical(
-                self, 
-                "Error", 
-                f"Error al exportar a Excel: {str(e)}\n\n"
-                "Asegúrate de tener instalada la biblioteca openpyxl:"
-                "\npip install openpyxl"
-            )
\ No newline at end of file
+        fmt, ok = QInputDialog.getItem(
+            self, "Exportación Masiva", "Formato:", list(FORMATS), 1, False
+        )
+        if not ok:
+            return
+        
+        output_dir = QFileDialog.getExistingDirectory(self, "Carpeta de destino")
+        if not output_dir:
+            return  # Usuario canceló
+        
+        from_date = self.from_date.date().toString("yyyy-MM-dd")
+        to_date = self.to_date.date().toString("yyyy-MM-dd")
+        
+        self.start_export_progress("Exportación Masiva", "Exportando registros...")
+        self.async_runner.submit(
+            "bulk_export",
+            export_history, self.db_manager, output_dir, from_date, to_date, fmt,
+            is_cancelled=self.export_cancelled.is_set,
+            callback=lambda results: self.bulk_export_finished(output_dir, results),
+            error_callback=self.export_failed,
+            progress_callback=self.update_export_progress
+        )
+    
+    def bulk_export_finished(self, output_dir, results):
+        """Informa el resultado de la exportación masiva"""
+        self.close_export_progress()
+        
+        QMessageBox.information(
+            self,
+            "Exportación Exitosa",
+            f"Se exportaron {sum(count for _, count in results)} filas en "
+            f"{len(results)} archivos a:\n{output_dir}"
+        )
+    
+    def start_export_progress(self, title, label):
+        """Muestra el diálogo de progreso de una exportación y bloquea nuevas exportaciones"""
+        self.export_cancelled = threading.Event()
+        self.export_progress = QProgressDialog(label, "Cancelar", 0, 0, self)
+        self.export_progress.setWindowTitle(title)
+        self.export_progress.setWindowModality(Qt.WindowModal)
+        self.export_progress.setMinimumDuration(0)
+        self.export_progress.canceled.connect(self.cancel_export)
+        self.export_progress.show()
+        
+        self.export_excel_button.setEnabled(False)
+        self.bulk_export_button.setEnabled(False)
+    
+    def update_export_progress(self, written, total):
+        """Actualiza el diálogo de progreso de la exportación"""
+        if self.export_progress is None:
+            return
+        if self.export_progress.wasCanceled():
+            self.cancel_export()  # Por ejemplo, cerrado con Escape
+            return
+        if self.export_progress.maximum() != total:
+            self.export_progress.setMaximum(total)
+        self.export_progress.setValue(min(written, total))
+    
+    def cancel_export(self):
+        """Cancela la exportación en curso"""
+        self.export_cancelled.set()
+    
+    def close_export_progress(self):
+        """Cierra el diálogo de progreso y vuelve a habilitar la exportación"""
+        if self.export_progress is not None:
+            self.export_progress.canceled.disconnect(self.cancel_export)
+            self.export_progress.close()
+            self.export_progress = None
+        self.export_excel_button.setEnabled(self.report_model is not None and self.report_model.rowCount() > 0)
+        self.bulk_export_button.setEnabled(True)
+    
+    def export_finished(self, file_path, written):
+        """Informa el resultado de la exportación"""
+        self.close_export_progress()
+        
+        if written is None:
+            return  # Cancelada por el usuario
+        
+        QMessageBox.information(
+            self, 
+            "Exportación Exitosa", 
+            f"El reporte ha sido exportado exitosamente a:\n{file_path}"
+        )
+    
+    def export_failed(self, error):
+        """Informa un error durante la exportación"""
+        from utils.bulk_export import ExportCancelled
+        
+        self.close_export_progress()
+        if isinstance(error, ExportCancelled):
+            return  # Cancelada por el usuario
+        
+        message = f"Error al exportar: {str(error)}"
+        if isinstance(error, ImportError):
+            message += ("\n\nAsegúrate de tener instalada la biblioteca openpyxl:"
+                        "\npip install openpyxl")
+        QMessageBox.critical(self, "Error", message)
\ No newline at end of file
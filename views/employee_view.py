@@ -2,18 +2,34 @@ import datetime
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                            QLabel, QPushButton, QMessageBox, QFrame,
                            QStackedWidget)
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
 
 from controllers.timer_controller import TimerController
+from utils.config import load_config
+from utils.scheduler import PeriodicTask
 
 class EmployeeView(QMainWindow):
+    # Se emite desde el hilo del latido cuando el registro ya se cerró (auto-logout)
+    sessionClosed = pyqtSignal()
+    
     def __init__(self, db_manager, user):
         super().__init__()
         
         self.db_manager = db_manager
         self.user = user
-        self.timer_controller = TimerController(db_manager, user)
+        config = load_config()
+        self.timer_controller = TimerController(
+            db_manager, user,
+            write_behind=config.get('write_behind', False),
+            journal_dir=config.get('journal_dir')
+        )
+        
+        # Latido periódico en segundo plano para que la sesión no se considere inactiva
+        self.heartbeat_task = PeriodicTask(
+            config.get('refresh_interval', 30), self.send_heartbeat, "Heartbeat"
+        )
+        self.sessionClosed.connect(self.handle_session_closed)
         
         # Variables de estado
         self.current_activity = "work"  # Por defecto comienza en trabajo
@@ -209,6 +225,7 @@ class EmployeeView(QMainWindow):
             self.is_tracking = True
             self.start_time = datetime.datetime.now()
             self.timer.start(1000)  # Actualizar cada segundo
+            self.heartbeat_task.start()
             
             # Actualizar etiqueta de hora de inicio
             self.login_time_label.setText(f"Hora de inicio: {self.start_time.strftime('%H:%M:%S')}")
@@ -233,10 +250,33 @@ class EmployeeView(QMainWindow):
             self.login_view = LoginView(self.db_manager)
             self.login_view.show()
     
+    def send_heartbeat(self):
+        """Envía el latido (en el hilo de la tarea) y avisa si la sesión ya está cerrada"""
+        if self.is_tracking and not self.timer_controller.heartbeat():
+            self.sessionClosed.emit()
+    
+    def handle_session_closed(self):
+        """La sesión se cerró fuera de esta ventana: volver al login sin registrar la salida"""
+        if not self.is_tracking:
+            return
+        
+        self.timer.stop()
+        self.heartbeat_task.stop()
+        self.is_tracking = False
+        self.timer_controller.abandon_session()
+        
+        QMessageBox.information(self, "Sesión cerrada",
+                                "Tu sesión se cerró por inactividad. Vuelve a iniciar sesión.")
+        self.close()
+        from views.login_view import LoginView
+        self.login_view = LoginView(self.db_manager)
+        self.login_view.show()
+    
     def end_session(self):
         """Finaliza la sesión de trabajo"""
         if self.is_tracking:
             self.timer.stop()
+            self.heartbeat_task.stop()
             self.is_tracking = False
             # Registrar logout en la base de datos
             self.timer_controller.end_session()
@@ -282,6 +322,7 @@ class EmployeeView(QMainWindow):
     
     def update_statistics(self):
         """Actualiza las estadísticas mostradas"""
+        # Calculadas en memoria por el controlador, sin consultar la base de datos
         stats = self.timer_controller.get_current_statistics()
         
         if stats:
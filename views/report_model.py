@@ -0,0 +1,187 @@
+import collections
+import datetime
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from controllers.admin_controller import REPORT_PAGE_SIZE, report_key
+from utils.helpers import format_seconds
+
+REPORT_HEADERS = [
+    "Usuario", "Fecha", "Hora de Inicio", "Hora de Fin", "Tiempo de Trabajo",
+    "Tiempo de Descanso", "Tiempo de Almuerzo", "Tiempo en Baño", "Tiempo en Reuniones"
+]
+
+# Texto que muestran las celdas mientras su página se consulta
+LOADING_TEXT = "Cargando..."
+
+
+def format_report_record(record):
+    """Convierte una fila del reporte histórico en los textos de sus columnas"""
+    if record['login_time']:
+        login_time = datetime.datetime.fromisoformat(record['login_time']).strftime('%H:%M:%S')
+    else:
+        login_time = "--"
+
+    if record['logout_time']:
+        logout_time = datetime.datetime.fromisoformat(record['logout_time']).strftime('%H:%M:%S')
+    else:
+        logout_time = "Activo"
+
+    return (
+        record['username'],
+        record['date'],
+        login_time,
+        logout_time,
+        format_seconds(record['total_work_time']),
+        format_seconds(record['total_break_time']),
+        format_seconds(record['total_lunch_time']),
+        format_seconds(record['total_bathroom_time']),
+        format_seconds(record['total_meeting_time'])
+    )
+
+
+class HistoricalReportModel(QAbstractTableModel):
+    """Modelo del reporte histórico que carga páginas a medida que se desplaza la vista.
+
+    Las filas llegan por páginas (canFetchMore/fetchMore) con la paginación
+    por clave de AdminController.get_historical_report_page. Solo se guardan
+    en memoria max_pages páginas ya formateadas; si la vista vuelve a una
+    página descartada se consulta de nuevo a partir de su clave.
+
+    Todas las consultas van por el AsyncRunner: data() nunca consulta la
+    base de datos, muestra LOADING_TEXT mientras la página llega y la
+    vista se actualiza con dataChanged (o con la inserción de filas, para
+    las páginas nuevas).
+    """
+
+    def __init__(self, admin_controller, async_runner, user_id=None, from_date=None, to_date=None,
+                 first_page=None, page_size=REPORT_PAGE_SIZE, max_pages=10, parent=None):
+        super().__init__(parent)
+
+        self.admin_controller = admin_controller
+        self.async_runner = async_runner
+        self.filters = (user_id, from_date, to_date)
+        self.page_size = page_size
+        self.max_pages = max_pages
+
+        self._page_keys = []  # Clave "después de" con la que se consulta cada página
+        self._pages = collections.OrderedDict()  # índice de página -> filas formateadas
+        self._next_key = None  # Clave de la última fila cargada
+        self._row_count = 0
+        self._exhausted = False
+        self._loading = set()  # Páginas descartadas que se están volviendo a consultar
+        self._fetching = False  # Hay una página nueva en camino
+        self._task_prefix = f"report_page:{id(self)}"
+
+        if first_page is not None:
+            self._add_page(first_page)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(REPORT_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return REPORT_HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+
+        page_index, offset = divmod(index.row(), self.page_size)
+        rows = self._page(page_index)
+        if rows is None:
+            return LOADING_TEXT
+        if offset >= len(rows):
+            return None  # La página cambió desde que se cargó
+        return rows[offset][index.column()]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+
+        self._fetching = True
+        self.async_runner.submit(
+            f"{self._task_prefix}:next",
+            self._query_page, self._next_key,
+            callback=self._add_page,
+            error_callback=self._fetch_failed
+        )
+
+    def cancel(self):
+        """Cancela las consultas pendientes, p. ej. al reemplazar el modelo"""
+        self.async_runner.cancel(f"{self._task_prefix}:next")
+        for page_index in self._loading:
+            self.async_runner.cancel(f"{self._task_prefix}:{page_index}")
+        self._loading.clear()
+        self._fetching = False
+
+    def _add_page(self, records):
+        """Agrega al final la siguiente página consultada"""
+        self._fetching = False
+        self._page_keys.append(self._next_key)
+        if len(records) < self.page_size:
+            self._exhausted = True
+        if records:
+            self._next_key = report_key(records[-1])
+
+        rows = [format_report_record(record) for record in records]
+        self._store_page(len(self._page_keys) - 1, rows)
+
+        if rows:
+            self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + len(rows) - 1)
+            self._row_count += len(rows)
+            self.endInsertRows()
+
+    def _fetch_failed(self, error):
+        self._fetching = False
+        print(f"Error al cargar la página del reporte: {error}")
+
+    def _page(self, page_index):
+        """Filas de una página, o None si se descartó y se está volviendo a consultar"""
+        rows = self._pages.get(page_index)
+        if rows is not None:
+            self._pages.move_to_end(page_index)
+            return rows
+
+        if page_index not in self._loading:
+            self._loading.add(page_index)
+            self.async_runner.submit(
+                f"{self._task_prefix}:{page_index}",
+                self._query_page, self._page_keys[page_index],
+                callback=lambda records: self._page_loaded(page_index, records),
+                error_callback=lambda error: self._page_failed(page_index, error)
+            )
+        return None
+
+    def _page_loaded(self, page_index, records):
+        """Guarda una página que se volvió a consultar y refresca sus filas"""
+        self._loading.discard(page_index)
+        rows = [format_report_record(record) for record in records]
+        self._store_page(page_index, rows)
+
+        first = page_index * self.page_size
+        last = min(first + self.page_size, self._row_count) - 1
+        self.dataChanged.emit(self.index(first, 0), self.index(last, len(REPORT_HEADERS) - 1))
+
+    def _page_failed(self, page_index, error):
+        self._loading.discard(page_index)
+        print(f"Error al cargar la página del reporte: {error}")
+
+    def _store_page(self, page_index, rows):
+        """Guarda una página descartando las menos usadas recientemente"""
+        self._pages[page_index] = rows
+        self._pages.move_to_end(page_index)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def _query_page(self, after):
+        return self.admin_controller.get_historical_report_page(
+            *self.filters, after=after, limit=self.page_size
+        )
\ No newline at end of file
@@ -0,0 +1,54 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+USER_HEADERS = ["ID", "Usuario", "Nombre Completo", "Rol", "Activo"]
+USER_FIELDS = ('id', 'username', 'full_name', 'role', 'active')
+
+# Valor de los filtros sin usuario elegido ("Todos los usuarios")
+ALL_USERS_ID = -1
+
+# Columna que muestran los filtros
+FULL_NAME_COLUMN = 2
+
+
+class UserListModel(QAbstractTableModel):
+    """Modelo de una lista de usuarios (resultado de una búsqueda).
+
+    Lo usan la tabla de usuarios y las sugerencias de los filtros.
+    Qt.UserRole devuelve el ID del usuario en cualquier columna, que es lo
+    que leen los filtros y las acciones sobre la fila seleccionada.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._users = []
+
+    def set_users(self, users):
+        """Reemplaza la lista de usuarios"""
+        self.beginResetModel()
+        self._users = [{field: user[field] for field in USER_FIELDS} for user in users]
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._users)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(USER_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return USER_HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        user = self._users[index.row()]
+        if role == Qt.DisplayRole:
+            field = USER_FIELDS[index.column()]
+            if field == 'active':
+                return "Sí" if user['active'] else "No"
+            return str(user[field])
+        if role == Qt.UserRole:
+            return user['id']
+        return None
\ No newline at end of file
@@ -0,0 +1,122 @@
+from PyQt5.QtCore import Qt, QModelIndex, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QCompleter, QLineEdit
+
+from views.user_model import UserListModel, ALL_USERS_ID, FULL_NAME_COLUMN
+
+# Espera desde la última tecla antes de buscar (ms)
+SEARCH_DELAY = 250
+
+
+class UserSearchBox(QLineEdit):
+    """Filtro de usuario con búsqueda incremental.
+
+    En lugar de cargar todos los usuarios en un combo, cada vez que se deja
+    de escribir durante SEARCH_DELAY ms se buscan en segundo plano los
+    usuarios cuyo usuario o nombre empieza con el texto, y se muestran como
+    sugerencias. Sin un usuario elegido, currentData() devuelve
+    ALL_USERS_ID ("Todos los usuarios").
+
+    Escribir no cambia el usuario elegido: userChanged solo se emite al
+    elegir una sugerencia o al borrar el texto. Si se deja el campo sin
+    elegir, vuelve a mostrar el nombre del usuario vigente.
+    """
+
+    # ID del usuario elegido (ALL_USERS_ID al volver a todos)
+    userChanged = pyqtSignal(int)
+
+    def __init__(self, search, async_runner, key, parent=None):
+        super().__init__(parent)
+        self.search = search
+        self.async_runner = async_runner
+        self.key = key
+        self._user_id = ALL_USERS_ID
+        self._user_name = ""
+
+        self.setPlaceholderText("Todos los usuarios")
+        self.setClearButtonEnabled(True)
+
+        self.results = UserListModel(self)
+        self.completer = QCompleter(self.results, self)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setCompletionColumn(FULL_NAME_COLUMN)
+        self.completer.activated[QModelIndex].connect(self._on_activated)
+        self.setCompleter(self.completer)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.run_search)
+
+        self.textEdited.connect(self._on_text_edited)
+        self.returnPressed.connect(self._on_return_pressed)
+        self.editingFinished.connect(self._on_editing_finished)
+
+    def currentData(self):
+        """ID del usuario elegido, o ALL_USERS_ID si no hay ninguno"""
+        return self._user_id
+
+    def set_user(self, user_id, full_name):
+        """Elige un usuario sin pasar por la búsqueda"""
+        self.setText(full_name)
+        self._user_name = full_name
+        self._set_user_id(user_id)
+
+    def clear_user(self):
+        """Vuelve a "Todos los usuarios" """
+        self.search_timer.stop()
+        self.async_runner.cancel(self.key)
+        self.clear()
+        self._user_name = ""
+        self._set_user_id(ALL_USERS_ID)
+
+    def run_search(self):
+        """Busca en segundo plano los usuarios que coinciden con el texto"""
+        text = self.text().strip()
+        if not text:
+            self.results.set_users([])
+            return
+
+        self.async_runner.submit(
+            self.key, self.search, text,
+            callback=lambda users: self._show_results(text, users)
+        )
+
+    def _on_text_edited(self, text):
+        # Borrar el texto (o el botón de borrar) vuelve a todos los usuarios;
+        # mientras se escribe se conserva la elección anterior
+        if not text.strip():
+            self.clear_user()
+            return
+        self.search_timer.start()
+
+    def _on_return_pressed(self):
+        # Enter sin elegir una sugerencia toma la primera coincidencia
+        if self.text() != self._user_name and self.results.rowCount() > 0:
+            self._on_activated(self.results.index(0, FULL_NAME_COLUMN))
+
+    def _on_editing_finished(self):
+        # Texto a medio escribir: se vuelve a mostrar el usuario vigente
+        if self.text() != self._user_name:
+            self.search_timer.stop()
+            self.async_runner.cancel(self.key)
+            self.setText(self._user_name)
+
+    def _show_results(self, text, users):
+        # Resultado de un texto que ya cambió: lo reemplaza la próxima búsqueda
+        if text != self.text().strip():
+            return
+
+        self.results.set_users(users)
+        if users and self.hasFocus():
+            self.completer.complete()
+
+    def _on_activated(self, index):
+        user_id = index.data(Qt.UserRole)
+        full_name = index.sibling(index.row(), FULL_NAME_COLUMN).data()
+        self.search_timer.stop()
+        self.set_user(user_id, full_name)
+
+    def _set_user_id(self, user_id):
+        if user_id != self._user_id:
+            self._user_id = user_id
+            self.userChanged.emit(user_id)
\ No newline at end of file